@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import resource
+import time
+
+import pytest
+import torch
+
+from pytorch_lightning.utilities.cloud_io import atomic_save, load as pl_load
+from pytorch_lightning.utilities.compressed_checkpoint import compress_checkpoint
+
+#: size of the benchmarked state dict, can be lowered on small machines
+STATE_DICT_SIZE_MB = int(os.getenv('PL_BENCHMARK_STATE_DICT_MB', 2048))
+TENSOR_SIZE_MB = 64
+
+
+def _peak_rss_mb() -> float:
+    # on Linux `ru_maxrss` is reported in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure_save_peak_rss(filepath, size_mb, queue):
+    numel = TENSOR_SIZE_MB * 1024 * 1024 // 4
+    state_dict = {f'layer_{i}.weight': torch.ones(numel) for i in range(size_mb // TENSOR_SIZE_MB)}
+    rss_before = _peak_rss_mb()
+    atomic_save({'state_dict': state_dict}, filepath)
+    queue.put(_peak_rss_mb() - rss_before)
+
+
+def _available_memory_mb() -> float:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / 1024 ** 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'sysconf'), reason="requires a POSIX system")
+def test_atomic_save_peak_memory(tmpdir):
+    """
+    Verify that saving a checkpoint does not allocate memory proportional to its size
+    """
+    if _available_memory_mb() < 1.5 * STATE_DICT_SIZE_MB:
+        pytest.skip(f"not enough memory to benchmark a {STATE_DICT_SIZE_MB} MB state dict")
+
+    # measure in a fresh process so the peak RSS is not polluted by other tests
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_measure_save_peak_rss,
+        args=(os.path.join(tmpdir, 'model.ckpt'), STATE_DICT_SIZE_MB, queue),
+    )
+    proc.start()
+    extra_rss = queue.get()
+    proc.join()
+
+    print(f'saving a {STATE_DICT_SIZE_MB} MB state dict raised peak RSS by {extra_rss:.1f} MB')
+    # streaming keeps the overhead bounded by roughly the largest tensor, not the checkpoint size
+    assert extra_rss < 2 * TENSOR_SIZE_MB + 0.05 * STATE_DICT_SIZE_MB
+
+
+@pytest.mark.parametrize('dtype', [torch.float32, torch.float16])
+@pytest.mark.parametrize('compression', [None, 'zlib', 'lzma'])
+def test_compressed_checkpoint_trade_off(tmpdir, dtype, compression):
+    """
+    Report checkpoint size and save/load time of the compression codecs
+    """
+    seed = torch.manual_seed(0)
+    # weights of a trained model are close to normally distributed
+    state_dict = {f'layer_{i}.weight': torch.randn(1024, 1024, generator=seed).to(dtype) for i in range(4)}
+    filepath = os.path.join(tmpdir, 'model.ckpt')
+
+    start = time.perf_counter()
+    checkpoint = {'state_dict': state_dict}
+    atomic_save(compress_checkpoint(checkpoint, compression) if compression else checkpoint, filepath)
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = pl_load(filepath)
+    load_time = time.perf_counter() - start
+
+    raw_size = sum(t.numel() * t.element_size() for t in state_dict.values())
+    ratio = os.path.getsize(filepath) / raw_size
+    print(f'{dtype} {compression}: size ratio {ratio:.3f}, save {save_time:.2f}s, load {load_time:.2f}s')
+
+    assert all(torch.equal(loaded['state_dict'][k], v) for k, v in state_dict.items())
+    assert ratio < 1.01
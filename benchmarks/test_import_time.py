@@ -0,0 +1,124 @@
+"""
+Time to ``import pytorch_lightning`` in a new Python process.
+
+Every measurement imports Lightning in a new process with ``python -X importtime``. Torch takes most of the
+import time and varies a lot between machines, so the time of Lightning itself, i.e. without the import of
+torch, is compared to ``MAX_IMPORT_MS``, scaled by ``PL_BENCHMARK_OVERHEAD_SCALE`` for slow machines. The
+medians of ``PL_BENCHMARK_IMPORT_RUNS`` imports are saved as JSON, to ``PL_BENCHMARK_OUTPUT`` (default:
+``import_time.json`` in the temporary directory), and if ``PL_BENCHMARK_BASELINE`` is the JSON of a previous
+run, the import fails when it regressed by more than ``PL_BENCHMARK_TOLERANCE`` (default: 0.25, i.e. 25%)::
+
+    PL_BENCHMARK_OUTPUT=before.json python -m pytest benchmarks/test_import_time.py
+    PL_BENCHMARK_BASELINE=before.json python -m pytest benchmarks/test_import_time.py
+
+The optional dependencies which are slow to import must only be imported when they are used, which is
+verified as well.
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+import pytest
+
+NUM_RUNS = int(os.getenv('PL_BENCHMARK_IMPORT_RUNS', 5))
+#: the maximal import time of Lightning without torch in milliseconds, a few times the time on a laptop
+MAX_IMPORT_MS = 400
+OVERHEAD_SCALE = float(os.getenv('PL_BENCHMARK_OVERHEAD_SCALE', 1))
+TOLERANCE = float(os.getenv('PL_BENCHMARK_TOLERANCE', 0.25))
+OUTPUT_PATH = os.getenv('PL_BENCHMARK_OUTPUT', os.path.join(tempfile.gettempdir(), 'import_time.json'))
+BASELINE_PATH = os.getenv('PL_BENCHMARK_BASELINE')
+
+#: modules only imported on first use
+DEFERRED_MODULES = (
+    'torch.utils.tensorboard',
+    'omegaconf',
+    'horovod',
+    'sklearn',
+    'pkg_resources',
+    'distutils',
+    'comet_ml',
+    'mlflow',
+    'neptune',
+    'test_tube',
+    'wandb',
+)
+
+
+def run_python(code: str, *options: str, python_path: Optional[str] = None) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    if python_path is not None:
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [python_path, env.get('PYTHONPATH')]))
+    # the bytecode is cached by the first import, as it is once Lightning is installed
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run(
+        [sys.executable, *options, '-c', code], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+
+
+def import_times(module: str = 'pytorch_lightning') -> Dict[str, float]:
+    """The cumulative import time of every module imported by ``module``, in milliseconds."""
+    process = run_python(f'import {module}', '-X', 'importtime')
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times.setdefault(name.strip(), int(cumulative) / 1000)
+    return times
+
+
+@pytest.fixture(scope='module')
+def results():
+    results = {}
+    yield results
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f'import time results saved to {OUTPUT_PATH}')
+
+
+def test_import_time(results):
+    """
+    Verify that the time to import Lightning without torch stays under its limit and did not regress
+    """
+    # warm up the bytecode and file system caches
+    run_python('import pytorch_lightning')
+    runs = [import_times() for _ in range(NUM_RUNS)]
+    total_ms = float(np.median([times['pytorch_lightning'] for times in runs]))
+    lightning_ms = float(np.median([times['pytorch_lightning'] - times['torch'] for times in runs]))
+    results['import'] = {
+        'total_ms': total_ms,
+        'lightning_ms': lightning_ms,
+    }
+    print(f'import pytorch_lightning: {total_ms:.1f} ms, {lightning_ms:.1f} ms without torch')
+
+    assert lightning_ms < MAX_IMPORT_MS * OVERHEAD_SCALE
+    if BASELINE_PATH:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f).get('import')
+        if baseline is not None:
+            assert lightning_ms < baseline['lightning_ms'] * (1 + TOLERANCE), (
+                f"the import regressed from {baseline['lightning_ms']:.1f} to {lightning_ms:.1f} ms"
+            )
+
+
+def test_deferred_imports(tmpdir):
+    """
+    Verify that the optional dependencies which are slow to import are not imported with Lightning
+    """
+    # the missing dependencies are installed as empty packages, looking them up must not import them either
+    for name in DEFERRED_MODULES:
+        if '.' not in name and importlib.util.find_spec(name) is None:
+            tmpdir.mkdir(name).join('__init__.py').write('')
+    process = run_python(
+        'import json, sys, pytorch_lightning; print(json.dumps(sorted(sys.modules)))', python_path=str(tmpdir)
+    )
+    modules = set(json.loads(process.stdout.splitlines()[-1]))
+    imported = [name for name in DEFERRED_MODULES if name in modules]
+    assert not imported, f'imported by `import pytorch_lightning`: {imported}'
@@ -0,0 +1,232 @@
+"""
+Per-step overhead of ``Trainer.fit`` over a raw PyTorch loop, on CPU.
+
+The models are tiny so the duration of a step is dominated by the framework. For every configuration the
+median duration of a training step is measured in steady state with Lightning and with a plain loop over the
+same model, data and optimizers, and their difference is the overhead of the framework.
+
+The results are saved as JSON, to ``PL_BENCHMARK_OUTPUT`` (default: ``step_overhead.json`` in the temporary
+directory). A configuration fails when its overhead is over its limit in ``MAX_OVERHEAD_MS``, scaled by
+``PL_BENCHMARK_OVERHEAD_SCALE`` for slow machines, or, if ``PL_BENCHMARK_BASELINE`` is the JSON of a previous
+run, when it regressed by more than ``PL_BENCHMARK_TOLERANCE`` (default: 0.25, i.e. 25%)::
+
+    PL_BENCHMARK_OUTPUT=before.json python -m pytest benchmarks/test_step_overhead.py
+    PL_BENCHMARK_BASELINE=before.json python -m pytest benchmarks/test_step_overhead.py
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pytest
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from pytorch_lightning import Callback, LightningModule, Trainer, TrainResult, seed_everything
+
+NUM_STEPS = int(os.getenv('PL_BENCHMARK_STEPS', 200))
+#: steps excluded from the medians, e.g. the first batches of the dataloader
+WARMUP_STEPS = 20
+BATCH_SIZE = 8
+NUM_FEATURES = 32
+SEQUENCE_LENGTH = 8
+TBPTT_STEPS = 2
+
+#: the maximal overhead per step in milliseconds, a few times the overhead on a laptop
+MAX_OVERHEAD_MS = {
+    'dict': 3,
+    'result': 3,
+    'many_metrics': 10,
+    'multiple_optimizers': 8,
+    'tbptt': 8,
+    'accumulate_grad_batches': 3,
+    'callbacks': 5,
+    'ddp_cpu': 20,
+}
+OVERHEAD_SCALE = float(os.getenv('PL_BENCHMARK_OVERHEAD_SCALE', 1))
+TOLERANCE = float(os.getenv('PL_BENCHMARK_TOLERANCE', 0.25))
+OUTPUT_PATH = os.getenv('PL_BENCHMARK_OUTPUT', os.path.join(tempfile.gettempdir(), 'step_overhead.json'))
+BASELINE_PATH = os.getenv('PL_BENCHMARK_BASELINE')
+
+
+class TinyModel(LightningModule):
+
+    def __init__(
+            self,
+            use_result: bool = False,
+            num_metrics: int = 0,
+            num_optimizers: int = 1,
+            tbptt: bool = False,
+    ):
+        super().__init__()
+        self.use_result = use_result
+        self.num_metrics = num_metrics
+        self.num_optimizers = num_optimizers
+        self.tbptt = tbptt
+        self.layers = nn.ModuleList([nn.Linear(NUM_FEATURES, NUM_FEATURES) for _ in range(num_optimizers)])
+
+    def forward(self, x, optimizer_idx=0):
+        return self.layers[optimizer_idx](x)
+
+    def loss(self, batch, optimizer_idx=0):
+        x, y = batch
+        return nn.functional.mse_loss(self(x, optimizer_idx), y)
+
+    def training_step(self, batch, batch_idx, optimizer_idx=None, hiddens=None):
+        loss = self.loss(batch, optimizer_idx or 0)
+        metrics = {f'metric_{i}': loss.detach() for i in range(self.num_metrics)}
+        if self.use_result:
+            result = TrainResult(minimize=loss, hiddens=hiddens)
+            if metrics:
+                result.log_dict(metrics, on_step=True, on_epoch=False)
+            return result
+        output = {'loss': loss, 'log': metrics}
+        if self.tbptt:
+            output['hiddens'] = hiddens
+        return output
+
+    def tbptt_split_batch(self, batch, split_size):
+        # (batch, time, features) split along the time
+        x, y = batch
+        return [(x[:, t:t + split_size], y[:, t:t + split_size]) for t in range(0, x.size(1), split_size)]
+
+    def configure_optimizers(self):
+        return [torch.optim.SGD(layer.parameters(), lr=0.01) for layer in self.layers]
+
+    def train_dataloader(self):
+        return make_dataloader(self.tbptt)
+
+
+class NoOpCallback(Callback):
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        pass
+
+    def on_train_batch_end(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        pass
+
+    def on_batch_start(self, trainer, pl_module):
+        pass
+
+    def on_batch_end(self, trainer, pl_module):
+        pass
+
+
+class StepTimer(Callback):
+    """Records the time at the end of every training batch, saved to a file as ``ddp_cpu`` trains in other processes."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.times = []
+
+    def on_train_batch_end(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        self.times.append(time.perf_counter())
+
+    def on_train_end(self, trainer, pl_module):
+        if trainer.global_rank == 0:
+            with open(self.filepath, 'w') as f:
+                json.dump(self.times, f)
+
+
+CONFIGURATIONS = {
+    'dict': (dict(), dict()),
+    'result': (dict(use_result=True), dict()),
+    'many_metrics': (dict(use_result=True, num_metrics=50), dict()),
+    'multiple_optimizers': (dict(num_optimizers=3), dict()),
+    'tbptt': (dict(tbptt=True), dict(truncated_bptt_steps=TBPTT_STEPS)),
+    'accumulate_grad_batches': (dict(), dict(accumulate_grad_batches=4)),
+    'callbacks': (dict(), dict(callbacks=[NoOpCallback() for _ in range(10)])),
+    'ddp_cpu': (dict(), dict(distributed_backend='ddp_cpu', num_processes=2)),
+}
+
+
+def make_dataloader(tbptt: bool = False) -> DataLoader:
+    # sequences of features for TBPTT
+    sequence = (SEQUENCE_LENGTH,) if tbptt else ()
+    shape = (NUM_STEPS * BATCH_SIZE, *sequence, NUM_FEATURES)
+    generator = torch.Generator().manual_seed(0)
+    dataset = TensorDataset(torch.randn(*shape, generator=generator), torch.randn(*shape, generator=generator))
+    return DataLoader(dataset, batch_size=BATCH_SIZE)
+
+
+def lightning_step_time(model_kwargs: dict, trainer_kwargs: dict, tmpdir) -> float:
+    """The median duration of a training step of ``Trainer.fit``, in seconds."""
+    seed_everything(0)
+    timer = StepTimer(os.path.join(tmpdir, 'step_times.json'))
+    trainer_kwargs = dict(trainer_kwargs)
+    trainer_kwargs['callbacks'] = trainer_kwargs.get('callbacks', []) + [timer]
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_val_batches=0,
+        checkpoint_callback=False,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+        **trainer_kwargs,
+    )
+    trainer.fit(TinyModel(**model_kwargs))
+    with open(timer.filepath) as f:
+        times = json.load(f)
+    return float(np.median(np.diff(times[WARMUP_STEPS:])))
+
+
+def raw_step_time(model_kwargs: dict, trainer_kwargs: dict) -> float:
+    """The median duration of a training step of a plain PyTorch loop over the same model, in seconds."""
+    seed_everything(0)
+    model = TinyModel(**model_kwargs)
+    optimizers = model.configure_optimizers()
+    accumulate_grad_batches = trainer_kwargs.get('accumulate_grad_batches', 1)
+    times = []
+    for batch_idx, batch in enumerate(make_dataloader(model.tbptt)):
+        splits = model.tbptt_split_batch(batch, TBPTT_STEPS) if model.tbptt else [batch]
+        for split in splits:
+            for optimizer_idx, optimizer in enumerate(optimizers):
+                loss = model.loss(split, optimizer_idx) / accumulate_grad_batches
+                loss.backward()
+                if (batch_idx + 1) % accumulate_grad_batches == 0:
+                    optimizer.step()
+                    optimizer.zero_grad()
+        times.append(time.perf_counter())
+    return float(np.median(np.diff(times[WARMUP_STEPS:])))
+
+
+@pytest.fixture(scope='module')
+def results():
+    results = {}
+    yield results
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f'step overhead results saved to {OUTPUT_PATH}')
+
+
+@pytest.mark.parametrize('name', list(CONFIGURATIONS))
+def test_step_overhead(tmpdir, results, name):
+    """
+    Verify that the overhead of Lightning per training step stays under its limit and did not regress
+    """
+    model_kwargs, trainer_kwargs = CONFIGURATIONS[name]
+    if name == 'ddp_cpu' and not torch.distributed.is_available():
+        pytest.skip('requires torch.distributed')
+
+    pl_time = lightning_step_time(model_kwargs, trainer_kwargs, tmpdir)
+    raw_time = raw_step_time(model_kwargs, trainer_kwargs)
+    overhead_ms = 1000 * (pl_time - raw_time)
+    results[name] = {
+        'lightning_step_ms': 1000 * pl_time,
+        'raw_step_ms': 1000 * raw_time,
+        'overhead_ms': overhead_ms,
+        'overhead_ratio': pl_time / raw_time,
+    }
+    print(f'{name}: {1000 * pl_time:.3f} ms per step with Lightning, {1000 * raw_time:.3f} ms without')
+
+    assert overhead_ms < MAX_OVERHEAD_MS[name] * OVERHEAD_SCALE
+    if BASELINE_PATH:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f).get(name)
+        if baseline is not None:
+            assert overhead_ms < baseline['overhead_ms'] * (1 + TOLERANCE), (
+                f"{name} regressed from {baseline['overhead_ms']:.3f} to {overhead_ms:.3f} ms per step"
+            )
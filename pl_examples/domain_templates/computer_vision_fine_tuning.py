@@ -433,7 +433,9 @@ def main(args: argparse.Namespace) -> None:
             num_sanity_val_steps=0,
             gpus=args.gpus,
             min_epochs=args.nb_epochs,
-            max_epochs=args.nb_epochs)
+            max_epochs=args.nb_epochs,
+            # the frozen backbone weights are written only once across checkpoints
+            checkpoint_callback=pl.callbacks.ModelCheckpoint(delta_checkpoints=True))
 
         trainer.fit(model)
 
@@ -33,6 +33,7 @@ Documentation
 - https://pytorch-lightning.readthedocs.io/en/stable
 """
 
+import importlib
 import logging as python_logging
 
 _logger = python_logging.getLogger("lightning")
@@ -71,12 +72,15 @@ else:
         'TrainResult',
     ]
 
-    # necessary for regular bolts imports. Skip exception since bolts is not always installed
-    try:
-        from pytorch_lightning import bolts
-    except ImportError:
-        pass
+    def __getattr__(name):
+        # necessary for regular bolts imports, imported on first use since bolts is not always installed
+        if name == 'bolts':
+            try:
+                return importlib.import_module('pytorch_lightning.bolts')
+            except ImportError:
+                pass
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
     # __call__ = __all__
 
-# for compatibility with namespace packages
-__import__('pkg_resources').declare_namespace(__name__)
+# for compatibility with namespace packages, `pkgutil` is much faster to import than `pkg_resources`
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
@@ -6,4 +6,11 @@ from pytorch_lightning.accelerators.ddp_cpu_spawn_backend import DDPCPUSpawnBack
 from pytorch_lightning.accelerators.dp_backend import DataParallelBackend
 from pytorch_lightning.accelerators.gpu_backend import GPUBackend
 from pytorch_lightning.accelerators.tpu_backend import TPUBackend
-from pytorch_lightning.accelerators.horovod_backend import HorovodBackend
+
+
+def __getattr__(name):
+    # imports `horovod.torch`, which is slow to import, only when the backend is used
+    if name == 'HorovodBackend':
+        from pytorch_lightning.accelerators.horovod_backend import HorovodBackend
+        return HorovodBackend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,7 @@ from pytorch_lightning import accelerators
 import os
 import torch
 from pytorch_lightning.utilities import device_parser
-from pytorch_lightning.utilities import rank_zero_only
+from pytorch_lightning.utilities import HOROVOD_AVAILABLE, rank_zero_only
 from pytorch_lightning.utilities.distributed import rank_zero_warn, rank_zero_info
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from pytorch_lightning import _logger as log
@@ -14,13 +14,6 @@ except ImportError:
 else:
     XLA_AVAILABLE = True
 
-try:
-    import horovod.torch as hvd
-except (ModuleNotFoundError, ImportError):
-    HOROVOD_AVAILABLE = False
-else:
-    HOROVOD_AVAILABLE = True
-
 
 class AcceleratorConnector:
 
@@ -245,6 +238,7 @@ class AcceleratorConnector:
         self.trainer.use_horovod = True
 
         # Initialize Horovod to get rank / size info
+        import horovod.torch as hvd
         hvd.init()
         if self.trainer.on_gpu:
             # Horovod assigns one local GPU per process
@@ -258,6 +252,14 @@ class AcceleratorConnector:
                 'Install with \n $HOROVOD_WITH_PYTORCH=1 pip install horovod[pytorch]'
             )
 
+        try:
+            import horovod.torch  # noqa: F401
+        except ImportError as err:
+            raise MisconfigurationException(
+                'Requested `distributed_backend="horovod"`, but `horovod.torch` can not be imported: '
+                f'{err}. Reinstall with \n $HOROVOD_WITH_PYTORCH=1 pip install horovod[pytorch]'
+            ) from err
+
         if self.trainer.num_gpus > 1 or self.trainer.num_nodes > 1:
             raise MisconfigurationException(
                 'Horovod does not support setting num_nodes / num_gpus explicitly. Use '
@@ -165,3 +165,7 @@ class Accelerator(object):
 
     def early_stopping_should_stop(self, pl_module):
         return self.trainer.should_stop
+
+    def preemption_should_stop(self, preempted: bool, pl_module) -> bool:
+        """Whether any process received a preemption signal, all of them stop at the same step."""
+        return preempted
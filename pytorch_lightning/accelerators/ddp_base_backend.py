@@ -64,6 +64,11 @@ class DDPBase(Accelerator):
         should_stop = stop == self.trainer.world_size
         return should_stop
 
+    def preemption_should_stop(self, preempted, pl_module):
+        stop = torch.tensor(int(preempted), device=pl_module.device)
+        dist.all_reduce(stop, op=dist.ReduceOp.MAX)
+        return bool(stop.item())
+
     def transfer_distrib_spawn_state_on_fit_end(self, model, mp_queue, results):
         if self.trainer.distributed_backend.lower() not in ['ddp_spawn', 'ddp_cpu', 'tpu']:
             return
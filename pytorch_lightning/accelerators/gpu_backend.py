@@ -65,7 +65,8 @@ class GPUBackend(Accelerator):
 
     def __training_step(self, args):
         batch = args[0]
-        batch = self.to_device(batch)
+        with self.trainer.profiler.profile_optional('transfer_batch_to_device'):
+            batch = self.to_device(batch)
         args[0] = batch
         output = self.trainer.model.training_step(*args)
         return output
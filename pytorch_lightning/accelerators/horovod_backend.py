@@ -112,7 +112,8 @@ class HorovodBackend(Accelerator):
     def training_step(self, args):
         if self.trainer.on_gpu:
             batch = args[0]
-            batch = self.batch_to_device(batch, hvd.local_rank())
+            with self.trainer.profiler.profile_optional('transfer_batch_to_device'):
+                batch = self.batch_to_device(batch, hvd.local_rank())
             args[0] = batch
 
         if self.trainer.amp_backend == AMPType.NATIVE:
@@ -159,3 +160,7 @@ class HorovodBackend(Accelerator):
 
     def barrier(self, name: str = None):
         hvd.join()
+
+    def preemption_should_stop(self, preempted, pl_module):
+        stop = hvd.allreduce(torch.tensor(int(preempted)), op=hvd.Sum, name='preemption_signal')
+        return bool(stop.item())
@@ -130,7 +130,8 @@ class TPUBackend(Accelerator):
 
     def training_step(self, args):
         batch = args[0]
-        batch = self.to_device(batch)
+        with self.trainer.profiler.profile_optional('transfer_batch_to_device'):
+            batch = self.to_device(batch)
         args[0] = batch
         output = self.trainer.model.training_step(*args)
         return output
@@ -263,6 +264,11 @@ class TPUBackend(Accelerator):
         should_stop = int(stop.item()) == self.trainer.world_size
         return should_stop
 
+    def preemption_should_stop(self, preempted, pl_module):
+        stop = torch.tensor(int(preempted), device=pl_module.device, dtype=torch.int32)
+        stop = xm.mesh_reduce("preemption_signal", stop, max)
+        return bool(stop.item())
+
     def save_spawn_weights(self, model):
         """
         Dump a temporary checkpoint after ddp ends to get weights out of the process
@@ -6,7 +6,9 @@ from pytorch_lightning.callbacks.gradient_accumulation_scheduler import Gradient
 from pytorch_lightning.callbacks.lr_logger import LearningRateLogger
 from pytorch_lightning.callbacks.lr_monitor import LearningRateMonitor
 from pytorch_lightning.callbacks.model_checkpoint import ModelCheckpoint
+from pytorch_lightning.callbacks.preemption_checkpoint import PreemptionCheckpoint
 from pytorch_lightning.callbacks.progress import ProgressBar, ProgressBarBase
+from pytorch_lightning.callbacks.weight_averaging import WeightAveraging
 
 
 __all__ = [
@@ -18,6 +20,8 @@ __all__ = [
     'LearningRateLogger',
     'LearningRateMonitor',
     'ModelCheckpoint',
+    'PreemptionCheckpoint',
     'ProgressBar',
     'ProgressBarBase',
+    'WeightAveraging',
 ]
@@ -20,18 +20,24 @@ Automatically save model checkpoints during training.
 
 """
 
+import contextlib
 import os
 import re
+import time
 from copy import deepcopy
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 import numpy as np
 import torch
 from pytorch_lightning import _logger as log
 from pytorch_lightning.callbacks.base import Callback
 from pytorch_lightning.utilities import rank_zero_only, rank_zero_warn
+from pytorch_lightning.utilities.checkpoint_manifest import CheckpointManifest
 from pytorch_lightning.utilities.cloud_io import get_filesystem
+from pytorch_lightning.utilities.compressed_checkpoint import COMPRESSION_CODECS
+from pytorch_lightning.utilities.delta_checkpoint import DeltaCheckpointStore
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
+from pytorch_lightning.utilities.reduced_precision_checkpoint import EXPORT_DTYPES
 
 
 class ModelCheckpoint(Callback):
@@ -87,6 +93,31 @@ class ModelCheckpoint(Callback):
             saved (``model.save_weights(filepath)``), else the full model
             is saved (``model.save(filepath)``).
         period: Interval (number of epochs) between checkpoints.
+        max_shard_size: if set, checkpoints are saved as directories in which the model and optimizer
+            tensors are split into shards of at most this many bytes, written and read in parallel.
+            See :mod:`~pytorch_lightning.utilities.sharded_checkpoint`. Default: ``None``.
+        delta_checkpoints: if ``True``, tensors are stored once in a content-addressed blob store inside the
+            checkpoint directory and each checkpoint only writes the tensors which changed since
+            previous saves, e.g. when fine-tuning with a frozen backbone.
+            See :mod:`~pytorch_lightning.utilities.delta_checkpoint`. Default: ``False``.
+        compression: codec used to compress the model and optimizer tensors in parallel,
+            one of ``'zlib'`` or ``'lzma'``. Compressed checkpoints are loaded as any other checkpoint.
+            See :mod:`~pytorch_lightning.utilities.compressed_checkpoint`. Default: ``None``.
+        train_time_interval: if set, the ``last`` checkpoint is also saved whenever this many seconds of
+            training passed since the previous one, at the end of a training batch. It resumes training
+            in the middle of the epoch, which bounds the lost compute when epochs are long. It is a full
+            checkpoint whatever ``save_weights_only`` and ``export_dtype``. Requires ``save_last=True``.
+            Default: ``None``.
+        export_dtype: if set, checkpoints only hold the model weights with floating point tensors cast to this
+            dtype, e.g. ``'float16'`` or ``'bfloat16'``, for deployment. They can not resume training, loading
+            them casts the weights back. See :mod:`~pytorch_lightning.utilities.reduced_precision_checkpoint`.
+            Default: ``None``.
+        dtype_policy: the dtypes of the exported tensors, by ``fnmatch`` pattern of their ``state_dict`` keys,
+            ``None`` keeps the original dtype. Default: ``None``.
+        manifest: if ``True``, every saved checkpoint is recorded in a ``checkpoints.json`` manifest next to it,
+            with its global step, epoch, monitored score and size. The top k checkpoints are restored from it
+            when resuming, without listing the directory.
+            See :mod:`~pytorch_lightning.utilities.checkpoint_manifest`. Default: ``False``.
 
     Example::
 
@@ -127,6 +158,13 @@ class ModelCheckpoint(Callback):
         mode: str = "auto",
         period: int = 1,
         prefix: str = "",
+        max_shard_size: Optional[int] = None,
+        delta_checkpoints: bool = False,
+        compression: Optional[str] = None,
+        train_time_interval: Optional[float] = None,
+        export_dtype: Optional[Union[str, torch.dtype]] = None,
+        dtype_policy: Optional[Dict[str, Optional[Union[str, torch.dtype]]]] = None,
+        manifest: bool = False,
     ):
         super().__init__()
         self.monitor = monitor
@@ -137,6 +175,20 @@ class ModelCheckpoint(Callback):
         self.period = period
         self.epoch_last_check = None
         self.prefix = prefix
+        self.max_shard_size = max_shard_size
+        self.delta_checkpoints = delta_checkpoints
+        self.compression = compression
+        self.train_time_interval = train_time_interval
+        self.export_dtype = export_dtype
+        self.dtype_policy = dtype_policy
+        self.manifest = manifest
+        self._last_time_check = None
+        self._train_time_step = None
+        self._delta_store = None
+        self._manifest = None
+        self._listings = {}
+        self._created_dirs = set()
+        self._stale_checkpoints = []
         self.best_k_models = {}
         self.kth_best_model_path = ""
         self.best_model_score = 0
@@ -155,6 +207,21 @@ class ModelCheckpoint(Callback):
         """
         self.__resolve_ckpt_dir(trainer, pl_module)
 
+    def on_train_start(self, trainer, pl_module):
+        self._last_time_check = time.monotonic()
+
+    def on_train_batch_end(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        """
+        checkpoints can be saved every ``train_time_interval`` seconds at the end of a training batch
+        """
+        if self.train_time_interval is None or trainer.running_sanity_check:
+            return
+        now = time.monotonic()
+        if now - self._last_time_check < self.train_time_interval:
+            return
+        self._last_time_check = now
+        self.save_train_time_checkpoint(trainer, pl_module)
+
     def on_validation_end(self, trainer, pl_module):
         """
         checkpoints can be saved at the end of the val loop
@@ -170,6 +237,7 @@ class ModelCheckpoint(Callback):
     def on_load_checkpoint(self, checkpointed_state: Dict[str, Any]):
         self.best_model_score = checkpointed_state["best_model_score"]
         self.best_model_path = checkpointed_state["best_model_path"]
+        self.load_top_k_from_manifest()
 
     @rank_zero_only
     def save_checkpoint(self, trainer, pl_module):
@@ -203,25 +271,65 @@ class ModelCheckpoint(Callback):
         # what can be monitored
         monitor_candidates = self._monitor_candidates(trainer)
 
-        # ie: path/val_loss=0.5.ckpt
-        filepath = self._get_metric_interpolated_filepath_name(epoch, monitor_candidates)
+        with self._batched_housekeeping():
+            # ie: path/val_loss=0.5.ckpt
+            filepath = self._get_metric_interpolated_filepath_name(epoch, monitor_candidates)
 
-        # callback supports multiple simultaneous modes
-        # here we call each mode sequentially
-        # Mode 1: save the last checkpoint
-        self._save_last_checkpoint(trainer, pl_module, epoch, monitor_candidates, filepath)
+            # callback supports multiple simultaneous modes
+            # here we call each mode sequentially
+            # Mode 1: save the last checkpoint
+            self._save_last_checkpoint(trainer, pl_module, epoch, monitor_candidates, filepath)
 
-        # Mode 2: save all checkpoints OR only the top k
-        if self.monitor is not None:
-            if self.save_top_k == -1:
-                self._save_all_checkpoints(trainer, pl_module, epoch, filepath)
-            else:
-                self._save_top_k_checkpoints(monitor_candidates, trainer, pl_module, epoch, filepath)
+            # Mode 2: save all checkpoints OR only the top k
+            if self.monitor is not None:
+                if self.save_top_k == -1:
+                    self._save_all_checkpoints(trainer, pl_module, epoch, filepath)
+                else:
+                    self._save_top_k_checkpoints(monitor_candidates, trainer, pl_module, epoch, filepath)
+
+    @rank_zero_only
+    def save_train_time_checkpoint(self, trainer, pl_module):
+        """
+        Saves the ``last`` checkpoint in the middle of an epoch, replacing the previous last checkpoint.
+        Used by ``train_time_interval`` and when the ``max_time`` budget of the trainer is reached, only with
+        ``save_last=True``. The checkpoint always holds the full training state, to resume from it.
+        """
+        if not self.save_last or self.save_top_k == 0 or trainer.running_sanity_check:
+            return
+
+        epoch = trainer.current_epoch
+        filename = self._format_checkpoint_name(
+            self.CHECKPOINT_NAME_LAST, epoch, self._monitor_candidates(trainer), prefix=self.prefix
+        )
+        filepath = os.path.join(self.dirpath, f"{filename}.ckpt")
+        if self.verbose:
+            log.info(f"Epoch {epoch:d}, global step {trainer.global_step}: saving model to {filepath}")
+
+        with self._batched_housekeeping():
+            self._save_model(filepath, trainer, pl_module, resumable=True)
+            self._add_to_manifest(filepath, trainer, kind='last')
+            if self.last_model_path and self.last_model_path != filepath:
+                self._del_model(self.last_model_path)
+        self.last_model_path = filepath
+        self._train_time_step = trainer.global_step
 
     def __validate_init_configuration(self):
         if self.save_top_k != 1 and self.monitor is None:
             raise MisconfigurationException('To save checkpoints for a top_k metric, '
                                             'ModelCheckpoint(monitor) cannot be None')
+        if sum((self.max_shard_size is not None, self.delta_checkpoints, self.compression is not None)) > 1:
+            raise MisconfigurationException('Only one of ModelCheckpoint(max_shard_size),'
+                                            ' ModelCheckpoint(delta_checkpoints) and ModelCheckpoint(compression)'
+                                            ' can be set')
+        if self.compression is not None and self.compression not in COMPRESSION_CODECS:
+            raise MisconfigurationException(f'ModelCheckpoint(compression={self.compression}) is not supported,'
+                                            f' choose one of {list(COMPRESSION_CODECS)}')
+        if self.train_time_interval is not None and not self.save_last:
+            raise MisconfigurationException('ModelCheckpoint(train_time_interval) saves the last checkpoint,'
+                                            ' it requires ModelCheckpoint(save_last=True)')
+        if isinstance(self.export_dtype, str) and self.export_dtype not in EXPORT_DTYPES:
+            raise MisconfigurationException(f'ModelCheckpoint(export_dtype={self.export_dtype}) is not supported,'
+                                            f' choose one of {list(EXPORT_DTYPES)}')
 
     def __init_ckpt_dir(self, filepath, save_top_k):
         self._fs = get_filesystem(filepath if filepath is not None else "")
@@ -262,24 +370,124 @@ class ModelCheckpoint(Callback):
 
         self.kth_value, self.mode = mode_dict[mode]
 
+    @contextlib.contextmanager
+    def _batched_housekeeping(self):
+        """
+        Groups the filesystem operations of a save, which are round-trips on remote storage: the checkpoint
+        directory is listed at most once, replaced checkpoints are deleted in one bulk call at the end
+        and the manifest is written once.
+        """
+        self._listings = {}
+        with contextlib.ExitStack() as stack:
+            if self.manifest:
+                stack.enter_context(self._get_manifest(self.dirpath).batch())
+            yield
+            self._remove_stale_checkpoints()
+
+    def _existing_names(self, dirpath: str):
+        """The file names in ``dirpath``, listed once per save."""
+        if dirpath not in self._listings:
+            try:
+                paths = self._fs.ls(dirpath, detail=False)
+            except FileNotFoundError:
+                paths = []
+            self._listings[dirpath] = set(os.path.basename(path.rstrip('/')) for path in paths)
+        return self._listings[dirpath]
+
     def _del_model(self, filepath: str):
-        if self._fs.exists(filepath):
-            self._fs.rm(filepath)
+        # deleted by `_remove_stale_checkpoints` at the end of the save
+        self._stale_checkpoints.append(filepath)
 
-    def _save_model(self, filepath: str, trainer, pl_module):
+    def _remove_stale_checkpoints(self):
+        stale, self._stale_checkpoints = self._stale_checkpoints, []
+        if not stale:
+            return
+        if self._delta_store is not None:
+            # keeps the blobs which are still referenced by other checkpoints
+            for filepath in stale:
+                self._delta_store.remove(filepath)
+        else:
+            existing = [p for p in stale if os.path.basename(p) in self._existing_names(os.path.dirname(p))]
+            if existing:
+                # sharded checkpoints are directories
+                self._fs.rm(existing, recursive=True)
+        if not self.manifest:
+            return
+        for dirpath in set(os.path.dirname(p) for p in stale):
+            self._get_manifest(dirpath).remove(*[p for p in stale if os.path.dirname(p) == dirpath])
+
+    def _save_model(self, filepath: str, trainer, pl_module, resumable: bool = False):
 
         # in debugging, track when we save checkpoints
         trainer.dev_debugger.track_checkpointing_history(filepath)
 
         # make paths
-        self._fs.makedirs(os.path.dirname(filepath), exist_ok=True)
+        dirpath = os.path.dirname(filepath)
+        if dirpath not in self._created_dirs:
+            self._fs.makedirs(dirpath, exist_ok=True)
+            self._created_dirs.add(dirpath)
 
         # delegate the saving to the model
         if self.save_function is not None:
-            self.save_function(filepath, self.save_weights_only)
+            save_kwargs = {}
+            if self.max_shard_size is not None:
+                save_kwargs['max_shard_size'] = self.max_shard_size
+            if self.delta_checkpoints:
+                save_kwargs['delta_store'] = self._get_delta_store(os.path.dirname(filepath))
+            if self.compression is not None:
+                save_kwargs['compression'] = self.compression
+            # checkpoints resuming training hold the full state, not a weights-only export
+            if self.export_dtype is not None and not resumable:
+                save_kwargs['export_dtype'] = self.export_dtype
+                save_kwargs['dtype_policy'] = self.dtype_policy
+            self.save_function(filepath, self.save_weights_only and not resumable, **save_kwargs)
         else:
             raise ValueError(".save_function() not set")
 
+    def _get_delta_store(self, dirpath: str) -> DeltaCheckpointStore:
+        if self._delta_store is None or self._delta_store.dirpath != dirpath:
+            self._delta_store = DeltaCheckpointStore(dirpath)
+        return self._delta_store
+
+    def _get_manifest(self, dirpath: str) -> CheckpointManifest:
+        if self._manifest is None or self._manifest.dirpath != dirpath:
+            self._manifest = CheckpointManifest(dirpath)
+        return self._manifest
+
+    def _add_to_manifest(self, filepath: str, trainer, kind: str, current: Optional[torch.Tensor] = None):
+        if not self.manifest:
+            return
+        self._get_manifest(os.path.dirname(filepath)).add(
+            filepath,
+            step=trainer.global_step,
+            epoch=trainer.current_epoch,
+            score=None if current is None else float(current),
+            monitor=self.monitor,
+            kind=kind,
+        )
+
+    def load_top_k_from_manifest(self):
+        """Restores the top k checkpoints from the manifest of the checkpoint directory."""
+        if not self.manifest or self.dirpath is None or self.monitor is None or self.save_top_k <= 0:
+            return
+        if not CheckpointManifest.exists(self.dirpath):
+            return
+
+        manifest = self._get_manifest(self.dirpath)
+        top_k_paths = set(manifest.paths(kind='top_k'))
+        scores = {path: score for path, score in manifest.scores(self.monitor).items() if path in top_k_paths}
+        if not scores:
+            return
+
+        reverse = self.mode != "min"
+        best_paths = sorted(scores, key=scores.get, reverse=reverse)[:self.save_top_k]
+        self.best_k_models = {path: torch.tensor(scores[path]) for path in best_paths}
+        if len(self.best_k_models) == self.save_top_k:
+            self.kth_best_model_path = best_paths[-1]
+            self.kth_value = self.best_k_models[self.kth_best_model_path]
+        self.best_model_path = best_paths[0]
+        self.best_model_score = self.best_k_models[self.best_model_path]
+
     def check_monitor_top_k(self, current) -> bool:
         less_than_k_models = len(self.best_k_models) < self.save_top_k
         if less_than_k_models:
@@ -424,7 +632,7 @@ class ModelCheckpoint(Callback):
     def _get_metric_interpolated_filepath_name(self, epoch, ckpt_name_metrics):
         filepath = self.format_checkpoint_name(epoch, ckpt_name_metrics)
         version_cnt = 0
-        while self._fs.exists(filepath):
+        while os.path.basename(filepath) in self._existing_names(os.path.dirname(filepath)):
             filepath = self.format_checkpoint_name(
                 epoch, ckpt_name_metrics, ver=version_cnt
             )
@@ -452,7 +660,12 @@ class ModelCheckpoint(Callback):
             )
             last_filepath = os.path.join(self.dirpath, f"{filename}.ckpt")
 
+        # already saved at this step by `save_train_time_checkpoint`, with the full state to resume from
+        if last_filepath == self.last_model_path and self._train_time_step == trainer.global_step:
+            return
+
         self._save_model(last_filepath, trainer, pl_module)
+        self._add_to_manifest(last_filepath, trainer, kind='last')
         if self.last_model_path and self.last_model_path != last_filepath:
             self._del_model(self.last_model_path)
         self.last_model_path = last_filepath
@@ -486,6 +699,8 @@ class ModelCheckpoint(Callback):
 
         assert (trainer.global_rank == 0), "tried to make a checkpoint from non global_rank=0"
         self._save_model(filepath, trainer, pl_module)
+        current = trainer.logger_connector.callback_metrics.get(self.monitor)
+        self._add_to_manifest(filepath, trainer, kind='all', current=current)
 
     def _is_valid_monitor_key(self, metrics):
         return self.monitor in metrics or len(metrics) == 0
@@ -526,6 +741,7 @@ class ModelCheckpoint(Callback):
                 f" saving model to {filepath} as top {self.save_top_k}"
             )
         self._save_model(filepath, trainer, pl_module)
+        self._add_to_manifest(filepath, trainer, kind='top_k', current=current)
 
         for cur_path in del_list:
             if cur_path != filepath:
@@ -0,0 +1,151 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Preemption Checkpoint
+=====================
+
+Saves a checkpoint and stops training when the job is about to be preempted.
+
+"""
+
+import copy
+import os
+import signal
+import threading
+from subprocess import call
+from typing import Any, Optional, Sequence
+
+import torch
+
+from pytorch_lightning import _logger as log
+from pytorch_lightning.callbacks.base import Callback
+
+
+class Preempted(KeyboardInterrupt):
+    """Raised at the step boundary following a preemption signal, it stops training gracefully."""
+
+
+class PreemptionCheckpoint(Callback):
+    r"""
+    Checkpoints the training state when one of ``signals`` is received, e.g. the ``SIGUSR1`` SLURM sends
+    ahead of the end of a job or the ``SIGTERM`` of a preemptible cloud instance.
+
+    The signal handler only raises a flag. At the end of the running training step, which is when the flag is
+    shared between the processes of distributed training so they all stop at the same step, the model and
+    optimizer states are copied to host memory. A background thread writes them as an HPC checkpoint in
+    ``trainer.weights_save_path`` and then requeues the SLURM job, while the trainer shuts down. ``fit``
+    returns once the checkpoint is written. Starting the job again with the same ``weights_save_path``
+    restores this checkpoint and resumes at the next step, also in the middle of an epoch.
+
+    Args:
+        signals: the signals to handle. Default: ``SIGUSR1`` and ``SIGTERM``.
+        requeue: requeue the SLURM job with ``scontrol requeue`` once the checkpoint is written.
+            Default: ``True`` when running in a SLURM job.
+
+    Example::
+
+        >>> import signal
+        >>> from pytorch_lightning import Trainer
+        >>> from pytorch_lightning.callbacks import PreemptionCheckpoint
+        >>> trainer = Trainer(callbacks=[PreemptionCheckpoint(signals=[signal.SIGTERM])])
+    """
+
+    def __init__(self, signals: Optional[Sequence[int]] = None, requeue: Optional[bool] = None):
+        super().__init__()
+        if signals is None:
+            # SIGUSR1 does not exist on Windows
+            signals = [s for s in (getattr(signal, 'SIGUSR1', None), signal.SIGTERM) if s is not None]
+        if requeue is None:
+            requeue = 'SLURM_JOB_ID' in os.environ and os.environ.get('SLURM_JOB_NAME') != 'bash'
+        self.signals = list(signals)
+        self.requeue = requeue
+        self.preempted = False
+        self.last_checkpoint_path = None
+        self._previous_handlers = {}
+        self._writer = None
+
+    def on_train_start(self, trainer, pl_module):
+        self.preempted = False
+        # handlers can only be set from the main thread, e.g. not in a spawned DDP process thread
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in self.signals:
+            self._previous_handlers[signum] = signal.signal(signum, self._handle_signal)
+
+    def on_train_batch_end(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        # the processes which did not receive the signal stop at the same step as the others
+        self.preempted = trainer.accelerator_backend.preemption_should_stop(self.preempted, pl_module)
+        if not self.preempted:
+            return
+
+        # the optimizer step of this batch is done, it is a safe boundary to stop at
+        if trainer.is_global_zero:
+            filepath = trainer.checkpoint_connector.hpc_checkpoint_path(trainer.weights_save_path)
+            checkpoint = trainer.checkpoint_connector.dump_checkpoint()
+            pl_module.on_hpc_save(checkpoint)
+            checkpoint = _to_host(checkpoint)
+
+            log.info(f'Preempted at global step {trainer.global_step}, saving a checkpoint to {filepath}...')
+            self.last_checkpoint_path = filepath
+            # not a daemon, the interpreter waits for the checkpoint before exiting
+            self._writer = threading.Thread(target=self._write, args=(trainer, checkpoint, filepath))
+            self._writer.start()
+        raise Preempted()
+
+    def on_fit_end(self, trainer, pl_module):
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def on_train_end(self, trainer, pl_module):
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
+
+    def _write(self, trainer, checkpoint, filepath):
+        trainer.checkpoint_connector.hpc_write(checkpoint, filepath)
+        log.info(f'Saved preemption checkpoint {filepath}')
+        # the job is stopped by the requeue, only once the checkpoint is written
+        if self.requeue:
+            self._requeue()
+
+    def _handle_signal(self, signum, frame):  # pragma: no-cover
+        log.info(f'Received signal {signum}, stopping at the end of the training step')
+        self.preempted = True
+
+    @staticmethod
+    def _requeue():
+        job_id = os.environ['SLURM_JOB_ID']
+        log.info(f'requeing job {job_id}...')
+        result = call(['scontrol', 'requeue', job_id])
+        if result == 0:
+            log.info(f'requeued exp {job_id}')
+        else:
+            log.warning('requeue failed...')
+
+
+def _to_host(data: Any) -> Any:
+    """Copies the device tensors of a checkpoint to host memory, keeping attributes like the state dict metadata."""
+    if isinstance(data, torch.Tensor):
+        # host tensors are not copied, training stops before they are modified again
+        return data.detach().cpu()
+    if isinstance(data, dict):
+        new_data = copy.copy(data)
+        for k, v in data.items():
+            new_data[k] = _to_host(v)
+        return new_data
+    if isinstance(data, (list, tuple)) and not hasattr(data, '_fields'):
+        return type(data)(_to_host(v) for v in data)
+    return data
@@ -0,0 +1,109 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Weight Averaging
+================
+
+Averages the weights of the model over the training epochs.
+
+"""
+
+import os
+from typing import Optional
+
+from pytorch_lightning import _logger as log
+from pytorch_lightning.callbacks.base import Callback
+from pytorch_lightning.utilities.checkpoint_averaging import StateDictAverage, update_bn
+from pytorch_lightning.utilities.exceptions import MisconfigurationException
+
+
+class WeightAveraging(Callback):
+    r"""
+    Keeps a running average of the model weights at the end of the training epochs, as in stochastic weight
+    averaging. The average is kept in host memory, a single copy of the weights whatever the number of epochs.
+
+    At the end of training the averaged weights are loaded into the model and saved as a weights-only
+    checkpoint. Integer buffers take the values of the last epoch and, with ``update_bn``, the statistics of
+    the batch normalization layers are recomputed for the averaged weights over the training data.
+    See :mod:`~pytorch_lightning.utilities.checkpoint_averaging` to average saved checkpoints instead.
+
+    Args:
+        filepath: where the averaged checkpoint is saved. Default: ``averaged.ckpt`` in the directory of the
+            ``ModelCheckpoint`` callback, or else in ``trainer.weights_save_path``.
+        start_epoch: the first epoch averaged.
+        every_n_epochs: the interval in epochs between two averaged epochs.
+        update_bn: recompute the batch normalization statistics with one pass of the ``training_step`` over the
+            training data, without gradients.
+
+    Example::
+
+        >>> from pytorch_lightning import Trainer
+        >>> from pytorch_lightning.callbacks import WeightAveraging
+        >>> trainer = Trainer(max_epochs=20, callbacks=[WeightAveraging(start_epoch=15)])
+    """
+
+    def __init__(
+            self,
+            filepath: Optional[str] = None,
+            start_epoch: int = 0,
+            every_n_epochs: int = 1,
+            update_bn: bool = True,
+    ):
+        super().__init__()
+        if start_epoch < 0 or every_n_epochs < 1:
+            raise MisconfigurationException(
+                f'Invalid `start_epoch={start_epoch}` or `every_n_epochs={every_n_epochs}` for WeightAveraging.'
+            )
+        self.filepath = filepath
+        self.start_epoch = start_epoch
+        self.every_n_epochs = every_n_epochs
+        self.update_bn = update_bn
+        self.averaged_model_path = None
+        self._average = None
+
+    def on_train_start(self, trainer, pl_module):
+        self._average = StateDictAverage(device='cpu')
+
+    def on_train_epoch_end(self, trainer, pl_module):
+        epoch = trainer.current_epoch
+        if epoch < self.start_epoch or (epoch - self.start_epoch) % self.every_n_epochs != 0:
+            return
+        self._average.update(pl_module.state_dict())
+
+    def on_train_end(self, trainer, pl_module):
+        if self._average is None or self._average.num_averaged == 0:
+            return
+
+        pl_module.load_state_dict(self._average.state_dict())
+        if self.update_bn and trainer.train_dataloader is not None:
+
+            def training_step(batch, batch_idx):
+                batch = pl_module.transfer_batch_to_device(batch, pl_module.device)
+                args = trainer.train_loop.build_train_args(batch, batch_idx, 0, None)
+                return pl_module.training_step(*args)
+
+            update_bn(
+                pl_module, trainer.train_dataloader, max_batches=trainer.num_training_batches, forward=training_step
+            )
+
+        filepath = self.filepath
+        if filepath is None:
+            checkpoint_callback = trainer.checkpoint_callback
+            dirpath = checkpoint_callback.dirpath if checkpoint_callback else None
+            filepath = os.path.join(dirpath or trainer.weights_save_path, 'averaged.ckpt')
+        log.info(f'Saving the average of the weights of {self._average.num_averaged} epochs to {filepath}')
+        trainer.save_checkpoint(filepath, weights_only=True)
+        self.averaged_model_path = filepath
+        self._average = None
@@ -16,6 +16,7 @@ import ast
 import csv
 import inspect
 import os
+import time
 from argparse import Namespace
 from typing import Union, Dict, Any, Optional, Callable, MutableMapping
 
@@ -24,18 +25,14 @@ import torch
 import yaml
 
 from pytorch_lightning import _logger as log
-from pytorch_lightning.utilities import rank_zero_warn, AttributeDict
+from pytorch_lightning.utilities import OMEGACONF_AVAILABLE, rank_zero_warn, AttributeDict
 from pytorch_lightning.utilities.cloud_io import load as pl_load
 from pytorch_lightning.utilities.cloud_io import get_filesystem
+from pytorch_lightning.utilities.memory import peak_memory_mb
 
 
 PRIMITIVE_TYPES = (bool, int, float, str)
 ALLOWED_CONFIG_TYPES = (AttributeDict, MutableMapping, Namespace)
-try:
-    from omegaconf import OmegaConf
-except ImportError:
-    OmegaConf = None
-
 # the older shall be on the top
 CHECKPOINT_PAST_HPARAMS_KEYS = (
     'hparams',
@@ -56,6 +53,7 @@ class ModelIO(object):
         map_location: Optional[Union[Dict[str, str], str, torch.device, int, Callable]] = None,
         hparams_file: Optional[str] = None,
         strict: bool = True,
+        lazy: bool = False,
         **kwargs,
     ):
         r"""
@@ -90,6 +88,12 @@ class ModelIO(object):
                 `hparams` as :class:`~dict`.
             strict: Whether to strictly enforce that the keys in :attr:`checkpoint_path` match the keys
                 returned by this module's state dict. Default: `True`.
+            lazy: Only load what is needed to build the model, e.g. for inference. The optimizer states
+                are dropped. Only the ``state_dict`` shards of sharded checkpoints are read, and with
+                torch >= 2.1 local checkpoint files are memory-mapped, so tensors are only read while
+                they are copied into the model. With older versions of torch, other checkpoints are read
+                whole and ``lazy`` does not lower the peak memory of the load. The load time and how much
+                it raised the peak memory of the process are logged. Default: `False`.
             hparam_overrides: A dictionary with keys to override in the hparams
             kwargs: Any keyword args needed to init the model.
 
@@ -127,10 +131,12 @@ class ModelIO(object):
                 pretrained_model.freeze()
                 y_hat = pretrained_model(x)
         """
+        start_time = time.perf_counter()
+        peak_memory_before = peak_memory_mb() if lazy else None
         if map_location is not None:
-            checkpoint = pl_load(checkpoint_path, map_location=map_location)
+            checkpoint = pl_load(checkpoint_path, map_location=map_location, weights_only=lazy)
         else:
-            checkpoint = pl_load(checkpoint_path, map_location=lambda storage, loc: storage)
+            checkpoint = pl_load(checkpoint_path, map_location=lambda storage, loc: storage, weights_only=lazy)
 
         if hparams_file is not None:
             extension = hparams_file.split('.')[-1]
@@ -153,6 +159,13 @@ class ModelIO(object):
         checkpoint[cls.CHECKPOINT_HYPER_PARAMS_KEY].update(kwargs)
 
         model = cls._load_model_state(checkpoint, *args, strict=strict, **kwargs)
+
+        if lazy:
+            message = f'Loaded {cls.__name__} from {checkpoint_path} in {time.perf_counter() - start_time:.3f}s'
+            if peak_memory_before is not None:
+                # the peak of the whole process, it only grows when the load needs more memory than before
+                message += f', peak memory raised by {peak_memory_mb() - peak_memory_before:.1f} MB'
+            log.info(message)
         return model
 
     @classmethod
@@ -359,7 +372,9 @@ def save_hparams_to_yaml(config_yaml, hparams: Union[dict, Namespace]) -> None:
         hparams = dict(hparams)
 
     # saving with OmegaConf objects
-    if OmegaConf is not None:
+    if OMEGACONF_AVAILABLE:
+        from omegaconf import OmegaConf
+
         if OmegaConf.is_config(hparams):
             OmegaConf.save(hparams, config_yaml, resolve=True)
             return
@@ -1,50 +1,39 @@
+import importlib
 from os import environ
 
 from pytorch_lightning.loggers.base import LightningLoggerBase, LoggerCollection
 from pytorch_lightning.loggers.csv_logs import CSVLogger
 from pytorch_lightning.loggers.tensorboard import TensorBoardLogger
 
+# the loggers of third-party services are only imported when they are used, as their clients are slow to import
+_OPTIONAL_LOGGERS = {
+    'CometLogger': 'pytorch_lightning.loggers.comet',
+    'MLFlowLogger': 'pytorch_lightning.loggers.mlflow',
+    'NeptuneLogger': 'pytorch_lightning.loggers.neptune',
+    'TestTubeLogger': 'pytorch_lightning.loggers.test_tube',
+    'WandbLogger': 'pytorch_lightning.loggers.wandb',
+}
+
 __all__ = [
     'LightningLoggerBase',
     'LoggerCollection',
     'TensorBoardLogger',
     'CSVLogger',
+    *_OPTIONAL_LOGGERS,
 ]
 
-try:
-    # needed to prevent ImportError and duplicated logs.
-    environ["COMET_DISABLE_AUTO_LOGGING"] = "1"
-
-    from pytorch_lightning.loggers.comet import CometLogger
-except ImportError:  # pragma: no-cover
-    del environ["COMET_DISABLE_AUTO_LOGGING"]  # pragma: no-cover
-else:
-    __all__.append('CometLogger')
-
-try:
-    from pytorch_lightning.loggers.mlflow import MLFlowLogger
-except ImportError:  # pragma: no-cover
-    pass  # pragma: no-cover
-else:
-    __all__.append('MLFlowLogger')
 
-try:
-    from pytorch_lightning.loggers.neptune import NeptuneLogger
-except ImportError:  # pragma: no-cover
-    pass  # pragma: no-cover
-else:
-    __all__.append('NeptuneLogger')
+def __getattr__(name):
+    if name not in _OPTIONAL_LOGGERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name == 'CometLogger':
+        # needed to prevent ImportError and duplicated logs.
+        environ["COMET_DISABLE_AUTO_LOGGING"] = "1"
+    logger = getattr(importlib.import_module(_OPTIONAL_LOGGERS[name]), name)
+    # later lookups do not go through `__getattr__`
+    globals()[name] = logger
+    return logger
 
-try:
-    from pytorch_lightning.loggers.test_tube import TestTubeLogger
-except ImportError:  # pragma: no-cover
-    pass  # pragma: no-cover
-else:
-    __all__.append('TestTubeLogger')
 
-try:
-    from pytorch_lightning.loggers.wandb import WandbLogger
-except ImportError:  # pragma: no-cover
-    pass  # pragma: no-cover
-else:
-    __all__.append('WandbLogger')
+def __dir__():
+    return sorted(list(globals()) + list(_OPTIONAL_LOGGERS))
@@ -19,26 +19,20 @@ TensorBoard
 
 import os
 from argparse import Namespace
-from typing import Any, Dict, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 from warnings import warn
 
 import torch
-from pkg_resources import parse_version
-from torch.utils.tensorboard import SummaryWriter
 
 from pytorch_lightning import _logger as log
 from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.core.saving import save_hparams_to_yaml
 from pytorch_lightning.loggers.base import LightningLoggerBase, rank_zero_experiment
-from pytorch_lightning.utilities import rank_zero_only, rank_zero_warn
+from pytorch_lightning.utilities import OMEGACONF_AVAILABLE, TORCH_VERSION, rank_zero_only, rank_zero_warn
 from pytorch_lightning.utilities.cloud_io import get_filesystem
 
-try:
-    from omegaconf import Container, OmegaConf
-except ImportError:
-    OMEGACONF_AVAILABLE = False
-else:
-    OMEGACONF_AVAILABLE = True
+if TYPE_CHECKING:
+    from torch.utils.tensorboard import SummaryWriter
 
 
 class TensorBoardLogger(LightningLoggerBase):
@@ -124,7 +118,7 @@ class TensorBoardLogger(LightningLoggerBase):
 
     @property
     @rank_zero_experiment
-    def experiment(self) -> SummaryWriter:
+    def experiment(self) -> 'SummaryWriter':
         r"""
         Actual tensorboard object. To use TensorBoard features in your
         :class:`~pytorch_lightning.core.lightning.LightningModule` do the following.
@@ -140,6 +134,9 @@ class TensorBoardLogger(LightningLoggerBase):
         assert rank_zero_only.rank == 0, 'tried to init log dirs in non global_rank=0'
         if self.root_dir:
             self._fs.makedirs(self.root_dir, exist_ok=True)
+        # imported on first use, tensorboard and its protobufs are slow to import
+        from torch.utils.tensorboard import SummaryWriter
+
         self._experiment = SummaryWriter(log_dir=self.log_dir, **self._kwargs)
         return self._experiment
 
@@ -149,6 +146,9 @@ class TensorBoardLogger(LightningLoggerBase):
         params = self._convert_params(params)
 
         # store params to output
+        if OMEGACONF_AVAILABLE:
+            from omegaconf import Container, OmegaConf
+
         if OMEGACONF_AVAILABLE and isinstance(params, Container):
             self.hparams = OmegaConf.merge(self.hparams, params)
         else:
@@ -158,7 +158,7 @@ class TensorBoardLogger(LightningLoggerBase):
         params = self._flatten_dict(params)
         params = self._sanitize_params(params)
 
-        if parse_version(torch.__version__) < parse_version("1.3.0"):
+        if TORCH_VERSION < (1, 3, 0):
             warn(
                 f"Hyperparameter logging is not available for Torch version {torch.__version__}."
                 " Skipping log_hyperparams. Upgrade to Torch 1.3.0 or above to enable"
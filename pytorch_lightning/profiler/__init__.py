@@ -19,6 +19,15 @@ PyTorch Lightning supports profiling standard actions in the training loop out o
 - training_step_end
 - on_training_end
 
+Some actions are nested in the actions above or also run outside of training, so they are only profiled
+for the profilers which record them, listed in their ``OPTIONAL_ACTIONS``. The `SimpleProfiler` and
+`AdvancedProfiler` do not record them, so their reports do not count the same time twice:
+
+- training_step, the user's ``training_step`` within ``model_forward``
+- transfer_batch_to_device, the transfer of the training batches within ``training_step`` on GPU, on TPU and with Horovod
+- run_evaluation, the validation loop run during training
+- save_checkpoint
+
 Enable simple profiling
 -----------------------
 
@@ -35,18 +44,39 @@ The profiler's results will be printed at the completion of a training `fit()`.
 
     Profiler Report
 
-    Action                  |  Mean duration (s)    |  Total time (s)
-    -----------------------------------------------------------------
-    on_epoch_start          |  5.993e-06            |  5.993e-06
-    get_train_batch         |  0.0087412            |  16.398
-    on_batch_start          |  5.0865e-06           |  0.0095372
-    model_forward           |  0.0017818            |  3.3408
-    model_backward          |  0.0018283            |  3.4282
-    on_after_backward       |  4.2862e-06           |  0.0080366
-    optimizer_step          |  0.0011072            |  2.0759
-    on_batch_end            |  4.5202e-06           |  0.0084753
-    on_epoch_end            |  3.919e-06            |  3.919e-06
-    on_train_end            |  5.449e-06            |  5.449e-06
+    Action                |  Mean duration (s)  |  p50 (s)     |  p90 (s)     |  p99 (s)     |  Count |  Total time (s)
+    -----------------------------------------------------------------------------------------------------------------
+    on_epoch_start        |  5.993e-06           |  5.9898e-06  |  5.9898e-06  |  5.9898e-06  |  1      |  5.993e-06
+    get_train_batch       |  0.0087412           |  0.0084091   |  0.010214    |  0.013542    |  1876   |  16.398
+    on_batch_start        |  5.0865e-06          |  4.9901e-06  |  6.0101e-06  |  8.0205e-06  |  1875   |  0.0095372
+    model_forward         |  0.0017818           |  0.0017492   |  0.0019021   |  0.0023512   |  1875   |  3.3408
+    model_backward        |  0.0018283           |  0.0018017   |  0.0019409   |  0.0024017   |  1875   |  3.4282
+    on_after_backward     |  4.2862e-06          |  4.0101e-06  |  5.0102e-06  |  7.0191e-06  |  1875   |  0.0080366
+    optimizer_step        |  0.0011072           |  0.0010891   |  0.0011874   |  0.0014583   |  1875   |  2.0759
+    on_batch_end          |  4.5202e-06          |  4.4191e-06  |  5.0102e-06  |  7.0191e-06  |  1875   |  0.0084753
+    on_epoch_end          |  3.919e-06           |  3.9205e-06  |  3.9205e-06  |  3.9205e-06  |  1      |  3.919e-06
+    on_train_end          |  5.449e-06           |  5.4502e-06  |  5.4502e-06  |  5.4502e-06  |  1      |  5.449e-06
+
+The durations are aggregated as they are recorded, so the profiler uses the same memory for a short
+and a very long training run. The quantiles are estimated within a relative error of 1%.
+To follow them during training, log them every n training batches to the logger of the trainer,
+as ``profiler/{action}/mean`` and ``profiler/{action}/p50``, ``p90`` and ``p99``.
+
+.. code-block:: python
+
+    trainer = Trainer(..., profiler=SimpleProfiler(log_every_n_batches=1000))
+
+In distributed training, every process records its own durations and only rank zero prints its report.
+To find the slow ranks which hold back the others in every all-reduce, the `SimpleProfiler` can compare
+the mean durations of the actions across the ranks every ``sync_every_n_batches`` batches. The ranks whose
+``model_forward`` or ``get_train_batch`` take ``straggler_threshold`` times longer than the median rank are
+reported in a warning and the report of rank zero has the minimum, median and maximum durations across
+the ranks.
+
+.. code-block:: python
+
+    profiler = SimpleProfiler(sync_every_n_batches=500, straggler_threshold=1.5)
+    trainer = Trainer(..., distributed_backend='ddp', profiler=profiler)
 
 
 Advanced Profiling
@@ -87,6 +117,93 @@ of logging it to the output in your terminal. The output below shows the profili
         60000    1.651    0.000    6.839    0.000 functional.py:42(to_tensor)
         60000    0.260    0.000    5.734    0.000 transforms.py:167(__call__)
 
+Sampling profiling
+------------------
+
+The `AdvancedProfiler` traces every function call, which slows down the training several times and
+distorts the durations of short hooks. The `SamplingProfiler` instead records the Python stack of the
+training thread at a fixed interval from a helper thread, so its overhead stays small. Each sample is
+attributed to the running actions, and the samples are saved as folded stacks at the end of training,
+``stacks.folded`` in the ``default_root_dir`` by default, to draw a flame graph, e.g. with
+``flamegraph.pl stacks.folded > flamegraph.svg`` or https://www.speedscope.app.
+
+.. code-block:: python
+
+    # 200 samples per second
+    trainer = Trainer(..., profiler=SamplingProfiler(interval=0.005))
+
+Framework overhead
+------------------
+
+To see how much of each training step is spent in Lightning rather than in your code, use the
+`OverheadProfiler`. It attributes the time of every step to the innermost running action: your code in
+``training_step``, ``model_backward`` and ``optimizer_step``, data loading in ``get_train_batch``,
+evaluation in ``run_evaluation``, and the framework everywhere else, e.g. in the hooks, callbacks and
+logging. The share of each category is logged as ``overhead/framework_pct``, ``overhead/user_pct``, ...
+every ``log_every_n_batches`` batches and as ``overhead/epoch_framework_pct``, ... at the end of every epoch.
+
+.. code-block:: python
+
+    # an expensive hook of the LightningModule is user code
+    profiler = OverheadProfiler(log_every_n_batches=100, categories={'on_train_batch_end': 'user'})
+    trainer = Trainer(..., profiler=profiler)
+
+Timeline profiling
+------------------
+
+To see when each action runs, nested in the others and across threads, use the `TraceProfiler`.
+It saves a trace in the Chrome Trace Event format at the end of training, to open in ``chrome://tracing``
+or https://ui.perfetto.dev. Each event records the training step it ran in. Under distributed training
+every process writes its own trace, e.g. ``trace.rank1.json``.
+
+.. code-block:: python
+
+    # record the 100 training steps after the first 10, in memory for at most 100k events
+    profiler = TraceProfiler(output_filename='trace.json', start_step=10, num_steps=100, max_events=100000)
+    trainer = Trainer(..., profiler=profiler)
+
+PyTorch operators
+-----------------
+
+To see which PyTorch operators take the time of each hook and of the training step, use the
+`PyTorchProfiler`. It records the operators with the autograd profiler of PyTorch, on CPU and on GPU,
+within a ``record_function`` range per action. As this is expensive, only a few training steps are
+profiled: after ``wait`` steps, ``warmup`` steps are recorded and discarded, then ``active`` steps are
+recorded. The report has a table of the most expensive operators per action and a Chrome trace of the
+active steps is saved, ``autograd_trace.json`` in the ``default_root_dir`` by default.
+
+.. code-block:: python
+
+    profiler = PyTorchProfiler(wait=5, warmup=2, active=3, record_shapes=True)
+    trainer = Trainer(..., profiler=profiler)
+
+Data pipeline
+-------------
+
+To know if the training waits for its data, use the `DataPipelineProfiler`. For every training batch it
+records the time waiting for the dataloader, the time moving the batch to the device and the time of the
+compute, and with worker processes how many batches the workers had prepared in advance. The share of the
+time of the last ``window`` batches spent on the data, the input-bound fraction, is logged as
+``data/input_bound_fraction`` with ``data/wait_time``, ``data/transfer_time``, ``data/queue_depth``, ...
+and a warning is raised when it stays above ``warn_threshold`` for a whole window.
+
+.. code-block:: python
+
+    trainer = Trainer(..., profiler=DataPipelineProfiler(window=200, warn_threshold=0.3))
+
+Memory profiling
+----------------
+
+To find which action leaks memory in a long run, use the `MemoryProfiler`. For every action, it records
+the change of the resident memory of the process and how much its peak grew, the Python allocations
+traced by ``tracemalloc`` in one call out of ``tracemalloc_every_n`` and the memory allocated by PyTorch on
+the current CUDA device. An action whose total change keeps growing with the length of the run leaks memory.
+Besides the hooks, ``get_train_batch``, ``run_evaluation`` and ``save_checkpoint`` are profiled.
+
+.. code-block:: python
+
+    trainer = Trainer(..., profiler=MemoryProfiler(tracemalloc_every_n=100))
+
 You can also reference this profiler in your LightningModule to profile specific actions of interest.
 If you don't want to always have the profiler turned on, you can optionally pass a `PassThroughProfiler`
 which will allow you to skip profiling without having to make any code changes. Each profiler has a
@@ -112,11 +229,28 @@ to track and the profiler will record performance for code executed within this
 
 """
 
-from pytorch_lightning.profiler.profilers import SimpleProfiler, AdvancedProfiler, PassThroughProfiler, BaseProfiler
+from pytorch_lightning.profiler.profilers import (
+    SimpleProfiler,
+    AdvancedProfiler,
+    PassThroughProfiler,
+    BaseProfiler,
+    TraceProfiler,
+    PyTorchProfiler,
+    MemoryProfiler,
+    SamplingProfiler,
+    OverheadProfiler,
+    DataPipelineProfiler,
+)
 
 __all__ = [
     'BaseProfiler',
     'SimpleProfiler',
     'AdvancedProfiler',
     'PassThroughProfiler',
+    'TraceProfiler',
+    'PyTorchProfiler',
+    'MemoryProfiler',
+    'SamplingProfiler',
+    'OverheadProfiler',
+    'DataPipelineProfiler',
 ]
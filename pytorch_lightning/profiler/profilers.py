@@ -14,23 +14,42 @@
 
 import cProfile
 import io
+import json
 import os
 import pstats
+import sys
+import threading
 import time
+import tracemalloc
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 from contextlib import contextmanager
+from typing import Dict, List, Optional
 
-import numpy as np
+import torch
 
 from pytorch_lightning import _logger as log
+from pytorch_lightning.profiler.statistics import RunningStats
+from pytorch_lightning.utilities.distributed import all_gather_object, rank_zero_warn
+
+try:
+    import resource
+except ImportError:  # pragma: no-cover
+    # Windows, the peak RSS is not recorded
+    resource = None
 
 
 class BaseProfiler(ABC):
     """
     If you wish to write a custom profiler, you should inhereit from this class.
+
+    The trainer profiles ``training_step`` within ``model_forward``, ``transfer_batch_to_device``,
+    ``run_evaluation`` and ``save_checkpoint`` only for the profilers which list them in ``OPTIONAL_ACTIONS``,
+    as they are nested in other actions or run outside of the training batches.
     """
 
+    OPTIONAL_ACTIONS = ()
+
     def __init__(self, output_streams: list = None):
         """
         Params:
@@ -70,6 +89,15 @@ class BaseProfiler(ABC):
         finally:
             self.stop(action_name)
 
+    @contextmanager
+    def profile_optional(self, action_name: str) -> None:
+        """Same as :meth:`profile` for the actions in ``OPTIONAL_ACTIONS``, the other actions are not recorded."""
+        if action_name not in self.OPTIONAL_ACTIONS:
+            yield action_name
+            return
+        with self.profile(action_name):
+            yield action_name
+
     def profile_iterable(self, iterable, action_name: str) -> None:
         iterator = iter(iterable)
         while True:
@@ -91,6 +119,15 @@ class BaseProfiler(ABC):
     def summary(self) -> str:
         """Create profiler summary in text format."""
 
+    def on_train_batch_end(self, trainer) -> None:
+        """Called by the trainer at the end of every training batch, e.g. to log periodic summaries."""
+
+    def on_train_epoch_end(self, trainer) -> None:
+        """Called by the trainer at the end of every training epoch, after the epoch end hooks."""
+
+    def on_train_end(self, trainer) -> None:
+        """Called by the trainer in every process at the end of training, before :meth:`describe` on rank zero."""
+
 
 class PassThroughProfiler(BaseProfiler):
     """
@@ -115,16 +152,57 @@ class SimpleProfiler(BaseProfiler):
     """
     This profiler simply records the duration of actions (in seconds) and reports
     the mean duration of each action and the total time spent over the entire training run.
+
+    The durations are aggregated as they are recorded, into running statistics and a quantile sketch of
+    constant size, so the memory used does not grow with the length of the training run. Only the latest
+    ``RECENT_DURATIONS`` durations of every action are kept as they are.
+
+    In distributed training, the statistics of all the processes can be gathered every
+    ``sync_every_n_batches`` training batches, through the default process group of ``torch.distributed``.
+    The mean duration of every action over these batches is then compared across the ranks, and the ranks
+    whose ``model_forward`` or data loading take ``straggler_threshold`` times longer than the median rank
+    are reported as stragglers. At the end of training, the report of rank zero has the minimum, median
+    and maximum across the ranks of the mean duration of every action.
     """
 
-    def __init__(self, output_filename: str = None):
+    QUANTILES = (0.5, 0.9, 0.99)
+    RECENT_DURATIONS = 1000
+    TRAINING_BATCH = 'training_batch'
+
+    def __init__(
+            self,
+            output_filename: str = None,
+            log_every_n_batches: Optional[int] = None,
+            sync_every_n_batches: Optional[int] = None,
+            straggler_threshold: float = 1.5,
+    ):
         """
         Params:
             output_filename (str): optionally save profile results to file instead of printing
                 to std out when training is finished.
+            log_every_n_batches (int): optionally log the mean duration and quantiles of every action
+                to the trainer's logger every n training batches.
+            sync_every_n_batches (int): optionally compare the durations of the actions across the
+                processes every n training batches. Every process must train on the same number of batches.
+            straggler_threshold (float): the ratio to the median rank of the duration of the training step
+                or of the data loading above which a rank is a straggler.
         """
         self.current_actions = {}
-        self.recorded_durations = defaultdict(list)
+        self.recorded_stats = defaultdict(RunningStats)
+        self._recent_durations = defaultdict(lambda: deque(maxlen=self.RECENT_DURATIONS))
+        self.log_every_n_batches = log_every_n_batches
+        self.sync_every_n_batches = sync_every_n_batches
+        self.straggler_threshold = straggler_threshold
+        self._num_batches = 0
+
+        # the duration between the ends of two training batches, including data loading and evaluation
+        self.batch_stats = RunningStats()
+        self._batch_end_time = None
+        # the latest comparison across the ranks, and all the stragglers found
+        self.cross_rank_stats = {}
+        self.stragglers = []
+        self.rank_stats = None
+        self._synced_totals = {}
 
         self.output_fname = output_filename
         self.output_file = open(self.output_fname, 'w') if self.output_fname else None
@@ -147,23 +225,134 @@ class SimpleProfiler(BaseProfiler):
             )
         start_time = self.current_actions.pop(action_name)
         duration = end_time - start_time
-        self.recorded_durations[action_name].append(duration)
+        self.recorded_stats[action_name].add(duration)
+        self._recent_durations[action_name].append(duration)
+
+    @property
+    def recorded_durations(self) -> Dict[str, List[float]]:
+        """The latest ``RECENT_DURATIONS`` durations of every action."""
+        rank_zero_warn("`SimpleProfiler.recorded_durations` only holds the latest durations of every action,"
+                       " it is deprecated in favor of `SimpleProfiler.recorded_stats`"
+                       " and will be removed in v0.11.0", DeprecationWarning)
+        return {action: list(durations) for action, durations in self._recent_durations.items()}
 
     def summary(self) -> str:
         output_string = "\n\nProfiler Report\n"
 
-        def log_row(action, mean, total):
-            return f"{os.linesep}{action:<20s}\t|  {mean:<15}\t|  {total:<15}"
+        quantile_names = [f"p{int(q * 100)} (s)" for q in self.QUANTILES]
 
-        output_string += log_row("Action", "Mean duration (s)", "Total time (s)")
-        output_string += f"{os.linesep}{'-' * 65}"
-        for action, durations in self.recorded_durations.items():
-            output_string += log_row(
-                action, f"{np.mean(durations):.5}", f"{np.sum(durations):.5}",
-            )
+        def log_row(action, mean, *values):
+            row = f"{os.linesep}{action:<20s}\t|  {mean:<15}"
+            for value in values:
+                row += f"\t|  {value:<15}"
+            return row
+
+        output_string += log_row("Action", "Mean duration (s)", *quantile_names, "Count", "Total time (s)")
+        output_string += f"{os.linesep}{'-' * (65 + 24 * len(self.QUANTILES) + 24)}"
+        for action, stats in self.recorded_stats.items():
+            quantiles = [f"{stats.quantile(q):.5}" for q in self.QUANTILES]
+            output_string += log_row(action, f"{stats.mean:.5}", *quantiles, stats.count, f"{stats.total:.5}")
         output_string += os.linesep
+        if self.rank_stats is not None:
+            output_string += self._cross_rank_summary()
         return output_string
 
+    def _cross_rank_summary(self) -> str:
+        num_ranks = len(self.rank_stats)
+        output_string = f"{os.linesep}Mean duration (s) across {num_ranks} ranks{os.linesep}"
+
+        def log_row(action, *values):
+            return f"{os.linesep}{action:<20s}" + "".join(f"\t|  {value:<15}" for value in values)
+
+        output_string += log_row("Action", "Min", "Median", "Max", "Slowest rank")
+        output_string += f"{os.linesep}{'-' * 110}"
+        for action, (low, median, high, slowest) in _compare_ranks(self.rank_stats).items():
+            output_string += log_row(action, f"{low:.5}", f"{median:.5}", f"{high:.5}", slowest)
+        output_string += os.linesep
+        for batch, rank, kind, duration, median in self.stragglers:
+            output_string += (
+                f"{os.linesep}Straggler at batch {batch}: rank {rank} took {duration:.5}s for {kind},"
+                f" the median rank {median:.5}s"
+            )
+        return output_string + os.linesep
+
+    def sync(self, trainer=None) -> None:
+        """
+        Compares the mean durations of the actions since the previous call across the processes, and reports
+        the stragglers. Every process must call it.
+        """
+        interval = {}
+        for action, stats in list(self.recorded_stats.items()) + [(self.TRAINING_BATCH, self.batch_stats)]:
+            count, total = self._synced_totals.get(action, (0, 0.))
+            interval[action] = (stats.count - count, stats.total - total)
+            self._synced_totals[action] = (stats.count, stats.total)
+
+        interval_means = [
+            {action: total / count for action, (count, total) in rank_interval.items() if count > 0}
+            for rank_interval in all_gather_object(interval)
+        ]
+        self.cross_rank_stats = _compare_ranks(interval_means)
+
+        metrics = {}
+        # the training batches take as long on every rank, the faster ranks wait for the gradients of the others
+        for kind, action in (('step', 'model_forward'), ('data', 'get_train_batch')):
+            if action not in self.cross_rank_stats:
+                continue
+            low, median, high, _ = self.cross_rank_stats[action]
+            metrics.update({
+                f"profiler/cross_rank/{kind}/min": low,
+                f"profiler/cross_rank/{kind}/median": median,
+                f"profiler/cross_rank/{kind}/max": high,
+            })
+            for rank, means in enumerate(interval_means):
+                duration = means.get(action)
+                if duration is not None and median > 0 and duration > self.straggler_threshold * median:
+                    self.stragglers.append((self._num_batches, rank, kind, duration, median))
+                    rank_zero_warn(
+                        f"Rank {rank} is a straggler: its mean {kind} time over the last {self.sync_every_n_batches}"
+                        f" batches is {duration:.5}s, {duration / median:.2f} times the median rank."
+                    )
+        if trainer is not None and metrics:
+            trainer.logger_connector.log_metrics(metrics, {})
+
+    def metrics(self) -> Dict[str, float]:
+        """The mean duration and quantiles of every action, e.g. ``profiler/model_forward/p90``."""
+        metrics = {}
+        for action, stats in self.recorded_stats.items():
+            metrics[f"profiler/{action}/mean"] = stats.mean
+            for q in self.QUANTILES:
+                metrics[f"profiler/{action}/p{int(q * 100)}"] = stats.quantile(q)
+        return metrics
+
+    def on_train_batch_end(self, trainer) -> None:
+        now = time.monotonic()
+        if self._batch_end_time is not None:
+            self.batch_stats.add(now - self._batch_end_time)
+        self._batch_end_time = now
+
+        self._num_batches += 1
+        if self.log_every_n_batches and self._num_batches % self.log_every_n_batches == 0:
+            trainer.logger_connector.log_metrics(self.metrics(), {})
+        if self.sync_every_n_batches and self._num_batches % self.sync_every_n_batches == 0:
+            self.sync(trainer)
+
+    def on_train_epoch_end(self, trainer) -> None:
+        # the end of the epoch is not part of the next batch
+        self._batch_end_time = None
+
+    def on_train_end(self, trainer) -> None:
+        if self.sync_every_n_batches:
+            self.gather_stats()
+
+    def gather_stats(self) -> None:
+        """Gathers the statistics of all the processes into ``rank_stats``. Every process must call it."""
+        states = {action: stats.state_dict() for action, stats in self.recorded_stats.items()}
+        states[self.TRAINING_BATCH] = self.batch_stats.state_dict()
+        self.rank_stats = [
+            {action: RunningStats.from_state_dict(state) for action, state in rank_states.items()}
+            for rank_states in all_gather_object(states)
+        ]
+
     def describe(self):
         """Logs a profile report after the conclusion of the training run."""
         super().describe()
@@ -239,3 +428,957 @@ class AdvancedProfiler(BaseProfiler):
         """Close profiler's stream."""
         if self.output_file:
             self.output_file.close()
+
+
+class TraceProfiler(BaseProfiler):
+    """
+    This profiler records the start and duration of every action with its thread and training step, and
+    exports them as a timeline in the Chrome Trace Event format, to open in ``chrome://tracing`` or
+    `Perfetto <https://ui.perfetto.dev>`_. Nested actions, e.g. ``model_forward`` in ``optimizer_step``,
+    are drawn nested.
+
+    The events are kept in a ring buffer of ``max_events``, the oldest are dropped once it is full. With
+    ``start_step`` and ``num_steps`` only a window of training steps is recorded, to keep the trace small.
+    Each process writes its own trace, the files of the ranks other than zero get a ``.rank{i}`` suffix.
+    """
+
+    OPTIONAL_ACTIONS = ('training_step', 'transfer_batch_to_device', 'run_evaluation', 'save_checkpoint')
+
+    def __init__(
+            self,
+            output_filename: Optional[str] = None,
+            max_events: int = 1000000,
+            start_step: int = 0,
+            num_steps: Optional[int] = None,
+    ):
+        """
+        Args:
+            output_filename: where the trace is saved at the end of training.
+                Default: ``trace.json`` in the ``default_root_dir`` of the trainer.
+            max_events: the number of events kept in memory.
+            start_step: the index of the first training batch recorded.
+            num_steps: the number of training batches recorded, all of them by default.
+        """
+        self.output_fname = output_filename
+        self.start_step = start_step
+        self.num_steps = num_steps
+        self.step = 0
+        self.events = deque(maxlen=max_events)
+        self.num_events = 0
+        self.current_actions = {}
+        self._thread_names = {}
+        self._origin = time.perf_counter_ns()
+        self._rank = 0
+        self.trace_path = None
+        super().__init__(output_streams=[log.info])
+
+    @property
+    def recording(self) -> bool:
+        if self.step < self.start_step:
+            return False
+        return self.num_steps is None or self.step < self.start_step + self.num_steps
+
+    def start(self, action_name: str) -> None:
+        if not self.recording:
+            return
+        thread_id = threading.get_ident()
+        key = (thread_id, action_name)
+        if key in self.current_actions:
+            raise ValueError(f"Attempted to start {action_name} which has already started.")
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        self.current_actions[key] = time.perf_counter_ns()
+
+    def stop(self, action_name: str) -> None:
+        end_time = time.perf_counter_ns()
+        # actions started outside of the recorded steps are not recorded
+        start_time = self.current_actions.pop((threading.get_ident(), action_name), None)
+        if start_time is None:
+            return
+        self.events.append((action_name, start_time, end_time - start_time, threading.get_ident(), self.step))
+        self.num_events += 1
+
+    def on_train_batch_end(self, trainer) -> None:
+        self.step += 1
+
+    def on_train_end(self, trainer) -> None:
+        self._rank = trainer.global_rank
+        filepath = self.output_fname or os.path.join(trainer.default_root_dir, 'trace.json')
+        self.export(_rank_filepath(filepath, self._rank))
+
+    def trace(self) -> Dict:
+        """The recorded events in the Chrome Trace Event format, timestamps are in microseconds."""
+        pid = self._rank
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'rank {pid}'}}]
+        for thread_id, name in self._thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id, 'args': {'name': name}})
+        for name, start_time, duration, thread_id, step in self.events:
+            events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (start_time - self._origin) / 1000,
+                'dur': duration / 1000,
+                'pid': pid,
+                'tid': thread_id,
+                'args': {'step': step},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, filepath: str) -> None:
+        """Saves the trace as JSON."""
+        dirpath = os.path.dirname(filepath)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        with open(filepath, 'w') as f:
+            json.dump(self.trace(), f)
+        self.trace_path = filepath
+
+    def summary(self) -> str:
+        dropped = self.num_events - len(self.events)
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        output_string += f"{os.linesep}Recorded {len(self.events)} events"
+        if dropped:
+            output_string += f", dropped the {dropped} oldest"
+        if self.trace_path is not None:
+            output_string += f", trace saved to {self.trace_path}"
+        return output_string + os.linesep
+
+
+class PyTorchProfiler(BaseProfiler):
+    """
+    This profiler uses the autograd profiler of PyTorch to record the operators, e.g. ``aten::addmm``, run
+    within each action. Every action is a ``record_function`` range, with ``model_backward`` named
+    ``backward``, so the report has a table of the most expensive operators of every hook and of the
+    ``training_step``, ``backward`` and ``optimizer_step``.
+
+    Profiling operators is expensive, so only a window of training steps is profiled: the profiler is
+    idle for ``wait`` steps, then records ``warmup`` steps which are discarded, to exclude the cost of the
+    first iterations, and finally records ``active`` steps. The operators of these steps are also saved as
+    a Chrome trace at the end of training, one per rank.
+    """
+
+    OPTIONAL_ACTIONS = ('training_step',)
+    RANGE_NAMES = {
+        'model_backward': 'backward',
+    }
+
+    def __init__(
+            self,
+            output_filename: Optional[str] = None,
+            trace_filename: Optional[str] = None,
+            wait: int = 1,
+            warmup: int = 1,
+            active: int = 3,
+            use_cuda: Optional[bool] = None,
+            record_shapes: bool = False,
+            row_limit: int = 10,
+    ):
+        """
+        Args:
+            output_filename: optionally save the report to file instead of printing
+                to std out when training is finished.
+            trace_filename: where the Chrome trace of the active steps is saved.
+                Default: ``autograd_trace.json`` in the ``default_root_dir`` of the trainer.
+            wait: the number of training steps skipped first.
+            warmup: the number of training steps recorded and discarded before the active ones.
+            active: the number of training steps recorded.
+            use_cuda: also record the CUDA kernels. Default: if CUDA is available.
+            record_shapes: group the operators by the shapes of their inputs as well.
+            row_limit: the number of operators in the table of each action.
+        """
+        if wait < 0 or warmup < 0 or active < 1:
+            raise ValueError(f"Invalid schedule with wait={wait}, warmup={warmup} and active={active} steps.")
+        self.wait = wait
+        self.warmup = warmup
+        self.active = active
+        self.use_cuda = torch.cuda.is_available() if use_cuda is None else use_cuda
+        self.record_shapes = record_shapes
+        self.row_limit = row_limit
+        self.trace_fname = trace_filename
+        self.trace_path = None
+
+        self.step = 0
+        self.function_events = None
+        self._profiler = None
+        self._recording = False
+        self._ranges = {}
+        self._range_names = set()
+
+        self.output_fname = output_filename
+        self.output_file = open(self.output_fname, 'w') if self.output_fname else None
+        streaming_out = [self.output_file.write] if self.output_file else [log.info]
+        super().__init__(output_streams=streaming_out)
+
+    def start(self, action_name: str) -> None:
+        self._schedule()
+        if self._profiler is None:
+            return
+        if action_name in self._ranges:
+            raise ValueError(f"Attempted to start {action_name} which has already started.")
+        range_name = self.RANGE_NAMES.get(action_name, action_name)
+        self._range_names.add(range_name)
+        record = torch.autograd.profiler.record_function(range_name)
+        record.__enter__()
+        self._ranges[action_name] = record
+
+    def stop(self, action_name: str) -> None:
+        # actions started while the profiler was idle have no range
+        record = self._ranges.pop(action_name, None)
+        if record is not None:
+            record.__exit__(None, None, None)
+
+    def on_train_batch_end(self, trainer) -> None:
+        self.step += 1
+        self._schedule()
+
+    def on_train_end(self, trainer) -> None:
+        self._stop_profiler()
+        if self.function_events is not None:
+            filepath = self.trace_fname or os.path.join(trainer.default_root_dir, 'autograd_trace.json')
+            filepath = _rank_filepath(filepath, trainer.global_rank)
+            dirpath = os.path.dirname(filepath)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            self.function_events.export_chrome_trace(filepath)
+            self.trace_path = filepath
+
+    def _schedule(self) -> None:
+        if self.step < self.wait or self.step >= self.wait + self.warmup + self.active:
+            self._stop_profiler()
+        elif self.step < self.wait + self.warmup:
+            if self._profiler is None:
+                self._start_profiler(recording=False)
+        elif not self._recording:
+            # the warmup steps are discarded
+            self._stop_profiler()
+            self._start_profiler(recording=True)
+
+    def _start_profiler(self, recording: bool) -> None:
+        self._profiler = torch.autograd.profiler.profile(use_cuda=self.use_cuda, record_shapes=self.record_shapes)
+        self._profiler.__enter__()
+        self._recording = recording
+
+    def _stop_profiler(self) -> None:
+        if self._profiler is None:
+            return
+        for record in self._ranges.values():
+            record.__exit__(None, None, None)
+        self._ranges = {}
+        self._profiler.__exit__(None, None, None)
+        if self._recording:
+            self.function_events = self._profiler.function_events
+        self._profiler = None
+        self._recording = False
+
+    def operator_tables(self) -> Dict[str, str]:
+        """The tables of the most expensive operators run within each action, by self CPU time."""
+        if self.function_events is None:
+            return {}
+        events_by_range = defaultdict(list)
+        for event in self.function_events:
+            if event.name in self._range_names:
+                continue
+            # the operators are attributed to the innermost range, with all their children
+            parent = getattr(event, 'cpu_parent', None)
+            while parent is not None and parent.name not in self._range_names:
+                parent = getattr(parent, 'cpu_parent', None)
+            if parent is not None:
+                events_by_range[parent.name].append(event)
+
+        return {name: self._operator_table(events) for name, events in events_by_range.items()}
+
+    def _operator_table(self, events) -> str:
+        # times in microseconds: count, self CPU time, total CPU time
+        totals = defaultdict(lambda: [0, 0., 0.])
+        for event in events:
+            key = event.name
+            if self.record_shapes and getattr(event, 'input_shapes', None):
+                key = f"{event.name} {event.input_shapes}"
+            totals[key][0] += 1
+            totals[key][1] += event.self_cpu_time_total
+            totals[key][2] += event.cpu_time_total
+        rows = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:self.row_limit]
+
+        width = max([len("Operator")] + [len(key) for key, _ in rows])
+        output_string = f"{'Operator':<{width}}  |  Calls   |  Self CPU (ms)  |  CPU total (ms){os.linesep}"
+        output_string += "-" * (width + 50) + os.linesep
+        for key, (count, self_time, total_time) in rows:
+            output_string += (
+                f"{key:<{width}}  |  {count:<6}  |  {self_time / 1000:<13.5g}  |  {total_time / 1000:.5g}{os.linesep}"
+            )
+        return output_string
+
+    def summary(self) -> str:
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        if self.function_events is None:
+            return output_string + f"{os.linesep}No training step was profiled{os.linesep}"
+        first_step = self.wait + self.warmup
+        output_string += f"{os.linesep}Operators of the training steps {first_step} to {first_step + self.active - 1}"
+        if self.trace_path is not None:
+            output_string += f", trace saved to {self.trace_path}"
+        output_string += os.linesep
+        for range_name, table in self.operator_tables().items():
+            output_string += f"{os.linesep}Profile stats for: {range_name}{os.linesep}{table}"
+        return output_string
+
+    def describe(self):
+        """Logs a profile report after the conclusion of the training run."""
+        super().describe()
+        if self.output_file:
+            self.output_file.flush()
+
+    def __del__(self):
+        """Close profiler's stream."""
+        if self.output_file:
+            self.output_file.close()
+
+
+class MemoryProfiler(BaseProfiler):
+    """
+    This profiler records how the memory of the process changes within each action, to find which hook
+    leaks memory over a long run, e.g. by keeping references to the outputs of every step.
+
+    For each action it records:
+
+    - the change of the resident set size (RSS) of the process and how much its peak grew, on Linux and macOS,
+    - the change and the peak of the Python allocations traced by :mod:`tracemalloc`, which is expensive, so
+      only one call in ``tracemalloc_every_n`` of each action is traced,
+    - the change and the peak of the memory allocated by PyTorch on the current CUDA device.
+
+    A change which stays positive over many calls, i.e. a large total, points at a leak. Nested actions are
+    included in the changes and peaks of the actions around them.
+    """
+
+    OPTIONAL_ACTIONS = ('run_evaluation', 'save_checkpoint')
+    METRICS = ('rss_delta', 'rss_peak', 'traced_delta', 'traced_peak', 'device_delta', 'device_peak')
+
+    def __init__(self, output_filename: Optional[str] = None, tracemalloc_every_n: int = 10):
+        """
+        Args:
+            output_filename: optionally save profile results to file instead of printing
+                to std out when training is finished.
+            tracemalloc_every_n: trace the Python allocations of one call in n of each action,
+                ``0`` disables tracing.
+        """
+        self.tracemalloc_every_n = tracemalloc_every_n
+        self.recorded_stats = defaultdict(lambda: {metric: RunningStats() for metric in self.METRICS})
+        self.num_calls = defaultdict(int)
+        self.current_actions = {}
+        self._stack = []
+
+        self.output_fname = output_filename
+        self.output_file = open(self.output_fname, 'w') if self.output_fname else None
+        streaming_out = [self.output_file.write] if self.output_file else [log.info]
+        super().__init__(output_streams=streaming_out)
+
+    def start(self, action_name: str) -> None:
+        if action_name in self.current_actions:
+            raise ValueError(f"Attempted to start {action_name} which has already started.")
+        # the peaks recorded so far belong to the enclosing action, before they are reset for this one
+        device = _device_memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent['device_peak'] = max(parent['device_peak'], device[1])
+            if tracemalloc.is_tracing():
+                parent['traced_peak'] = max(parent['traced_peak'], tracemalloc.get_traced_memory()[1])
+        if device[0] is not None:
+            torch.cuda.reset_peak_memory_stats()
+
+        self.num_calls[action_name] += 1
+        frame = {'action': action_name, 'started_tracing': False, 'traced': False}
+        if self.tracemalloc_every_n > 0 and (self.num_calls[action_name] - 1) % self.tracemalloc_every_n == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                frame['started_tracing'] = True
+            frame['traced'] = True
+        if tracemalloc.is_tracing():
+            frame['traced_start'] = tracemalloc.get_traced_memory()[0]
+            _reset_traced_peak()
+        frame['traced_peak'] = 0
+
+        frame['rss_start'] = _current_rss()
+        frame['max_rss_start'] = _max_rss()
+        frame['device_start'] = device[0]
+        frame['device_peak'] = 0
+        self.current_actions[action_name] = frame
+        self._stack.append(frame)
+
+    def stop(self, action_name: str) -> None:
+        frame = self.current_actions.pop(action_name, None)
+        if frame is None:
+            raise ValueError(
+                f"Attempting to stop recording an action ({action_name}) which was never started."
+            )
+        self._stack.remove(frame)
+        stats = self.recorded_stats[action_name]
+
+        rss = _current_rss()
+        if rss is not None and frame['rss_start'] is not None:
+            stats['rss_delta'].add(rss - frame['rss_start'])
+        max_rss = _max_rss()
+        if max_rss is not None:
+            stats['rss_peak'].add(max_rss - frame['max_rss_start'])
+
+        if frame['traced'] and 'traced_start' in frame:
+            current, peak = tracemalloc.get_traced_memory()
+            stats['traced_delta'].add(current - frame['traced_start'])
+            if hasattr(tracemalloc, 'reset_peak'):
+                stats['traced_peak'].add(max(frame['traced_peak'], peak) - frame['traced_start'])
+        if frame['started_tracing']:
+            tracemalloc.stop()
+
+        device, device_peak = _device_memory()
+        if device is not None and frame['device_start'] is not None:
+            device_peak = max(frame['device_peak'], device_peak)
+            stats['device_delta'].add(device - frame['device_start'])
+            stats['device_peak'].add(device_peak - frame['device_start'])
+            if self._stack:
+                parent = self._stack[-1]
+                parent['device_peak'] = max(parent['device_peak'], device_peak)
+
+    def summary(self) -> str:
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        columns = ['Action', 'Calls']
+        columns += ['RSS total (MB)', 'RSS max (MB)', 'RSS peak (MB)', 'Traced total (MB)', 'Traced peak (MB)']
+        columns += ['Device total (MB)', 'Device peak (MB)']
+        rows = []
+        for action, stats in self.recorded_stats.items():
+            rows.append([action, str(self.num_calls[action])] + [
+                _megabytes(stats['rss_delta'], 'total'),
+                _megabytes(stats['rss_delta'], 'max'),
+                _megabytes(stats['rss_peak'], 'max'),
+                # extrapolated from the traced calls
+                _megabytes(stats['traced_delta'], 'mean', scale=self.num_calls[action]),
+                _megabytes(stats['traced_peak'], 'max'),
+                _megabytes(stats['device_delta'], 'total'),
+                _megabytes(stats['device_peak'], 'max'),
+            ])
+        widths = [max([len(columns[i])] + [len(row[i]) for row in rows]) for i in range(len(columns))]
+
+        def format_row(row: List[str]) -> str:
+            return "  |  ".join(f"{value:<{width}}" for value, width in zip(row, widths)) + os.linesep
+
+        output_string += os.linesep + format_row(columns)
+        output_string += "-" * (sum(widths) + 5 * (len(widths) - 1)) + os.linesep
+        for row in rows:
+            output_string += format_row(row)
+        return output_string
+
+    def describe(self):
+        """Logs a profile report after the conclusion of the training run."""
+        super().describe()
+        if self.output_file:
+            self.output_file.flush()
+
+    def __del__(self):
+        """Close profiler's stream."""
+        if self.output_file:
+            self.output_file.close()
+
+
+class SamplingProfiler(BaseProfiler):
+    """
+    This profiler samples the Python stack of the profiled threads at a fixed interval from a helper thread,
+    instead of tracing every function call like the `AdvancedProfiler`, so its overhead is low and does not
+    depend on the number of calls: short hooks are measured as they run without profiling.
+
+    Each sample is attributed to the actions running in its thread, which are the root frames of the
+    stack. At the end of training the samples are saved as folded stacks, one line per distinct stack with
+    its number of samples, the input of flame graph tools such as ``flamegraph.pl`` or speedscope.
+    """
+
+    OPTIONAL_ACTIONS = ('training_step', 'transfer_batch_to_device', 'run_evaluation', 'save_checkpoint')
+
+    def __init__(self, output_filename: Optional[str] = None, interval: float = 0.01, top_functions: int = 5):
+        """
+        Args:
+            output_filename: where the folded stacks are saved at the end of training.
+                Default: ``stacks.folded`` in the ``default_root_dir`` of the trainer.
+            interval: the time in seconds between two samples.
+            top_functions: the number of functions with the most samples reported for each action.
+        """
+        if interval <= 0:
+            raise ValueError(f"The sampling interval must be positive, got {interval}.")
+        self.output_fname = output_filename
+        self.interval = interval
+        self.top_functions = top_functions
+        self.stacks = Counter()
+        self.num_samples = 0
+        self.folded_path = None
+        # the actions running in each thread, appended and popped by the profiled threads only
+        self._actions = defaultdict(list)
+        self._labels = {}
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        super().__init__(output_streams=[log.info])
+
+    def start(self, action_name: str) -> None:
+        actions = self._actions[threading.get_ident()]
+        if action_name in actions:
+            raise ValueError(f"Attempted to start {action_name} which has already started.")
+        actions.append(action_name)
+        if self._sampler is None:
+            self._start_sampler()
+
+    def stop(self, action_name: str) -> None:
+        actions = self._actions.get(threading.get_ident())
+        if not actions or action_name not in actions:
+            raise ValueError(
+                f"Attempting to stop recording an action ({action_name}) which was never started."
+            )
+        actions.remove(action_name)
+
+    def on_train_end(self, trainer) -> None:
+        self.stop_sampling()
+        filepath = self.output_fname or os.path.join(trainer.default_root_dir, 'stacks.folded')
+        self.export(_rank_filepath(filepath, trainer.global_rank))
+
+    def _start_sampler(self) -> None:
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='SamplingProfiler', daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self) -> None:
+        """Stops the helper thread, it is started again by the next action."""
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample_loop(self) -> None:
+        while not self._stop_sampling.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Records the stacks of the threads running an action."""
+        frames = sys._current_frames()
+        for thread_id, actions in list(self._actions.items()):
+            frame = frames.get(thread_id)
+            # a copy, the thread keeps running while its stack is walked
+            actions = tuple(actions)
+            if frame is None or not actions:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.extend(f'[{action}]' for action in reversed(actions))
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.num_samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+        return label
+
+    def folded_stacks(self) -> List[str]:
+        """The samples as folded stacks, ``frame;frame;...;frame count`` from the outermost frame."""
+        return [f'{stack} {count}' for stack, count in self.stacks.most_common()]
+
+    def export(self, filepath: str) -> None:
+        """Saves the folded stacks."""
+        dirpath = os.path.dirname(filepath)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        with open(filepath, 'w') as f:
+            f.writelines(line + '\n' for line in self.folded_stacks())
+        self.folded_path = filepath
+
+    def summary(self) -> str:
+        # samples by innermost action and by function on top of the stack
+        actions, functions = Counter(), defaultdict(Counter)
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            action = [frame for frame in frames if frame.startswith('[')][-1]
+            actions[action] += count
+            functions[action][frames[-1]] += count
+
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        output_string += f"{os.linesep}{self.num_samples} samples every {self.interval}s"
+        if self.folded_path is not None:
+            output_string += f", folded stacks saved to {self.folded_path}"
+        output_string += os.linesep
+        for action, count in actions.most_common():
+            output_string += f"{os.linesep}{action[1:-1]}: {count} samples ({100 * count / self.num_samples:.1f}%)"
+            output_string += os.linesep
+            for function, function_count in functions[action].most_common(self.top_functions):
+                output_string += f"    {function_count:<8}  {function}{os.linesep}"
+        return output_string
+
+
+class OverheadProfiler(BaseProfiler):
+    """
+    This profiler splits the duration of every training step between the code of the user and the code of
+    the framework, e.g. the processing of the results, logging, callbacks and the dispatch of the hooks.
+
+    Every moment of a step is attributed to the innermost running action: ``training_step``,
+    ``model_backward`` and ``optimizer_step`` are user code, ``get_train_batch`` and
+    ``transfer_batch_to_device`` are data loading,
+    ``run_evaluation`` is evaluation, and the other actions, i.e. the hooks, and the time outside of any
+    action are framework overhead. The share of each category is logged as ``overhead/{category}_pct``
+    every ``log_every_n_batches`` training batches, over these batches, and as
+    ``overhead/epoch_{category}_pct`` at the end of every epoch, including the end of the epoch.
+    """
+
+    OPTIONAL_ACTIONS = ('training_step', 'transfer_batch_to_device', 'run_evaluation')
+    USER, DATA, EVALUATION, FRAMEWORK = 'user', 'data', 'evaluation', 'framework'
+    CATEGORIES = {
+        'training_step': USER,
+        'model_backward': USER,
+        'optimizer_step': USER,
+        'get_train_batch': DATA,
+        'transfer_batch_to_device': DATA,
+        'run_evaluation': EVALUATION,
+    }
+
+    def __init__(
+            self,
+            output_filename: Optional[str] = None,
+            log_every_n_batches: Optional[int] = 50,
+            categories: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Args:
+            output_filename: optionally save profile results to file instead of printing
+                to std out when training is finished.
+            log_every_n_batches: log the shares of the categories every n training batches, ``None`` only
+                logs them at the end of the epochs.
+            categories: the category of other actions, e.g. ``{'on_train_batch_end': 'user'}`` for an
+                expensive hook of the ``LightningModule``. The other actions are framework overhead.
+        """
+        self.categories = dict(self.CATEGORIES, **(categories or {}))
+        self.log_every_n_batches = log_every_n_batches
+        self.totals = defaultdict(float)
+        self.step_overhead = RunningStats()
+        self._step = defaultdict(float)
+        self._window = defaultdict(float)
+        self._epoch = defaultdict(float)
+        self._num_batches = 0
+        self._stack = []
+        self._last_time = None
+        self._thread_id = None
+
+        self.output_fname = output_filename
+        self.output_file = open(self.output_fname, 'w') if self.output_fname else None
+        streaming_out = [self.output_file.write] if self.output_file else [log.info]
+        super().__init__(output_streams=streaming_out)
+
+    def start(self, action_name: str) -> None:
+        now = time.perf_counter()
+        if self._thread_id is None and action_name == 'get_train_batch':
+            # only the actions of the training loop are accounted
+            self._thread_id = threading.get_ident()
+        if threading.get_ident() != self._thread_id:
+            return
+        if self._last_time is None:
+            # the first step of the epoch starts with loading its batch
+            if action_name != 'get_train_batch':
+                return
+            self._last_time = now
+        self._advance(now)
+        self._stack.append(action_name)
+
+    def stop(self, action_name: str) -> None:
+        now = time.perf_counter()
+        if threading.get_ident() != self._thread_id or action_name not in self._stack:
+            return
+        self._advance(now)
+        # the last occurrence, the stack is not strictly nested if an action was stopped late
+        del self._stack[len(self._stack) - 1 - self._stack[::-1].index(action_name)]
+
+    def _advance(self, now: float) -> None:
+        if self._last_time is None:
+            return
+        category = self.categories.get(self._stack[-1], self.FRAMEWORK) if self._stack else self.FRAMEWORK
+        self._step[category] += now - self._last_time
+        self._last_time = now
+
+    def _close_step(self) -> Dict[str, float]:
+        step, self._step = self._step, defaultdict(float)
+        for category, duration in step.items():
+            self._window[category] += duration
+            self._epoch[category] += duration
+            self.totals[category] += duration
+        return step
+
+    def on_train_batch_end(self, trainer) -> None:
+        self._advance(time.perf_counter())
+        step = self._close_step()
+        if not step:
+            return
+        self.step_overhead.add(step[self.FRAMEWORK] / sum(step.values()))
+
+        self._num_batches += 1
+        if self.log_every_n_batches and self._num_batches % self.log_every_n_batches == 0:
+            trainer.logger_connector.log_metrics(self._shares(self._window, 'overhead/{}_pct'), {})
+            self._window = defaultdict(float)
+
+    def on_train_epoch_end(self, trainer) -> None:
+        self._advance(time.perf_counter())
+        self._close_step()
+        if self._epoch:
+            trainer.logger_connector.log_metrics(self._shares(self._epoch, 'overhead/epoch_{}_pct'), {})
+        self._epoch = defaultdict(float)
+        self._window = defaultdict(float)
+        self._last_time = None
+        self._stack = []
+
+    def _shares(self, durations: Dict[str, float], name: str) -> Dict[str, float]:
+        total = sum(durations.values())
+        categories = (self.USER, self.DATA, self.EVALUATION, self.FRAMEWORK)
+        return {name.format(category): 100 * durations[category] / total for category in categories}
+
+    def summary(self) -> str:
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        total = sum(self.totals.values())
+        if total == 0:
+            return output_string + f"{os.linesep}No training step was profiled{os.linesep}"
+
+        output_string += f"{os.linesep}{'Category':<12}  |  Total time (s)  |  Share (%){os.linesep}"
+        output_string += "-" * 46 + os.linesep
+        for category in (self.USER, self.DATA, self.EVALUATION, self.FRAMEWORK):
+            duration = self.totals[category]
+            output_string += f"{category:<12}  |  {duration:<14.5g}  |  {100 * duration / total:.2f}{os.linesep}"
+        overhead = self.step_overhead
+        output_string += (
+            f"{os.linesep}Framework overhead per step (%): mean {100 * overhead.mean:.2f},"
+            f" p50 {100 * overhead.quantile(0.5):.2f}, p90 {100 * overhead.quantile(0.9):.2f},"
+            f" max {100 * overhead.max:.2f} over {overhead.count} steps{os.linesep}"
+        )
+        return output_string
+
+    def describe(self):
+        """Logs a profile report after the conclusion of the training run."""
+        super().describe()
+        if self.output_file:
+            self.output_file.flush()
+
+    def __del__(self):
+        """Close profiler's stream."""
+        if self.output_file:
+            self.output_file.close()
+
+
+class DataPipelineProfiler(BaseProfiler):
+    """
+    This profiler monitors whether the training is input-bound, i.e. waits for its data. For every training
+    batch it records the time waiting for the batch from the dataloader, ``get_train_batch``, the time moving
+    it to the device, ``transfer_batch_to_device``, and the rest of the batch, the compute. Evaluation is
+    excluded.
+
+    With worker processes, the number of batches already prepared by the workers when the training loop asks
+    for the next one is recorded as well. A long wait with no batch prepared means the workers are too slow or
+    too few; a long wait with batches prepared points at the main process, e.g. at a slow ``collate_fn``
+    without workers or at pinning memory.
+
+    The share of the time of the last ``window`` batches spent waiting for and transferring the data is the
+    input-bound fraction. It is logged with the other measures every ``log_every_n_batches`` batches, and a
+    warning is raised when it stays above ``warn_threshold`` for a whole window.
+    """
+
+    OPTIONAL_ACTIONS = ('transfer_batch_to_device', 'run_evaluation')
+    INPUT_ACTIONS = ('get_train_batch', 'transfer_batch_to_device')
+
+    def __init__(
+            self,
+            output_filename: Optional[str] = None,
+            window: int = 100,
+            log_every_n_batches: Optional[int] = 50,
+            warn_threshold: float = 0.5,
+    ):
+        """
+        Args:
+            output_filename: optionally save profile results to file instead of printing
+                to std out when training is finished.
+            window: the number of batches of the rolling input-bound fraction.
+            log_every_n_batches: log the measures every n training batches, ``None`` disables it.
+            warn_threshold: the input-bound fraction of a whole window above which a warning is raised.
+        """
+        self.window = window
+        self.log_every_n_batches = log_every_n_batches
+        self.warn_threshold = warn_threshold
+        self.recorded_stats = defaultdict(RunningStats)
+        self.input_bound_warnings = 0
+        self._durations = deque(maxlen=window)
+        self._batch = defaultdict(float)
+        self._starts = {}
+        self._batch_end_time = None
+        self._warned = False
+
+        self.output_fname = output_filename
+        self.output_file = open(self.output_fname, 'w') if self.output_fname else None
+        streaming_out = [self.output_file.write] if self.output_file else [log.info]
+        super().__init__(output_streams=streaming_out)
+
+    def start(self, action_name: str) -> None:
+        if action_name in self.INPUT_ACTIONS or action_name == 'run_evaluation':
+            self._starts[action_name] = time.perf_counter()
+
+    def stop(self, action_name: str) -> None:
+        start_time = self._starts.pop(action_name, None)
+        if start_time is not None:
+            self._batch[action_name] += time.perf_counter() - start_time
+
+    @property
+    def input_bound_fraction(self) -> float:
+        """The share of the time of the last ``window`` batches spent waiting for and transferring the data."""
+        total = sum(duration for _, duration in self._durations)
+        return sum(input_time for input_time, _ in self._durations) / total if total > 0 else 0.
+
+    def on_train_batch_end(self, trainer) -> None:
+        now = time.perf_counter()
+        batch, self._batch = self._batch, defaultdict(float)
+        if self._batch_end_time is None:
+            # the first batch of the epoch starts with loading it
+            self._batch_end_time = now - batch['get_train_batch'] - batch['run_evaluation']
+        duration = now - self._batch_end_time - batch['run_evaluation']
+        self._batch_end_time = now
+
+        wait, transfer = batch['get_train_batch'], batch['transfer_batch_to_device']
+        self.recorded_stats['wait'].add(wait)
+        self.recorded_stats['transfer'].add(transfer)
+        self.recorded_stats['compute'].add(max(duration - wait - transfer, 0.))
+        self._durations.append((wait + transfer, duration))
+
+        # sampled before the loop asks for the next batch
+        queue_depth = _prefetched_batches(trainer.data_connector.train_iterator)
+        if queue_depth is not None:
+            self.recorded_stats['queue_depth'].add(queue_depth)
+
+        fraction = self.input_bound_fraction
+        if len(self._durations) == self.window and fraction > self.warn_threshold:
+            if not self._warned:
+                self.input_bound_warnings += 1
+                rank_zero_warn(
+                    f"The training is input-bound: {100 * fraction:.1f}% of the last {self.window} batches was"
+                    " spent waiting for the data. Consider more `num_workers` in the DataLoader,"
+                    " `pin_memory=True` or a faster dataset or `collate_fn`."
+                )
+            self._warned = True
+        elif fraction <= self.warn_threshold:
+            self._warned = False
+
+        num_batches = self.recorded_stats['wait'].count
+        if self.log_every_n_batches and num_batches % self.log_every_n_batches == 0:
+            trainer.logger_connector.log_metrics(self.metrics(), {})
+
+    def on_train_epoch_end(self, trainer) -> None:
+        # the end of the epoch is not part of the next batch
+        self._batch_end_time = None
+        self._batch = defaultdict(float)
+
+    def metrics(self) -> Dict[str, float]:
+        """The last measures of the batch and the rolling input-bound fraction, e.g. ``data/wait_time``."""
+        metrics = {'data/input_bound_fraction': self.input_bound_fraction}
+        if self._durations:
+            metrics['data/batch_time'] = self._durations[-1][1]
+        for name in ('wait', 'transfer', 'compute'):
+            if self.recorded_stats[name].count:
+                metrics[f'data/{name}_time'] = self.recorded_stats[name].mean
+        if self.recorded_stats['queue_depth'].count:
+            metrics['data/queue_depth'] = self.recorded_stats['queue_depth'].mean
+        return metrics
+
+    def summary(self) -> str:
+        output_string = f"{os.linesep}Profiler Report{os.linesep}"
+        output_string += f"{os.linesep}{'Measure':<20}|  {'Mean':<12}|  {'p50':<12}|  {'p90':<12}|  Max{os.linesep}"
+        output_string += "-" * 70 + os.linesep
+        for name, stats in self.recorded_stats.items():
+            unit = '' if name == 'queue_depth' else ' (s)'
+            values = [stats.mean, stats.quantile(0.5), stats.quantile(0.9), stats.max]
+            output_string += f"{name + unit:<20}|  " + "|  ".join(f"{v:<12.5g}" for v in values[:3])
+            output_string += f"|  {values[3]:.5g}{os.linesep}"
+        wait, transfer, compute = (self.recorded_stats[name].total for name in ('wait', 'transfer', 'compute'))
+        if wait + transfer + compute > 0:
+            fraction = (wait + transfer) / (wait + transfer + compute)
+            output_string += f"{os.linesep}Input-bound fraction of the training: {100 * fraction:.1f}%"
+            output_string += f", input-bound warnings: {self.input_bound_warnings}{os.linesep}"
+        return output_string
+
+    def describe(self):
+        """Logs a profile report after the conclusion of the training run."""
+        super().describe()
+        if self.output_file:
+            self.output_file.flush()
+
+    def __del__(self):
+        """Close profiler's stream."""
+        if self.output_file:
+            self.output_file.close()
+
+
+def _prefetched_batches(iterator) -> Optional[int]:
+    """The number of batches prepared by the workers of a dataloader iterator, ``None`` without workers."""
+    data_queue = getattr(iterator, '_data_queue', None)
+    task_info = getattr(iterator, '_task_info', None)
+    if data_queue is None or task_info is None:
+        return None
+    try:
+        ready = data_queue.qsize()
+    except NotImplementedError:  # pragma: no-cover
+        # macOS
+        return None
+    # the batches received out of order wait with their index
+    return ready + sum(1 for info in list(task_info.values()) if len(info) == 2)
+
+
+def _compare_ranks(rank_values: List[Dict]) -> Dict:
+    """The minimum, median and maximum across the ranks of every action, and the slowest rank."""
+    comparison = {}
+    actions = {action: None for values in rank_values for action in values}
+    for action in actions:
+        values = [values[action] for values in rank_values if action in values]
+        means = [value.mean if isinstance(value, RunningStats) else value for value in values]
+        ranks = [rank for rank, values in enumerate(rank_values) if action in values]
+        ordered = sorted(means)
+        middle = len(ordered) // 2
+        median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+        comparison[action] = (ordered[0], median, ordered[-1], ranks[means.index(ordered[-1])])
+    return comparison
+
+
+def _current_rss() -> Optional[int]:
+    # the second field of `statm` is the number of resident pages, Linux only
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _device_memory():
+    """The memory allocated by PyTorch on the current CUDA device and its peak, ``None`` without CUDA."""
+    if not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return None, 0
+    return torch.cuda.memory_allocated(), torch.cuda.max_memory_allocated()
+
+
+def _reset_traced_peak() -> None:
+    # available since Python 3.9, the traced peaks are not recorded before
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+
+def _megabytes(stats: RunningStats, statistic: str, scale: int = 1) -> str:
+    if stats.count == 0:
+        return '-'
+    value = stats.mean * scale if statistic == 'mean' else getattr(stats, statistic)
+    return f"{value / 1024 ** 2:.4g}"
+
+
+def _rank_filepath(filepath: str, rank: int) -> str:
+    # the files of the processes other than rank zero get a `.rank{i}` suffix
+    if rank == 0:
+        return filepath
+    root, ext = os.path.splitext(filepath)
+    return f'{root}.rank{rank}{ext}'
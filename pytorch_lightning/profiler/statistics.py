@@ -0,0 +1,176 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming statistics of the durations recorded by the profilers, in constant memory whatever the number of
+recorded values. Statistics of different processes can be merged, after being sent as state dicts.
+"""
+
+import math
+from typing import Any, Dict
+
+
+class QuantileSketch(object):
+    """
+    Quantiles with a bounded relative error, from a histogram with logarithmically spaced buckets.
+
+    A value ``x`` is counted in bucket ``ceil(log_gamma(x))`` with ``gamma = (1 + a) / (1 - a)``, so any
+    quantile is returned within a relative error ``a`` of the exact one. Durations from a microsecond to
+    an hour span about 1100 buckets with the default 1% accuracy. Sketches with the same accuracy are merged
+    by adding their counts.
+
+    Args:
+        relative_accuracy: the maximal relative error of the quantiles.
+        min_value: values below it are counted as zero.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f'relative_accuracy must be in (0, 1), got {relative_accuracy}')
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged.')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """The ``q`` quantile, ``q`` in ``[0, 1]``, ``nan`` without values."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # the value in the middle of the bucket in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'min_value': self.min_value,
+            'buckets': dict(self.buckets),
+            'zero_count': self.zero_count,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(state['relative_accuracy'], state['min_value'])
+        sketch.buckets = dict(state['buckets'])
+        sketch.zero_count = state['zero_count']
+        sketch.count = state['count']
+        return sketch
+
+
+class RunningStats(object):
+    """
+    Count, total, mean, variance, extrema and quantiles of a stream of values, in constant memory.
+    The mean and variance are updated with Welford's algorithm and merged with Chan's.
+
+    Example::
+
+        >>> stats = RunningStats()
+        >>> for value in (1., 2., 3., 4.):
+        ...     stats.add(value)
+        >>> stats.mean, stats.total, stats.max
+        (2.5, 10.0, 4.0)
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.total = 0.
+        self.mean = 0.
+        self.min = math.inf
+        self.max = -math.inf
+        self._m2 = 0.
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: 'RunningStats'):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """The statistics as plain Python values, e.g. to send them to another process."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'm2': self._m2,
+            'sketch': self.sketch.state_dict(),
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: Dict[str, Any]) -> 'RunningStats':
+        stats = cls()
+        stats.count = state['count']
+        stats.total = state['total']
+        stats.mean = state['mean']
+        stats.min = state['min']
+        stats.max = state['max']
+        stats._m2 = state['m2']
+        stats.sketch = QuantileSketch.from_state_dict(state['sketch'])
+        return stats
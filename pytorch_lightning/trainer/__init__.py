@@ -649,6 +649,24 @@ Trainer will train model for at least min_steps or min_epochs (latest).
     # Run at least for 100 steps (disable min_epochs)
     trainer = Trainer(min_steps=100, min_epochs=0)
 
+max_time
+^^^^^^^^
+
+Wall-clock budget of the training in seconds. The time is checked after every training batch and training
+stops as soon as the next batch might not finish within the budget, i.e. when the elapsed time plus the
+duration of the longest batch so far reaches ``max_time``. Before stopping, every
+:class:`~pytorch_lightning.callbacks.model_checkpoint.ModelCheckpoint` with ``save_last=True`` saves its
+``last`` checkpoint, which resumes in the middle of the epoch. The budget is a hard limit, ``min_epochs`` and ``min_steps``
+are not enforced.
+
+.. testcode::
+
+    # Default (disabled)
+    trainer = Trainer(max_time=None)
+
+    # Stop before 12 hours of training are over
+    trainer = Trainer(max_time=12 * 60 * 60)
+
 num_nodes
 ^^^^^^^^^
 
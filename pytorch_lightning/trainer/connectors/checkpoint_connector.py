@@ -18,6 +18,7 @@ import re
 import signal
 from abc import ABC
 from subprocess import call
+from typing import Dict, List, Optional, Union
 
 import torch
 import torch.distributed as torch_distrib
@@ -28,9 +29,14 @@ from pytorch_lightning.callbacks import EarlyStopping, ModelCheckpoint
 from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.loggers import LightningLoggerBase
 from pytorch_lightning.overrides.data_parallel import LightningDataParallel, LightningDistributedDataParallel
-from pytorch_lightning.utilities import AMPType, rank_zero_warn
+from pytorch_lightning.utilities import OMEGACONF_AVAILABLE, AMPType, rank_zero_warn
+from pytorch_lightning.utilities.checkpoint_manifest import CheckpointManifest
 from pytorch_lightning.utilities.cloud_io import atomic_save, get_filesystem
 from pytorch_lightning.utilities.cloud_io import load as pl_load
+from pytorch_lightning.utilities.compressed_checkpoint import compress_checkpoint
+from pytorch_lightning.utilities.delta_checkpoint import DeltaCheckpointStore
+from pytorch_lightning.utilities.reduced_precision_checkpoint import export_checkpoint
+from pytorch_lightning.utilities.sharded_checkpoint import save_sharded_checkpoint
 from pytorch_lightning.utilities.upgrade_checkpoint import KEYS_MAPPING as DEPRECATED_CHECKPOINT_KEYS
 from pytorch_lightning.accelerators.base_backend import Accelerator
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
@@ -40,13 +46,6 @@ try:
 except ImportError:
     amp = None
 
-try:
-    from omegaconf import Container
-except ImportError:
-    OMEGACONF_AVAILABLE = False
-else:
-    OMEGACONF_AVAILABLE = True
-
 
 class CheckpointConnector:
 
@@ -146,6 +145,14 @@ class CheckpointConnector:
         self.trainer.global_step = checkpoint['global_step']
         self.trainer.current_epoch = checkpoint['epoch']
 
+        # checkpoints saved mid-epoch resume at the batch they were saved after
+        epoch_state = checkpoint.get('epoch_progress_state')
+        if epoch_state is not None:
+            self.trainer.global_step = epoch_state['global_step']
+            self.trainer.current_epoch = epoch_state['epoch']
+            self.trainer.total_batch_idx = epoch_state['total_batch_idx']
+            self.trainer.train_loop.resume_state = epoch_state
+
         # crash if max_epochs is lower than the current epoch from the checkpoint
         if self.trainer.current_epoch > self.trainer.max_epochs:
             m = f"""
@@ -158,7 +165,11 @@ class CheckpointConnector:
         # Inequality deals with different global step for odd vs even num_training_batches
         n_accum = 1 if self.trainer.accumulate_grad_batches is None else self.trainer.accumulate_grad_batches
         expected_steps = self.trainer.num_training_batches / n_accum
-        if self.trainer.num_training_batches != 0 and self.trainer.global_step % expected_steps > 1:
+        if (
+            epoch_state is None
+            and self.trainer.num_training_batches != 0
+            and self.trainer.global_step % expected_steps > 1
+        ):
             rank_zero_warn(
                 "You're resuming from a checkpoint that ended mid-epoch. "
                 "This can cause unreliable results if further training is done, "
@@ -187,17 +198,19 @@ class CheckpointConnector:
         """If there is a set of hpc weights, use as signal to restore model."""
         did_restore = False
 
-        # look for hpc weights
+        # look for hpc weights, the manifest avoids listing the folder
         folderpath = str(self.trainer.weights_save_path)
         fs = get_filesystem(folderpath)
-        if fs.exists(folderpath):
+        filepath = self._recorded_hpc_checkpoint(folderpath)
+        if filepath is None and fs.exists(folderpath):
             files = [os.path.basename(f) for f in fs.ls(folderpath)]
-            hpc_weight_paths = [x for x in files if 'hpc_ckpt' in x]
+            if any('hpc_ckpt' in x for x in files):
+                filepath = os.path.join(folderpath, f'hpc_ckpt_{self._max_ckpt_number(files)}.ckpt')
 
-            # if hpc weights exist restore model
-            if len(hpc_weight_paths) > 0:
-                self.hpc_load(folderpath, self.trainer.on_gpu)
-                did_restore = True
+        # if hpc weights exist restore model
+        if filepath is not None:
+            self.hpc_load(folderpath, self.trainer.on_gpu, filepath=filepath)
+            did_restore = True
         return did_restore
 
     # ----------------------------------
@@ -212,10 +225,7 @@ class CheckpointConnector:
         # save logger to make sure we get all the metrics
         logger.save()
 
-        ckpt_number = self.max_ckpt_in_folder(folderpath) + 1
-
-        fs.makedirs(folderpath, exist_ok=True)
-        filepath = os.path.join(folderpath, f'hpc_ckpt_{ckpt_number}.ckpt')
+        filepath = self.hpc_checkpoint_path(folderpath)
 
         # give model a chance to do something on hpc_save
         model = self.trainer.get_model()
@@ -224,6 +234,23 @@ class CheckpointConnector:
         model.on_hpc_save(checkpoint)
 
         # do the actual save
+        self.hpc_write(checkpoint, filepath)
+
+        return filepath
+
+    def hpc_checkpoint_path(self, folderpath: str) -> str:
+        """The path of the next HPC checkpoint in ``folderpath``, which ``hpc_load`` will restore."""
+        folderpath = str(folderpath)
+        fs = get_filesystem(folderpath)
+        fs.makedirs(folderpath, exist_ok=True)
+        ckpt_number = self.max_ckpt_in_folder(folderpath) + 1
+        return os.path.join(folderpath, f'hpc_ckpt_{ckpt_number}.ckpt')
+
+    def hpc_write(self, checkpoint: dict, filepath: str):
+        """
+        Saves an HPC checkpoint. It is recorded in the manifest of its folder if it has one, or if
+        ``ModelCheckpoint(manifest=True)``.
+        """
         # TODO: fix for anything with multiprocess DP, DDP, DDP2
         try:
             atomic_save(checkpoint, filepath)
@@ -235,7 +262,12 @@ class CheckpointConnector:
             )
             atomic_save(checkpoint, filepath)
 
-        return filepath
+        folderpath = os.path.dirname(filepath)
+        checkpoint_callback = self.trainer.checkpoint_callback
+        if (checkpoint_callback is not None and checkpoint_callback.manifest) or CheckpointManifest.exists(folderpath):
+            CheckpointManifest(folderpath).add(
+                filepath, step=self.trainer.global_step, epoch=self.trainer.current_epoch, kind='hpc'
+            )
 
     def dump_checkpoint(self, weights_only: bool = False) -> dict:
         """Creating model checkpoint.
@@ -264,6 +296,11 @@ class CheckpointConnector:
                 optimizer_states.append(optimizer.state_dict())
             checkpoint['optimizer_states'] = optimizer_states
 
+            # save the position inside the epoch
+            epoch_state = self.trainer.train_loop.epoch_progress_state()
+            if epoch_state is not None:
+                checkpoint['epoch_progress_state'] = epoch_state
+
             # save lr schedulers
             lr_schedulers = []
             for scheduler in self.trainer.lr_schedulers:
@@ -286,6 +323,8 @@ class CheckpointConnector:
                 checkpoint[LightningModule.CHECKPOINT_HYPER_PARAMS_NAME] = model._hparams_name
             # add arguments to the checkpoint
             if OMEGACONF_AVAILABLE:
+                from omegaconf import Container
+
                 checkpoint[LightningModule.CHECKPOINT_HYPER_PARAMS_KEY] = model.hparams
                 if isinstance(model.hparams, Container):
                     checkpoint[LightningModule.CHECKPOINT_HYPER_PARAMS_TYPE] = type(model.hparams)
@@ -297,8 +336,9 @@ class CheckpointConnector:
 
         return checkpoint
 
-    def hpc_load(self, folderpath, on_gpu):
-        filepath = '{}/hpc_ckpt_{}.ckpt'.format(folderpath, self.max_ckpt_in_folder(folderpath))
+    def hpc_load(self, folderpath, on_gpu, filepath: Optional[str] = None):
+        if filepath is None:
+            filepath = '{}/hpc_ckpt_{}.ckpt'.format(folderpath, self.max_ckpt_in_folder(folderpath))
 
         # load on CPU first
         checkpoint = torch.load(filepath, map_location=lambda storage, loc: storage)
@@ -327,8 +367,15 @@ class CheckpointConnector:
         log.info(f'restored hpc model from: {filepath}')
 
     def max_ckpt_in_folder(self, path, name_key='ckpt_'):
-        fs = get_filesystem(path)
-        files = [os.path.basename(f) for f in fs.ls(path)]
+        recorded = self._recorded_hpc_checkpoint(path)
+        if recorded is not None:
+            files = [os.path.basename(recorded)]
+        else:
+            fs = get_filesystem(path)
+            files = [os.path.basename(f) for f in fs.ls(path)]
+        return self._max_ckpt_number(files, name_key)
+
+    def _max_ckpt_number(self, files: List[str], name_key: str = 'ckpt_') -> int:
         files = [x for x in files if name_key in x]
         if len(files) == 0:
             return 0
@@ -341,17 +388,60 @@ class CheckpointConnector:
 
         return max(ckpt_vs)
 
-    def save_checkpoint(self, filepath, weights_only: bool = False):
-        checkpoint = self.dump_checkpoint(weights_only)
+    def _recorded_hpc_checkpoint(self, path: str) -> Optional[str]:
+        """The HPC checkpoint recorded last in the manifest of ``path``, ``None`` if there is none or it is missing."""
+        path = str(path)
+        filepath = CheckpointManifest(path).latest(kind='hpc')
+        if filepath is not None and get_filesystem(path).exists(filepath):
+            return filepath
+        return None
+
+    def save_checkpoint(
+            self,
+            filepath,
+            weights_only: bool = False,
+            max_shard_size: Optional[int] = None,
+            delta_store: Optional[DeltaCheckpointStore] = None,
+            compression: Optional[str] = None,
+            export_dtype: Optional[Union[str, torch.dtype]] = None,
+            dtype_policy: Optional[Dict[str, Optional[Union[str, torch.dtype]]]] = None,
+    ):
+        if export_dtype is None:
+            checkpoint = self.dump_checkpoint(weights_only)
+        else:
+            checkpoint = export_checkpoint(
+                self.dump_checkpoint(weights_only=True), export_dtype, dtype_policy, model=self.trainer.get_model()
+            )
 
         if self.trainer.is_global_zero:
             # do the actual save
             try:
-                atomic_save(checkpoint, filepath)
+                self._save(checkpoint, filepath, max_shard_size, delta_store, compression)
             except AttributeError as err:
                 if LightningModule.CHECKPOINT_HYPER_PARAMS_KEY in checkpoint:
                     del checkpoint[LightningModule.CHECKPOINT_HYPER_PARAMS_KEY]
                 rank_zero_warn(
                     'Warning, `module_arguments` dropped from checkpoint.' f' An attribute is not picklable {err}'
                 )
-                atomic_save(checkpoint, filepath)
+                self._save(checkpoint, filepath, max_shard_size, delta_store, compression)
+
+    @staticmethod
+    def _save(
+            checkpoint,
+            filepath,
+            max_shard_size: Optional[int] = None,
+            delta_store: Optional[DeltaCheckpointStore] = None,
+            compression: Optional[str] = None,
+    ):
+        if sum(option is not None for option in (max_shard_size, delta_store, compression)) > 1:
+            raise MisconfigurationException(
+                'Only one of sharded, delta and compressed checkpoints can be used at the same time.'
+            )
+        if max_shard_size is not None:
+            save_sharded_checkpoint(checkpoint, filepath, max_shard_size)
+        elif delta_store is not None:
+            delta_store.save(checkpoint, filepath)
+        elif compression is not None:
+            atomic_save(compress_checkpoint(checkpoint, compression), filepath)
+        else:
+            atomic_save(checkpoint, filepath)
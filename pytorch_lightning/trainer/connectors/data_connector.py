@@ -23,6 +23,8 @@ class DataConnector(object):
 
     def __init__(self, trainer):
         self.trainer = trainer
+        # the iterator of the current training epoch, e.g. to inspect the prefetched batches of its workers
+        self.train_iterator = None
 
     def on_trainer_init(self, check_val_every_n_epoch, reload_dataloaders_every_epoch, prepare_data_per_node):
         self.trainer.datamodule = None
@@ -32,9 +34,9 @@ class DataConnector(object):
         self.trainer.reload_dataloaders_every_epoch = reload_dataloaders_every_epoch
         self.trainer._is_data_prepared = False
 
-    def get_profiled_train_dataloader(self, train_dataloader):
+    def get_profiled_train_dataloader(self, train_dataloader, start_batch_idx: int = 0):
         profiled_dl = self.trainer.profiler.profile_iterable(
-            enumerate(self._with_is_last(train_dataloader)),
+            enumerate(self._with_is_last(train_dataloader), start_batch_idx),
             "get_train_batch"
         )
         return profiled_dl
@@ -43,6 +45,7 @@ class DataConnector(object):
         """Pass through values from the given iterable with an added boolean indicating if this is the last item.
         See `https://stackoverflow.com/a/1630350 <https://stackoverflow.com/a/1630350>`_"""
         it = iter(iterable)
+        self.train_iterator = it
         last = next(it)
         for val in it:
             # yield last and has next
@@ -98,10 +98,10 @@ class LoggerConnector:
 
         self.trainer.dev_debugger.track_pbar_metrics_history(metrics)
 
-    def on_evaluation_epoch_end(self, eval_results, using_eval_result, test_mode):
+    def on_evaluation_epoch_end(self, eval_results, using_eval_result, test_mode, metric_suffix=''):
         # TODO: merge both functions?
         self._log_on_evaluation_epoch_end_metrics(eval_results, using_eval_result)
-        return self.__log_evaluation_epoch_metrics_2(eval_results, test_mode)
+        return self.__log_evaluation_epoch_metrics_2(eval_results, test_mode, metric_suffix)
 
     def _log_on_evaluation_epoch_end_metrics(self, eval_results, using_eval_result):
         if len(eval_results) > 0 and eval_results[0] is None:
@@ -140,7 +140,7 @@ class LoggerConnector:
                     flat['early_stop_on'] = flat['val_loss']
                 self.trainer.logger_connector.callback_metrics.update(flat)
 
-    def __log_evaluation_epoch_metrics_2(self, eval_results, test_mode):
+    def __log_evaluation_epoch_metrics_2(self, eval_results, test_mode, metric_suffix=''):
         if self.trainer.running_sanity_check:
             return
 
@@ -169,8 +169,9 @@ class LoggerConnector:
                 # add metrics to prog bar
                 self.trainer.logger_connector.add_progress_bar_metrics(prog_bar_metrics)
 
-                # log metrics
-                self.trainer.logger_connector.log_metrics(log_metrics, {})
+                # log metrics, with the suffix of the checkpoint when evaluating many checkpoints
+                suffixed_log_metrics = {f'{k}{metric_suffix}': v for k, v in log_metrics.items()}
+                self.trainer.logger_connector.log_metrics(suffixed_log_metrics, {})
 
                 # track metrics for callbacks (all prog bar, logged and callback metrics)
                 self.trainer.logger_connector.callback_metrics.update(callback_metrics)
@@ -43,13 +43,6 @@ except ImportError:
 else:
     XLA_AVAILABLE = True
 
-try:
-    import horovod.torch as hvd
-except (ModuleNotFoundError, ImportError):
-    HOROVOD_AVAILABLE = False
-else:
-    HOROVOD_AVAILABLE = True
-
 
 class TrainerDataLoadingMixin(ABC):
 
@@ -144,6 +137,7 @@ class TrainerDataLoadingMixin(ABC):
         if self.use_tpu:
             kwargs = dict(num_replicas=xm.xrt_world_size(), rank=xm.get_ordinal())
         elif self.use_horovod:
+            import horovod.torch as hvd
             kwargs = dict(num_replicas=hvd.size(), rank=hvd.rank())
         else:
             world_size = {
@@ -348,6 +342,7 @@ class TrainerDataLoadingMixin(ABC):
 
         elif self.use_horovod:
             # all processes wait until data download has happened
+            import horovod.torch as hvd
             hvd.join()
 
         return dataloader
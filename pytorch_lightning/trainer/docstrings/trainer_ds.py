@@ -180,11 +180,18 @@ test = r"""
 
             ckpt_path: Either ``best`` or path to the checkpoint you wish to test.
                 If ``None``, use the weights from the last epoch to test. Default to ``best``.
+                With a list of paths or ``top_k``, the top k checkpoints of ``ModelCheckpoint``, every checkpoint
+                is evaluated on each test batch, so the test data is only loaded once.
 
             verbose: If True, prints the test results
 
+            ckpt_processes: When testing many checkpoints on CPU, the number of forked processes sharing them.
+                The batches are sent to every process. Default ``0``, the checkpoints are evaluated one after the
+                other in the trainer process.
+
         Returns:
-            The final test result dictionary. If no test_epoch_end is defined returns a list of dictionaries
+            The final test result dictionary. If no test_epoch_end is defined returns a list of dictionaries.
+            When testing many checkpoints, a dictionary of these results by checkpoint path.
 
         Example::
 
@@ -221,4 +228,9 @@ test = r"""
             model = LightningModule.load_from_checkpoint('path/to/checkpoint.ckpt')
             trainer = Trainer()
             trainer.test(model, test_dataloaders=test)
+
+            # Option 5
+            # compare the top k checkpoints of ``ModelCheckpoint``, loading the test data once
+            trainer.fit(model)
+            results = trainer.test(test_dataloaders=test, ckpt_path='top_k')
         """
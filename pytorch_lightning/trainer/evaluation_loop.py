@@ -12,8 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import multiprocessing
+import sys
+import traceback
+from typing import Dict, List, Sequence
+
+import torch
+
 from pytorch_lightning.trainer.supporters import PredictionCollection
 from pytorch_lightning.core.step_result import Result, EvalResult
+from pytorch_lightning.utilities import rank_zero_warn
+from pytorch_lightning.utilities.cloud_io import load as pl_load
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from pytorch_lightning.utilities.model_utils import is_overridden
 
@@ -26,6 +36,14 @@ class EvaluationLoop(object):
         self.predictions = None
         self.max_batches = None
 
+        # evaluation of many checkpoints on the same batches, see `setup_checkpoints`
+        self.checkpoint_paths = None
+        self.checkpoint_states = None
+        self.checkpoint_outputs = None
+        self.checkpoint_processes = 0
+        self._original_state = None
+        self._workers = None
+
     def on_trainer_init(self):
         self.trainer.num_val_batches = []
         self.trainer.num_sanity_val_batches = []
@@ -116,6 +134,96 @@ class EvaluationLoop(object):
 
         self.max_batches = max_batches
 
+    @property
+    def evaluating_checkpoints(self) -> bool:
+        return self.checkpoint_states is not None
+
+    def setup_checkpoints(self, ckpt_paths: Sequence[str], num_processes: int = 0):
+        """
+        Evaluates each of the checkpoints on every batch of the next evaluation, the batches are only loaded once.
+        With ``num_processes``, the checkpoints are shared between forked CPU processes.
+        """
+        self.checkpoint_paths = list(ckpt_paths)
+        self.checkpoint_states = [
+            pl_load(path, map_location=lambda storage, loc: storage, weights_only=True)['state_dict']
+            for path in self.checkpoint_paths
+        ]
+        self.checkpoint_processes = num_processes
+
+    def teardown_checkpoints(self):
+        self.checkpoint_paths = None
+        self.checkpoint_states = None
+        self.checkpoint_outputs = None
+        self.checkpoint_processes = 0
+
+    def on_checkpoints_evaluation_start(self, model, num_dataloaders):
+        # the tensors of the model are switched back once all checkpoints are evaluated
+        self._original_state = _model_tensors(model)
+        # each checkpoint is loaded once into its own tensors, the model is switched to them for each batch
+        try:
+            for ckpt_idx, state in enumerate(self.checkpoint_states):
+                # buffers which are not saved keep their values
+                _bind_tensors(model, {name: t.clone() for name, t in self._original_state.items()})
+                model.load_state_dict(state)
+                self.checkpoint_states[ckpt_idx] = _model_tensors(model)
+        finally:
+            _bind_tensors(model, self._original_state)
+        self.checkpoint_outputs = [[[] for _ in range(num_dataloaders)] for _ in self.checkpoint_states]
+        if self.checkpoint_processes > 0:
+            if _FORK_AVAILABLE:
+                self._workers = _CheckpointWorkers(self, self.checkpoint_states, self.checkpoint_processes)
+            else:
+                rank_zero_warn('`ckpt_processes` requires forking processes, which is not supported on this'
+                               ' platform. The checkpoints are evaluated one after the other.')
+
+    def checkpoints_evaluation_step(self, test_mode, batch, batch_idx, dataloader_idx):
+        if self.trainer.on_gpu:
+            # moved once for all checkpoints
+            batch = self.trainer.accelerator_backend.batch_to_device(batch, self.trainer.get_model().device)
+
+        message = (test_mode, batch, batch_idx, dataloader_idx)
+        if self._workers is not None:
+            outputs = self._workers.evaluate(message)
+        else:
+            outputs = _evaluate_states(self, self.checkpoint_states, message)
+
+        for ckpt_idx, (ckpt_outputs, output) in enumerate(zip(self.checkpoint_outputs, outputs)):
+            # the step metrics of each checkpoint are logged under their own keys, as the epoch metrics
+            self.log_step_metrics(output, batch_idx, metric_suffix=f'/ckpt_{ckpt_idx}')
+            if output is not None:
+                ckpt_outputs[dataloader_idx].append(output)
+
+    def checkpoints_evaluation_epoch_end(self, num_dataloaders, test_mode):
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
+
+        model = self.trainer.get_model()
+        verbose = self.trainer.verbose_test
+        # the results of all checkpoints are printed as one table
+        self.trainer.verbose_test = False
+        eval_loop_results, eval_results = {}, {}
+        try:
+            for ckpt_idx, (path, tensors) in enumerate(zip(self.checkpoint_paths, self.checkpoint_states)):
+                _bind_tensors(model, tensors)
+                self.outputs = self.checkpoint_outputs[ckpt_idx]
+                eval_results[path] = self.evaluation_epoch_end(num_dataloaders)
+                # the metrics of each checkpoint are logged as a different line in the same graph
+                eval_loop_results[path] = self.log_epoch_metrics(
+                    eval_results[path], test_mode, metric_suffix=f'/ckpt_{ckpt_idx}'
+                )
+        finally:
+            self.trainer.verbose_test = verbose
+            _bind_tensors(model, self._original_state)
+            self._original_state = None
+
+        if test_mode and verbose:
+            print('-' * 80)
+            print(format_checkpoint_results(eval_loop_results))
+            print('-' * 80)
+
+        return eval_loop_results, eval_results
+
     def on_evaluation_epoch_start(self, *args, **kwargs):
         if self.testing:
             self.trainer.call_hook('on_test_epoch_start', *args, **kwargs)
@@ -170,12 +278,13 @@ class EvaluationLoop(object):
         eval_results = self.__run_eval_epoch_end(num_dataloaders, using_eval_result)
         return eval_results
 
-    def log_epoch_metrics(self, eval_results, test_mode):
+    def log_epoch_metrics(self, eval_results, test_mode, metric_suffix=''):
         using_eval_result = self.is_using_eval_results()
         eval_loop_results = self.trainer.logger_connector.on_evaluation_epoch_end(
             eval_results,
             using_eval_result,
-            test_mode
+            test_mode,
+            metric_suffix=metric_suffix,
         )
         return eval_loop_results
 
@@ -273,7 +382,7 @@ class EvaluationLoop(object):
         else:
             self.trainer.call_hook('on_validation_epoch_end', *args, **kwargs)
 
-    def log_step_metrics(self, output, batch_idx):
+    def log_step_metrics(self, output, batch_idx, metric_suffix=''):
         if self.trainer.running_sanity_check:
             return
 
@@ -285,9 +394,134 @@ class EvaluationLoop(object):
                 # make the metrics appear as a different line in the same graph
                 metrics_by_epoch = {}
                 for k, v in step_log_metrics.items():
-                    metrics_by_epoch[f'{k}/epoch_{self.trainer.current_epoch}'] = v
+                    metrics_by_epoch[f'{k}/epoch_{self.trainer.current_epoch}{metric_suffix}'] = v
 
                 self.trainer.logger_connector.log_metrics(metrics_by_epoch, {}, step=batch_idx)
 
             if len(step_pbar_metrics) > 0:
+                step_pbar_metrics = {f'{k}{metric_suffix}': v for k, v in step_pbar_metrics.items()}
                 self.trainer.logger_connector.add_progress_bar_metrics(step_pbar_metrics)
+
+
+def format_checkpoint_results(results) -> str:
+    """Formats the results of many checkpoints as a table per dataloader, one row per checkpoint."""
+    lines = []
+    num_dataloaders = max(len(ckpt_results) for ckpt_results in results.values())
+    for dataloader_idx in range(num_dataloaders):
+        rows = {
+            path: ckpt_results[dataloader_idx] for path, ckpt_results in results.items()
+            if dataloader_idx < len(ckpt_results)
+        }
+        names = sorted({name for row in rows.values() for name in row})
+        header = ['checkpoint'] + names
+        table = [
+            [path] + [_format_value(row[name]) if name in row else '' for name in names] for path, row in rows.items()
+        ]
+        widths = [max(len(str(cell)) for cell in column) for column in zip(header, *table)]
+        lines.append(f'DATALOADER:{dataloader_idx} TEST RESULTS')
+        for cells in [header] + table:
+            lines.append('  '.join(str(cell).ljust(width) for cell, width in zip(cells, widths)).rstrip())
+    return '\n'.join(lines)
+
+
+def _format_value(value) -> str:
+    if isinstance(value, torch.Tensor) and value.numel() == 1:
+        value = value.item()
+    if isinstance(value, float):
+        return f'{value:.4f}'
+    return str(value)
+
+
+def _model_tensors(model) -> Dict[str, torch.Tensor]:
+    """The tensors of the parameters and buffers of ``model``, by name."""
+    return {name: t.data for name, t in itertools.chain(model.named_parameters(), model.named_buffers())}
+
+
+def _bind_tensors(model, tensors: Dict[str, torch.Tensor]):
+    """Makes the parameters and buffers of ``model`` use ``tensors``, without copying them."""
+    for name, t in itertools.chain(model.named_parameters(), model.named_buffers()):
+        t.data = tensors[name]
+
+
+def _evaluate_states(evaluation_loop, states, message) -> List:
+    """Runs the evaluation step on one batch with the model switched to the tensors of each checkpoint."""
+    model = evaluation_loop.trainer.get_model()
+    outputs = []
+    for tensors in states:
+        _bind_tensors(model, tensors)
+        output = evaluation_loop.evaluation_step(*message)
+        outputs.append(evaluation_loop.evaluation_step_end(output))
+    return outputs
+
+
+# the workers are forked to share the checkpoints of the trainer, which is not possible on Windows
+# and not safe on macOS
+_FORK_AVAILABLE = 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin'
+
+
+class _CheckpointWorkers(object):
+    """
+    Processes forked from the trainer, each evaluates a share of the checkpoints on the batches it is sent.
+    The batches are loaded once by the trainer, the epoch end of each checkpoint runs in the trainer.
+    """
+
+    def __init__(self, evaluation_loop, states, num_processes):
+        context = multiprocessing.get_context('fork')
+        num_processes = min(num_processes, len(states))
+        # the threads of the trainer process are shared by the workers
+        num_threads = max(1, torch.get_num_threads() // num_processes)
+        self.shares = [list(range(i, len(states), num_processes)) for i in range(num_processes)]
+        self.connections = []
+        self.processes = []
+        for share in self.shares:
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_checkpoint_worker,
+                args=(evaluation_loop, [states[k] for k in share], worker_connection, num_threads),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.num_states = len(states)
+
+    def evaluate(self, message) -> List:
+        for connection in self.connections:
+            connection.send(message)
+        outputs = [None] * self.num_states
+        for share, connection in zip(self.shares, self.connections):
+            result = connection.recv()
+            if isinstance(result, str):
+                self.close()
+                raise RuntimeError(f'Evaluating a checkpoint failed in a worker process:\n{result}')
+            for ckpt_idx, output in zip(share, result):
+                outputs[ckpt_idx] = output
+        return outputs
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+
+def _checkpoint_worker(evaluation_loop, states, connection, num_threads):
+    torch.set_num_threads(num_threads)
+    torch.set_grad_enabled(False)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        try:
+            outputs = _evaluate_states(evaluation_loop, states, message)
+        except Exception:
+            # exceptions are not always picklable, the trainer raises the formatted traceback
+            outputs = traceback.format_exc()
+        connection.send(outputs)
+    connection.close()
@@ -1,17 +1,20 @@
 from pytorch_lightning.utilities.cloud_io import get_filesystem
 from pytorch_lightning.trainer.connectors.logger_connector import LoggerConnector
 from pytorch_lightning.trainer.states import TrainerState
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pytorch_lightning.utilities import argparse_utils
 from argparse import ArgumentParser, Namespace
 from abc import ABC
 import inspect
 import os
+import torch
 from pytorch_lightning.utilities.model_utils import is_overridden
 from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.callbacks import ProgressBarBase
 from pytorch_lightning.trainer.connectors.model_connector import ModelConnector
 from pytorch_lightning.trainer.connectors.checkpoint_connector import CheckpointConnector
+from pytorch_lightning.utilities.delta_checkpoint import DeltaCheckpointStore
+from pytorch_lightning.profiler import BaseProfiler
 
 
 class TrainerProperties(ABC):
@@ -32,6 +35,7 @@ class TrainerProperties(ABC):
     _weights_save_path: str
     model_connector: ModelConnector
     checkpoint_connector: CheckpointConnector
+    profiler: BaseProfiler
 
     @property
     def use_amp(self) -> bool:
@@ -169,8 +173,45 @@ class TrainerProperties(ABC):
             return os.path.normpath(self._weights_save_path)
         return self._weights_save_path
 
-    def save_checkpoint(self, filepath, weights_only: bool = False):
-        self.checkpoint_connector.save_checkpoint(filepath, weights_only)
+    def save_checkpoint(
+            self,
+            filepath,
+            weights_only: bool = False,
+            max_shard_size: Optional[int] = None,
+            delta_store: Optional[DeltaCheckpointStore] = None,
+            compression: Optional[str] = None,
+            export_dtype: Optional[Union[str, torch.dtype]] = None,
+            dtype_policy: Optional[Dict[str, Optional[Union[str, torch.dtype]]]] = None,
+    ):
+        """
+        Saves the current training state to ``filepath``.
+
+        Args:
+            filepath: where to save the checkpoint.
+            weights_only: saving model weights only.
+            max_shard_size: if set, the checkpoint is written as a directory in which the model and optimizer
+                tensors are split into shards of at most this many bytes, saved and loaded in parallel.
+                See :mod:`~pytorch_lightning.utilities.sharded_checkpoint`.
+            delta_store: if set, only the tensors missing from this store are written next to a manifest
+                saved at ``filepath``. See :mod:`~pytorch_lightning.utilities.delta_checkpoint`.
+            compression: if set, the model and optimizer tensors are compressed in parallel with this codec,
+                ``'zlib'`` or ``'lzma'``. See :mod:`~pytorch_lightning.utilities.compressed_checkpoint`.
+            export_dtype: if set, only the model weights are saved and their floating point tensors are cast
+                to this dtype, e.g. ``'float16'`` or ``'bfloat16'``. They are cast back when loaded.
+                See :mod:`~pytorch_lightning.utilities.reduced_precision_checkpoint`.
+            dtype_policy: the dtypes of the exported tensors, by ``fnmatch`` pattern of their ``state_dict`` keys.
+                ``None`` keeps the original dtype, the other tensors are cast to ``export_dtype``.
+        """
+        with self.profiler.profile_optional('save_checkpoint'):
+            self.checkpoint_connector.save_checkpoint(
+                filepath,
+                weights_only,
+                max_shard_size=max_shard_size,
+                delta_store=delta_store,
+                compression=compression,
+                export_dtype=export_dtype,
+                dtype_policy=dtype_policy,
+            )
 
     def get_model(self):
         return self.model_connector.get_model()
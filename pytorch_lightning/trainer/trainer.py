@@ -20,6 +20,7 @@ import torch
 from torch.utils.data import DataLoader
 
 from pytorch_lightning.callbacks import Callback, EarlyStopping, ModelCheckpoint
+from pytorch_lightning.callbacks.preemption_checkpoint import Preempted
 from pytorch_lightning.core.datamodule import LightningDataModule
 from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.core.memory import ModelSummary
@@ -103,6 +104,7 @@ class Trainer(
         min_epochs: int = 1,
         max_steps: Optional[int] = None,
         min_steps: Optional[int] = None,
+        max_time: Optional[float] = None,
         limit_train_batches: Union[int, float] = 1.0,
         limit_val_batches: Union[int, float] = 1.0,
         limit_test_batches: Union[int, float] = 1.0,
@@ -207,7 +209,9 @@ class Trainer(
         )
 
         # init train loop related flags
-        self.train_loop.on_trainer_init(max_epochs, min_epochs, max_steps, min_steps, num_sanity_val_steps)
+        self.train_loop.on_trainer_init(
+            max_epochs, min_epochs, max_steps, min_steps, num_sanity_val_steps, max_time
+        )
         self.evaluation_loop.on_trainer_init()
 
         # configure tuner
@@ -354,6 +358,11 @@ class Trainer(
                     self.train_loop.on_train_end()
                     return
 
+                # the time budget is a hard limit, it does not wait for min_epochs or min_steps
+                if self.train_loop.time_budget_reached:
+                    self.train_loop.on_train_end()
+                    return
+
                 # update LR schedulers
                 self.optimizer_connector.update_learning_rates(interval='epoch')
 
@@ -373,7 +382,7 @@ class Trainer(
             # hook
             self.train_loop.on_train_end()
 
-        except KeyboardInterrupt:
+        except KeyboardInterrupt as err:
             rank_zero_warn('Detected KeyboardInterrupt, attempting graceful shutdown...')
 
             # user could press ctrl+c many times... only shutdown once
@@ -382,8 +391,8 @@ class Trainer(
                 self._state = TrainerState.INTERRUPTED
                 self.on_keyboard_interrupt()
 
-                # hook
-                self.train_loop.on_train_end()
+                # hook, a preemption checkpoint is already written, no other is saved in the grace period
+                self.train_loop.on_train_end(save_checkpoint=not isinstance(err, Preempted))
 
     def run_evaluation(self, test_mode: bool = False, max_batches=None):
         # bookkeeping
@@ -403,6 +412,8 @@ class Trainer(
 
         # set up the eval loop
         self.evaluation_loop.setup(model, max_batches, dataloaders)
+        if self.evaluation_loop.evaluating_checkpoints:
+            self.evaluation_loop.on_checkpoints_evaluation_start(model, len(dataloaders))
 
         # hook
         # TODO: should this be insider the dataloader loop?
@@ -426,6 +437,12 @@ class Trainer(
                 # hook
                 self.evaluation_loop.on_evaluation_batch_start(batch, batch_idx, dataloader_idx)
 
+                if self.evaluation_loop.evaluating_checkpoints:
+                    # every checkpoint is evaluated on the batch, the outputs are kept per checkpoint
+                    self.evaluation_loop.checkpoints_evaluation_step(test_mode, batch, batch_idx, dataloader_idx)
+                    self.evaluation_loop.on_evaluation_batch_end(batch, batch_idx, dataloader_idx)
+                    continue
+
                 # lightning module methods
                 output = self.evaluation_loop.evaluation_step(test_mode, batch, batch_idx, dataloader_idx)
                 output = self.evaluation_loop.evaluation_step_end(output)
@@ -443,11 +460,17 @@ class Trainer(
 
             self.evaluation_loop.outputs.append(dl_outputs)
 
-        # lightning module method
-        eval_results = self.evaluation_loop.evaluation_epoch_end(num_dataloaders=len(dataloaders))
+        if self.evaluation_loop.evaluating_checkpoints:
+            # results by checkpoint path
+            eval_loop_results, eval_results = self.evaluation_loop.checkpoints_evaluation_epoch_end(
+                len(dataloaders), test_mode
+            )
+        else:
+            # lightning module method
+            eval_results = self.evaluation_loop.evaluation_epoch_end(num_dataloaders=len(dataloaders))
 
-        # bookkeeping
-        eval_loop_results = self.evaluation_loop.log_epoch_metrics(eval_results, test_mode)
+            # bookkeeping
+            eval_loop_results = self.evaluation_loop.log_epoch_metrics(eval_results, test_mode)
         self.evaluation_loop.predictions.to_disk()
 
         # hook
@@ -470,12 +493,14 @@ class Trainer(
         if len(eval_loop_results) == 0:
             return 1
 
-        # remove the tensors from the eval results
-        for i, result in enumerate(eval_loop_results):
-            if isinstance(result, dict):
-                for k, v in result.items():
-                    if isinstance(v, torch.Tensor):
-                        result[k] = v.cpu().item()
+        # remove the tensors from the eval results, of each checkpoint when testing many checkpoints
+        is_by_checkpoint = isinstance(eval_loop_results, dict)
+        for results in (eval_loop_results.values() if is_by_checkpoint else [eval_loop_results]):
+            for i, result in enumerate(results):
+                if isinstance(result, dict):
+                    for k, v in result.items():
+                        if isinstance(v, torch.Tensor):
+                            result[k] = v.cpu().item()
 
         return eval_loop_results
 
@@ -517,10 +542,28 @@ class Trainer(
         self,
         model: Optional[LightningModule] = None,
         test_dataloaders: Optional[Union[DataLoader, List[DataLoader]]] = None,
-        ckpt_path: Optional[str] = 'best',
+        ckpt_path: Optional[Union[str, List[str]]] = 'best',
         verbose: bool = True,
         datamodule: Optional[LightningDataModule] = None,
+        ckpt_processes: int = 0,
     ):
+        """
+        Runs the test loop, on the given model or on the weights of checkpoints.
+
+        Args:
+            model: the model to test, by default the model of the trainer with the weights of ``ckpt_path``.
+            test_dataloaders: dataloaders overriding those of the model.
+            ckpt_path: ``'best'`` for the best checkpoint of the checkpoint callback, the path of a checkpoint,
+                or ``None`` to keep the current weights. To test many checkpoints on the same batches,
+                a list of paths or ``'top_k'`` for the top k checkpoints of the checkpoint callback.
+            verbose: whether to print the test results.
+            datamodule: a datamodule providing the test dataloaders.
+            ckpt_processes: when testing many checkpoints on CPU, the number of processes sharing them.
+
+        Returns:
+            The results of each test dataloader, as a list. When testing many checkpoints, a dict mapping the
+            path of each checkpoint to this list.
+        """
         # --------------------
         # SETUP HOOK
         # --------------------
@@ -540,6 +583,8 @@ class Trainer(
 
         if model is not None:
             results = self.__test_given_model(model, test_dataloaders)
+        elif ckpt_path == 'top_k' or isinstance(ckpt_path, (list, tuple)):
+            results = self.__test_using_many_weights(ckpt_path, test_dataloaders, ckpt_processes)
         else:
             results = self.__test_using_best_weights(ckpt_path, test_dataloaders)
 
@@ -560,6 +605,9 @@ class Trainer(
         if ckpt_path is not None:
             # ckpt_path is 'best' so load the best model
             if ckpt_path == 'best':
+                if not self.checkpoint_callback.best_model_path:
+                    # e.g. a new trainer, the best checkpoint of previous runs is in the manifest
+                    self.checkpoint_callback.load_top_k_from_manifest()
                 ckpt_path = self.checkpoint_callback.best_model_path
 
             if len(ckpt_path) == 0:
@@ -592,6 +640,54 @@ class Trainer(
 
         return results
 
+    def __test_using_many_weights(self, ckpt_paths, test_dataloaders, ckpt_processes):
+        model = self.get_model()
+
+        if ckpt_paths == 'top_k':
+            if self.checkpoint_callback.save_top_k <= 0:
+                raise MisconfigurationException(
+                    'ckpt_path is "top_k", but ModelCheckpoint is not configured to save the best models.'
+                )
+            if not self.checkpoint_callback.best_k_models:
+                self.checkpoint_callback.load_top_k_from_manifest()
+            best_k_models = self.checkpoint_callback.best_k_models
+            # best first
+            ckpt_paths = sorted(best_k_models, key=best_k_models.get, reverse=self.checkpoint_callback.mode != 'min')
+
+        if len(ckpt_paths) == 0:
+            rank_zero_warn(
+                '.test() found no checkpoint to test. Please specify paths with .test(ckpt_path=[PATH, ...])'
+            )
+            return {}
+        if self.use_dp or self.use_ddp or self.use_ddp2 or self.use_horovod or self.use_tpu:
+            raise MisconfigurationException('Testing many checkpoints at once is only supported on a single device.')
+        if ckpt_processes > 0 and self.on_gpu:
+            raise MisconfigurationException('`ckpt_processes` is only supported when testing on CPU.')
+
+        # attach dataloaders
+        if test_dataloaders is not None:
+            self.data_connector.attach_dataloaders(model, test_dataloaders=test_dataloaders)
+
+        # run tests, the batches are loaded once for all checkpoints
+        self.evaluation_loop.setup_checkpoints(ckpt_paths, ckpt_processes)
+        self.tested_ckpt_path = list(ckpt_paths)
+        self.testing = True
+        os.environ['PL_TESTING_MODE'] = '1'
+        self.model = model
+        try:
+            results = self.fit(model)
+        finally:
+            self.evaluation_loop.teardown_checkpoints()
+            self.testing = False
+            del os.environ['PL_TESTING_MODE']
+
+        # teardown
+        if self.is_function_implemented('teardown'):
+            model_ref = self.get_model()
+            model_ref.teardown('test')
+
+        return results
+
     def __test_given_model(self, model, test_dataloaders):
 
         # attach data
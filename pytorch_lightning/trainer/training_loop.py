@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import subprocess
+import time
 from copy import copy, deepcopy
 
 import numpy as np
@@ -26,11 +27,13 @@ from pytorch_lightning.core.step_result import EvalResult, Result
 from pytorch_lightning.trainer.states import TrainerState
 from pytorch_lightning.trainer.supporters import TensorRunningAccum, Accumulator
 from pytorch_lightning.utilities import parsing, AMPType
+from pytorch_lightning.utilities.data import fast_forward_dataloader
 from pytorch_lightning.utilities.distributed import rank_zero_info
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from pytorch_lightning.utilities.memory import recursive_detach
 from pytorch_lightning.utilities.model_utils import is_overridden
 from pytorch_lightning.utilities.parsing import AttributeDict
+from pytorch_lightning.utilities.seed import _collect_rng_states, _set_rng_states
 
 
 class TrainLoop:
@@ -42,8 +45,17 @@ class TrainLoop:
         self.accumulated_loss = None
         self._teardown_already_run = False
         self.running_loss = TensorRunningAccum(window_length=20)
-
-    def on_trainer_init(self, max_epochs, min_epochs, max_steps, min_steps, num_sanity_val_steps):
+        # position inside the running epoch, see `epoch_progress_state`
+        self.resume_state = None
+        self._in_training_epoch = False
+        self._step_pending = False
+        self._epoch_rng_states = None
+        # wall-clock budget, see `time_budget_exhausted`
+        self.time_budget_reached = False
+        self._train_start_time = None
+        self._longest_batch_time = 0.0
+
+    def on_trainer_init(self, max_epochs, min_epochs, max_steps, min_steps, num_sanity_val_steps, max_time=None):
         self.trainer.global_step = 0
         self.trainer.current_epoch = 0
         self.trainer.interrupted = False
@@ -59,6 +71,7 @@ class TrainLoop:
         self.trainer.min_epochs = min_epochs
         self.trainer.max_steps = max_steps
         self.trainer.min_steps = min_steps
+        self.trainer.max_time = max_time
 
         if num_sanity_val_steps == -1:
             self.trainer.num_sanity_val_steps = float('inf')
@@ -78,6 +91,10 @@ class TrainLoop:
             with torch.cuda.device(f'cuda:{self.trainer.root_gpu}'):
                 torch.cuda.empty_cache()
 
+        self.time_budget_reached = False
+        self._train_start_time = time.monotonic()
+        self._longest_batch_time = 0.0
+
         # hook
         self.trainer.call_hook('on_train_start')
 
@@ -158,14 +175,23 @@ class TrainLoop:
         if self.trainer.is_function_implemented('on_pretrain_routine_end'):
             ref_model.on_pretrain_routine_end()
 
-    def on_train_end(self):
+    def on_train_end(self, save_checkpoint: bool = True):
         if self._teardown_already_run:
             return
 
         self._teardown_already_run = True
 
+        # training may have been interrupted inside the epoch,
+        # while a stop on the time budget happens between two batches and can be resumed
+        if not self.time_budget_reached:
+            self._in_training_epoch = False
+            self._step_pending = False
+
         # maybe save checkpoint
-        self.check_checkpoint_callback(should_save=True, is_last=True)
+        if save_checkpoint:
+            self.check_checkpoint_callback(should_save=True, is_last=True)
+        self._in_training_epoch = False
+        self._step_pending = False
 
         # hook
         self.trainer.call_hook('on_train_end')
@@ -175,6 +201,7 @@ class TrainLoop:
             self.trainer.logger.finalize("success")
 
         # summarize profile results
+        self.trainer.profiler.on_train_end(self.trainer)
         if self.trainer.global_rank == 0:
             self.trainer.profiler.describe()
 
@@ -291,7 +318,8 @@ class TrainLoop:
     def training_step(self, split_batch, batch_idx, opt_idx, hiddens):
         with self.trainer.profiler.profile('model_forward'):
             args = self.build_train_args(split_batch, batch_idx, opt_idx, hiddens)
-            training_step_output = self.trainer.accelerator_backend.training_step(args)
+            with self.trainer.profiler.profile_optional('training_step'):
+                training_step_output = self.trainer.accelerator_backend.training_step(args)
             training_step_output = self.trainer.call_hook('training_step_end', training_step_output)
 
             # ----------------------------
@@ -418,22 +446,33 @@ class TrainLoop:
         # get model
         model = self.trainer.get_model()
 
+        # skip the batches seen before the checkpoint we resumed from
+        train_dataloader, start_batch_idx = self.trainer.train_dataloader, 0
+        if self.resume_state is not None:
+            train_dataloader, start_batch_idx = self.fast_forward_train_dataloader(train_dataloader)
+        else:
+            # the sampler of the epoch draws from these states, they are needed to resume it
+            self._epoch_rng_states = _collect_rng_states()
+
         # modify dataloader if needed (ddp, etc...)
-        train_dataloader = self.trainer.accelerator_backend.process_dataloader(self.trainer.train_dataloader)
+        train_dataloader = self.trainer.accelerator_backend.process_dataloader(train_dataloader)
 
         # track epoch output
         epoch_output = [[] for _ in range(self.num_optimizers)]
 
         # enable profiling for the dataloader
-        train_dataloader = self.trainer.data_connector.get_profiled_train_dataloader(train_dataloader)
+        train_dataloader = self.trainer.data_connector.get_profiled_train_dataloader(train_dataloader, start_batch_idx)
         dataloader_idx = 0
         should_check_val = False
+        self._in_training_epoch = True
+        batch_end_time = time.monotonic()
         for batch_idx, (batch, is_last_batch) in train_dataloader:
             # stop epoch if we limited the number of training batches
             if batch_idx >= self.trainer.num_training_batches:
                 break
 
             self.trainer.batch_idx = batch_idx
+            self._step_pending = True
             model.global_step = self.trainer.global_step
 
             # ------------------------------------
@@ -460,7 +499,8 @@ class TrainLoop:
             # -----------------------------------------
             should_check_val = self.should_check_val_fx(batch_idx, is_last_batch)
             if should_check_val:
-                self.trainer.run_evaluation(test_mode=False)
+                with self.trainer.profiler.profile_optional('run_evaluation'):
+                    self.trainer.run_evaluation(test_mode=False)
 
             # -----------------------------------------
             # SAVE LOGGERS (ie: Tensorboard, etc...)
@@ -472,6 +512,9 @@ class TrainLoop:
             # -----------------------------------------
             self.trainer.logger_connector.save_train_loop_metrics_to_loggers(batch_idx, batch_output)
 
+            # periodic profiler summaries
+            self.trainer.profiler.on_train_batch_end(self.trainer)
+
             # update LR schedulers
             monitor_metrics = deepcopy(self.trainer.logger_connector.callback_metrics)
             monitor_metrics.update(batch_output.batch_log_metrics)
@@ -479,17 +522,29 @@ class TrainLoop:
 
             # progress global step according to grads progress
             self.increment_accumulated_grad_global_step()
+            self._step_pending = False
 
             # max steps reached, end training
             if self.trainer.max_steps is not None and self.trainer.max_steps == self.trainer.global_step:
                 break
 
+            # the duration includes data loading and validation, which may also happen in the next batch
+            batch_start_time, batch_end_time = batch_end_time, time.monotonic()
+            self._longest_batch_time = max(self._longest_batch_time, batch_end_time - batch_start_time)
+            if self.time_budget_exhausted(batch_end_time):
+                self.on_time_budget_exhausted()
+                break
+
             # end epoch early
             # stop when the flag is changed or we've gone past the amount
             # requested in the batches
             if self.trainer.should_stop:
                 break
 
+        # checkpoints saved after a stop on the time budget resume inside this epoch
+        self._in_training_epoch = self.time_budget_reached
+        self._step_pending = False
+
         # process epoch outputs
         self.trainer.logger_connector.on_train_epoch_end(
             epoch_output,
@@ -503,6 +558,92 @@ class TrainLoop:
 
         # epoch end hook
         self.run_on_epoch_end_hook()
+        self.trainer.profiler.on_train_epoch_end(self.trainer)
+
+    def time_budget_exhausted(self, now: float) -> bool:
+        """Whether the next batch might not finish within the ``max_time`` budget of the trainer."""
+        if self.trainer.max_time is None or self._train_start_time is None:
+            return False
+        return now - self._train_start_time + self._longest_batch_time >= self.trainer.max_time
+
+    def on_time_budget_exhausted(self):
+        rank_zero_info(
+            f'Stopping training at global step {self.trainer.global_step}: the time budget of'
+            f' {self.trainer.max_time} seconds would be exceeded by the next batch.'
+        )
+        self.time_budget_reached = True
+        self.trainer.should_stop = True
+
+        # checkpoint while inside the epoch, so training resumes at the next batch
+        model = self.trainer.get_model()
+        for callback in self.trainer.callbacks:
+            if isinstance(callback, ModelCheckpoint):
+                callback.save_train_time_checkpoint(self.trainer, model)
+
+    def epoch_progress_state(self):
+        """
+        The position inside the running training epoch, to resume it exactly from a checkpoint.
+
+        When the checkpoint is saved inside an accumulation window, the gradients accumulated so far
+        are part of the state. Returns ``None`` outside of the training epoch and after its last batch.
+        """
+        if not self._in_training_epoch:
+            return None
+        num_batches = self.trainer.batch_idx + 1
+        if num_batches >= self.trainer.num_training_batches:
+            return None
+
+        pending = int(self._step_pending)
+        accumulated_batches = num_batches % self.trainer.accumulate_grad_batches
+        accumulated_grads = None
+        if accumulated_batches:
+            model = self.trainer.get_model()
+            accumulated_grads = {
+                name: param.grad.detach().clone()
+                for name, param in model.named_parameters() if param.grad is not None
+            }
+
+        sampler = getattr(self.trainer.train_dataloader, 'sampler', None)
+        return {
+            'epoch': self.trainer.current_epoch,
+            'batch_idx': num_batches,
+            # the global step is increased after the batch, unless it is inside an accumulation window
+            'global_step': self.trainer.global_step + (pending if not accumulated_batches else 0),
+            'total_batch_idx': self.trainer.total_batch_idx + pending,
+            'accumulated_batches': accumulated_batches,
+            'accumulated_grads': accumulated_grads,
+            'sampler_epoch': getattr(sampler, 'epoch', None),
+            'epoch_rng_states': self._epoch_rng_states,
+            'rng_states': _collect_rng_states(),
+        }
+
+    def fast_forward_train_dataloader(self, train_dataloader):
+        """Skips the batches of the epoch seen before the checkpoint in :attr:`resume_state` was saved."""
+        state, self.resume_state = self.resume_state, None
+
+        sampler = getattr(train_dataloader, 'sampler', None)
+        if state['sampler_epoch'] is not None and hasattr(sampler, 'set_epoch'):
+            sampler.set_epoch(state['sampler_epoch'])
+
+        # restored only now, e.g. the sanity check zeroes the gradients
+        if state['accumulated_grads']:
+            for name, param in self.trainer.get_model().named_parameters():
+                if name in state['accumulated_grads']:
+                    param.grad = state['accumulated_grads'][name].to(param.device)
+
+        # the sampler draws its permutation when the epoch starts, before the skipped batches
+        self._epoch_rng_states = state['epoch_rng_states']
+        if self._epoch_rng_states is not None:
+            _set_rng_states(self._epoch_rng_states)
+
+        def on_fast_forward():
+            if state['rng_states'] is not None:
+                _set_rng_states(state['rng_states'])
+
+        num_batches = state['batch_idx']
+        if num_batches == 0:
+            return train_dataloader, 0
+        return fast_forward_dataloader(train_dataloader, num_batches, on_fast_forward), num_batches
 
     def run_training_batch(self, batch, batch_idx, dataloader_idx):
         # track grad norms
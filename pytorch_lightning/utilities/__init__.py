@@ -1,4 +1,6 @@
 """General utilities"""
+import importlib.util
+import re
 from enum import Enum
 
 import numpy
@@ -17,11 +19,31 @@ else:
 
 NATIVE_AMP_AVALAIBLE = hasattr(torch.cuda, "amp") and hasattr(torch.cuda.amp, "autocast")
 
+# (major, minor, patch), e.g. ``(1, 6, 0)`` for ``1.6.0+cu101``, without importing ``distutils`` or ``pkg_resources``
+TORCH_VERSION = tuple(int(v) for v in re.findall(r"\d+", torch.__version__.split("+")[0])[:3])
+
 FLOAT16_EPSILON = numpy.finfo(numpy.float16).eps
 FLOAT32_EPSILON = numpy.finfo(numpy.float32).eps
 FLOAT64_EPSILON = numpy.finfo(numpy.float64).eps
 
 
+def _module_available(module_path: str) -> bool:
+    """
+    Whether the module can be imported, without importing it: optional dependencies which are slow to import,
+    e.g. ``horovod.torch``, are only imported when they are used. Only the parent packages are imported.
+    """
+    try:
+        return importlib.util.find_spec(module_path) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# only the top-level package is looked up, `find_spec("horovod.torch")` would import `horovod`. A broken install,
+# without the torch extension, is only detected when the Horovod backend is requested
+HOROVOD_AVAILABLE = _module_available("horovod")
+OMEGACONF_AVAILABLE = _module_available("omegaconf")
+
+
 class AMPType(Enum):
     APEX = 'apex'
     NATIVE = 'native'
@@ -0,0 +1,226 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoint averaging
+====================
+
+Averages the weights of checkpoints, e.g. the last epochs of a run (stochastic weight averaging) or models
+fine-tuned from the same initialization ("model soups"). The checkpoints are read one after the other into a
+running average, so at most two state dicts are held in memory whatever the number of checkpoints::
+
+    checkpoint = average_checkpoints(['epoch=7.ckpt', 'epoch=8.ckpt', 'epoch=9.ckpt'])
+    torch.save(checkpoint, 'averaged.ckpt')
+
+or from the command line::
+
+    python -m pytorch_lightning.utilities.checkpoint_averaging epoch=7.ckpt epoch=8.ckpt --output averaged.ckpt
+
+Floating point tensors are averaged in at least ``float32`` and saved in their original dtype. Integer tensors,
+e.g. the ``num_batches_tracked`` counters of batch normalization layers, can not be averaged: the values of the
+last checkpoint are kept. The running statistics of the normalization layers are averaged too, which only
+approximates the statistics of the averaged weights. :func:`update_bn` recomputes them with a pass over the
+training data.
+
+"""
+
+import argparse
+import copy
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+import torch
+from torch import nn
+
+from pytorch_lightning.utilities.apply_func import move_data_to_device
+from pytorch_lightning.utilities.cloud_io import atomic_save
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+
+AVERAGED_CHECKPOINTS_KEY = 'averaged_checkpoints'
+# the training state of the last checkpoint does not apply to the averaged weights
+_TRAINING_STATE_KEYS = (
+    'optimizer_states',
+    'lr_schedulers',
+    'callbacks',
+    'epoch_progress_state',
+    'native_amp_scaling_state',
+    'amp_scaling_state',
+)
+
+
+class StateDictAverage(object):
+    """
+    Running weighted average of state dicts.
+
+    Args:
+        device: the device the average is kept on, e.g. ``'cpu'`` to average the weights of a model on GPU.
+            Default: the device of the first state dict.
+
+    Example::
+
+        average = StateDictAverage()
+        for path in checkpoint_paths:
+            average.update(torch.load(path)['state_dict'])
+        model.load_state_dict(average.state_dict())
+    """
+
+    def __init__(self, device: Optional[torch.device] = None):
+        self.device = device
+        self.average = None
+        self.total_weight = 0.
+        self.num_averaged = 0
+        self._dtypes = {}
+
+    def update(self, state_dict: Dict[str, Any], weight: float = 1.):
+        """Adds a state dict to the average, it is not referenced afterwards."""
+        if weight <= 0:
+            raise ValueError(f'The weight of a state dict must be positive, got {weight}.')
+        self.total_weight += weight
+        self.num_averaged += 1
+
+        if self.average is None:
+            # shallow copy keeps the ``_metadata`` of the state dict
+            self.average = copy.copy(state_dict)
+            for key, value in state_dict.items():
+                self.average[key] = self._accumulator(key, value)
+            return
+
+        if state_dict.keys() != self.average.keys():
+            missing = set(self.average) ^ set(state_dict)
+            raise ValueError(f'The state dicts to average have different keys: {sorted(missing)}')
+
+        ratio = weight / self.total_weight
+        for key, value in state_dict.items():
+            average = self.average[key]
+            if isinstance(average, torch.Tensor) and average.is_floating_point():
+                # `average += ratio * (value - average)` in place
+                average.lerp_(value.detach().to(average.device, average.dtype), ratio)
+            else:
+                self.average[key] = self._accumulator(key, value)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """The averaged state dict, with the tensors in their original dtype."""
+        if self.average is None:
+            raise ValueError('No state dict was averaged.')
+        state_dict = copy.copy(self.average)
+        for key, dtype in self._dtypes.items():
+            state_dict[key] = state_dict[key].to(dtype)
+        return state_dict
+
+    def _accumulator(self, key: str, value: Any) -> Any:
+        if not isinstance(value, torch.Tensor):
+            return copy.deepcopy(value)
+        tensor = value.detach().to(self.device or value.device, copy=True)
+        if tensor.is_floating_point() and torch.finfo(tensor.dtype).bits < 32:
+            # half precision averages lose the small contributions of many checkpoints
+            self._dtypes[key] = tensor.dtype
+            tensor = tensor.float()
+        return tensor
+
+
+def average_checkpoints(
+        checkpoint_paths: Sequence[str],
+        weights: Optional[Sequence[float]] = None,
+        map_location: Any = 'cpu',
+) -> Dict[str, Any]:
+    """
+    Averages the ``state_dict`` of checkpoints, loading them one at a time.
+
+    Args:
+        checkpoint_paths: paths or URLs of the checkpoints, in any format supported by
+            :func:`~pytorch_lightning.utilities.cloud_io.load`.
+        weights: the weight of each checkpoint in the average. Default: a uniform average.
+        map_location: where the tensors are loaded and averaged.
+
+    Return:
+        a weights-only Lightning checkpoint with the averaged ``state_dict`` and the other entries, e.g.
+        the hyper parameters, of the last checkpoint. It can be loaded with ``load_from_checkpoint``.
+    """
+    if len(checkpoint_paths) == 0:
+        raise ValueError('No checkpoint to average.')
+    if weights is None:
+        weights = [1.] * len(checkpoint_paths)
+    if len(weights) != len(checkpoint_paths):
+        raise ValueError(f'Got {len(weights)} weights for {len(checkpoint_paths)} checkpoints.')
+
+    average = StateDictAverage()
+    for path, weight in zip(checkpoint_paths, weights):
+        checkpoint = pl_load(path, map_location=map_location, weights_only=True)
+        state_dict = checkpoint.pop('state_dict')
+        average.update(state_dict, weight)
+        # released before the next checkpoint is loaded
+        del state_dict
+
+    averaged = {k: v for k, v in checkpoint.items() if k not in _TRAINING_STATE_KEYS}
+    averaged['state_dict'] = average.state_dict()
+    averaged[AVERAGED_CHECKPOINTS_KEY] = [str(path) for path in checkpoint_paths]
+    return averaged
+
+
+@torch.no_grad()
+def update_bn(
+        model: nn.Module,
+        dataloader: Iterable,
+        device: Optional[torch.device] = None,
+        max_batches: Optional[int] = None,
+        forward: Optional[Callable[[Any, int], Any]] = None,
+):
+    """
+    Recomputes the running statistics of the batch normalization layers of ``model`` over the batches of
+    ``dataloader``, e.g. after loading averaged weights.
+
+    Args:
+        model: the model, its training mode is restored afterwards.
+        dataloader: the batches, e.g. the training dataloader.
+        device: if given, the batches are moved to this device.
+        max_batches: the maximal number of batches.
+        forward: called with each batch and its index to run the model, e.g. its ``training_step``.
+            Default: the first element of tuple or list batches is passed to the model.
+    """
+    momenta = {}
+    for module in model.modules():
+        if isinstance(module, nn.modules.batchnorm._BatchNorm) and module.track_running_stats:
+            module.reset_running_stats()
+            momenta[module] = module.momentum
+    if not momenta:
+        return
+
+    was_training = model.training
+    model.train()
+    for module in momenta:
+        # cumulative average of the statistics of all batches
+        module.momentum = None
+
+    for batch_idx, batch in enumerate(dataloader):
+        if max_batches is not None and batch_idx >= max_batches:
+            break
+        if device is not None:
+            batch = move_data_to_device(batch, device)
+        if forward is not None:
+            forward(batch, batch_idx)
+        else:
+            model(batch[0] if isinstance(batch, (list, tuple)) else batch)
+
+    for module, momentum in momenta.items():
+        module.momentum = momentum
+    model.train(was_training)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Average the weights of checkpoints into a new checkpoint.')
+    parser.add_argument('checkpoints', nargs='+', help='paths or URLs of the checkpoints to average')
+    parser.add_argument('--output', required=True, help='path of the averaged checkpoint')
+    parser.add_argument('--weights', type=float, nargs='+', help='weight of each checkpoint in the average')
+
+    args = parser.parse_args()
+    atomic_save(average_checkpoints(args.checkpoints, weights=args.weights), args.output)
@@ -0,0 +1,215 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoint cache
+================
+
+Opt-in local on-disk cache of the remote checkpoints loaded by :func:`~pytorch_lightning.utilities.cloud_io.load`,
+so workers loading the same checkpoint again read it from the local disk. Entries are keyed by the URL and
+the version of the remote file, its ``ETag`` or else its size and modification time, so a checkpoint which is
+overwritten remotely is downloaded again. Files which report none of them, or whose version can not be
+requested, e.g. presigned URLs only valid for ``GET`` requests, are downloaded without being cached.
+
+HTTP(S) URLs are fetched with the standard library, any other protocol through ``fsspec``. Processes sharing
+the cache directory lock each entry while downloading it, so a checkpoint is only downloaded once. When the
+cache grows over its maximal size, the least recently used checkpoints are deleted.
+
+The cache is configured by environment variables:
+
+- ``PL_CHECKPOINT_CACHE_DIR``: the cache directory, the cache is only used when it is set,
+  e.g. ``~/.cache/torch/lightning_checkpoints``.
+- ``PL_CHECKPOINT_CACHE_SIZE``: the maximal size of the cache in bytes, ``0`` disables it. Default: 10 GiB.
+
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import urllib.request
+from typing import IO, Dict, Optional, Union
+from urllib.parse import urlparse
+
+from pytorch_lightning.utilities.cloud_io import _temporary_path, get_filesystem
+
+try:
+    import fcntl
+except ImportError:  # pragma: no-cover
+    # Windows, entries are not locked
+    fcntl = None
+
+CHECKPOINT_CACHE_SIZE = 10 * 1024 ** 3
+_HTTP_PROTOCOLS = ('http', 'https')
+_DOWNLOAD_CHUNK_SIZE = 16 * 1024 ** 2
+
+
+class CheckpointCache(object):
+    """
+    Content-addressed cache of remote checkpoint files in a local directory.
+
+    Args:
+        cache_dir: the local directory holding the cached files.
+        max_size: the maximal total size in bytes of the cached files, the least recently used are evicted.
+
+    Example::
+
+        cache = CheckpointCache('/tmp/checkpoints', max_size=10 * 1024 ** 3)
+        local_path = cache.fetch('s3://bucket/checkpoints/epoch=3.ckpt')
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = CHECKPOINT_CACHE_SIZE):
+        self.cache_dir = os.path.expanduser(str(cache_dir))
+        self.max_size = max_size
+
+    def fetch(self, url: str) -> Optional[str]:
+        """
+        Returns the path of the cached copy of ``url``, downloading it first if needed.
+        Returns ``None`` when the remote file can not be versioned, it is then not cached.
+        """
+        try:
+            version = remote_version(url)
+        except (OSError, ValueError):
+            # e.g. presigned URLs only valid for GET or servers rejecting HEAD requests with 403 or 405
+            return None
+        if version is None:
+            return None
+        key = hashlib.sha256(f'{url}\n{version}'.encode()).hexdigest()
+        path = os.path.join(self.cache_dir, f'{key}.ckpt')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _file_lock(f'{path}.lock'):
+            if os.path.exists(path):
+                # the modification time orders the entries for the eviction
+                os.utime(path)
+                return path
+            tmp_path = _temporary_path(path)
+            try:
+                download(url, tmp_path)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        """Deletes the least recently used files until the cache fits in ``max_size``, except ``keep``."""
+        with _file_lock(os.path.join(self.cache_dir, '.lock')):
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith('.ckpt') and not name.startswith('.'):
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = os.stat(path)
+                        entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+                with _file_lock(f'{path}.lock', blocking=False) as locked:
+                    if not locked:
+                        # being downloaded by another process
+                        continue
+                    for entry_path in (path, f'{path}.lock'):
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(entry_path)
+                total_size -= size
+
+
+def get_checkpoint_cache() -> Optional[CheckpointCache]:
+    """The cache configured by the environment variables, ``None`` if it is not enabled."""
+    cache_dir = os.environ.get('PL_CHECKPOINT_CACHE_DIR')
+    max_size = int(os.environ.get('PL_CHECKPOINT_CACHE_SIZE', CHECKPOINT_CACHE_SIZE))
+    if not cache_dir or max_size <= 0:
+        return None
+    return CheckpointCache(cache_dir, max_size)
+
+
+def is_http_url(url: str) -> bool:
+    return urlparse(str(url)).scheme in _HTTP_PROTOCOLS
+
+
+def remote_version(url: str) -> Optional[str]:
+    """The ``ETag`` of a remote file, or else its size and modification time, ``None`` if none is known."""
+    if is_http_url(url):
+        request = urllib.request.Request(url, method='HEAD')
+        with urllib.request.urlopen(request) as response:
+            info = {k.lower(): v for k, v in response.headers.items()}
+        etag, size, mtime = info.get('etag'), info.get('content-length'), info.get('last-modified')
+    else:
+        info = get_filesystem(url).info(url)
+        etag = info.get('ETag', info.get('etag'))
+        size = info.get('size')
+        mtime = _modification_time(info)
+
+    if etag:
+        return f'etag:{etag}'
+    if size is not None and mtime is not None:
+        return f'size:{size},mtime:{mtime}'
+    return None
+
+
+def download(url: str, dst: Union[str, IO[bytes]]):
+    """Streams the remote file ``url`` to a local file path or a binary file object."""
+    if is_http_url(url):
+        source = urllib.request.urlopen(url)
+    else:
+        source = get_filesystem(url).open(url, 'rb')
+    with source as src:
+        if isinstance(dst, str):
+            with open(dst, 'wb') as f:
+                shutil.copyfileobj(src, f, _DOWNLOAD_CHUNK_SIZE)
+        else:
+            shutil.copyfileobj(src, dst, _DOWNLOAD_CHUNK_SIZE)
+
+
+def _modification_time(info: Dict) -> Optional[str]:
+    # the name of the field depends on the fsspec implementation
+    for key in ('mtime', 'LastModified', 'last_modified', 'updated', 'created'):
+        if info.get(key) is not None:
+            return str(info[key])
+    return None
+
+
+@contextlib.contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """
+    Holds an exclusive lock on the file ``path``, yields whether it is held, always when ``blocking``.
+    Lock files are deleted with their entry, a lock taken on a file deleted in the meantime is taken again.
+    """
+    if fcntl is None:  # pragma: no-cover
+        yield True
+        return
+    while True:
+        with open(path, 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                current = os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                current = False
+            try:
+                if current:
+                    yield True
+                    return
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,183 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoint manifest
+===================
+
+A JSON file kept next to the checkpoints of a directory, recording for each of them the global step,
+the epoch, the monitored score and the size on disk::
+
+    checkpoints/
+        checkpoints.json
+        epoch=3.ckpt
+        epoch=4.ckpt
+
+Looking up the best or the latest checkpoint reads this single file instead of listing and parsing
+the whole directory, which is slow on network filesystems holding many checkpoints.
+:class:`~pytorch_lightning.callbacks.model_checkpoint.ModelCheckpoint` writes it with ``manifest=True``.
+
+"""
+
+import contextlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from pytorch_lightning.utilities.cloud_io import _temporary_path, get_filesystem
+
+CHECKPOINT_MANIFEST_NAME = 'checkpoints.json'
+CHECKPOINT_MANIFEST_VERSION = 1
+
+
+class CheckpointManifest(object):
+    """
+    Index of the checkpoints saved in one directory, updated atomically on every change.
+
+    Entries are keyed by the file name of the checkpoint, so the directory can be moved.
+
+    Args:
+        dirpath: the directory holding the checkpoints and the manifest.
+
+    Example::
+
+        manifest = CheckpointManifest('checkpoints/')
+        manifest.add('checkpoints/epoch=1.ckpt', step=200, epoch=1, score=0.25, monitor='val_loss')
+        manifest.best(monitor='val_loss', mode='min')  # 'checkpoints/epoch=1.ckpt'
+    """
+
+    def __init__(self, dirpath: str):
+        self.dirpath = str(dirpath)
+        self.filepath = os.path.join(self.dirpath, CHECKPOINT_MANIFEST_NAME)
+        self._fs = get_filesystem(self.dirpath)
+        self._entries = None
+        self._dir_created = False
+        self._batch_depth = 0
+        self._dirty = False
+
+    @classmethod
+    def exists(cls, dirpath: str) -> bool:
+        dirpath = str(dirpath)
+        return get_filesystem(dirpath).exists(os.path.join(dirpath, CHECKPOINT_MANIFEST_NAME))
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """The recorded checkpoints, keyed by file name, in the order they were added."""
+        if self._entries is None:
+            self._entries = {}
+            if self._fs.exists(self.filepath):
+                with self._fs.open(self.filepath, 'r') as f:
+                    self._entries = json.load(f)['checkpoints']
+        return self._entries
+
+    def add(
+            self,
+            filepath: str,
+            step: int,
+            epoch: int,
+            score: Optional[float] = None,
+            monitor: Optional[str] = None,
+            kind: str = 'checkpoint',
+    ):
+        """
+        Records a saved checkpoint, replacing a previous entry of the same file.
+
+        Args:
+            filepath: the path of the checkpoint, it has to be inside the manifest directory.
+            step: the global step the checkpoint was saved at.
+            epoch: the epoch the checkpoint was saved at.
+            score: the value of the monitored quantity.
+            monitor: the name of the monitored quantity.
+            kind: what saved the checkpoint, e.g. ``'top_k'``, ``'last'`` or ``'hpc'``.
+        """
+        filepath = str(filepath)
+        name = os.path.basename(filepath)
+        self.entries.pop(name, None)
+        self.entries[name] = {
+            'step': int(step),
+            'epoch': int(epoch),
+            'score': None if score is None else float(score),
+            'monitor': monitor,
+            'kind': kind,
+            'size': self._size(filepath),
+        }
+        self._changed()
+
+    def remove(self, *filepaths: str):
+        """Removes the entries of checkpoints, the files themselves are not deleted."""
+        removed = [self.entries.pop(os.path.basename(str(filepath)), None) for filepath in filepaths]
+        if any(entry is not None for entry in removed):
+            self._changed()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defers writing the manifest to the end of the block, all changes made in it are written at once."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._save()
+
+    def paths(self, kind: Optional[str] = None) -> List[str]:
+        """The paths of the recorded checkpoints, optionally only those of one ``kind``."""
+        return [
+            os.path.join(self.dirpath, name)
+            for name, entry in self.entries.items() if kind is None or entry['kind'] == kind
+        ]
+
+    def scores(self, monitor: str) -> Dict[str, float]:
+        """The paths of the checkpoints with a score for ``monitor``, mapped to this score."""
+        return {
+            os.path.join(self.dirpath, name): entry['score']
+            for name, entry in self.entries.items()
+            if entry['monitor'] == monitor and entry['score'] is not None
+        }
+
+    def best(self, monitor: str, mode: str = 'min') -> Optional[str]:
+        """The path of the checkpoint with the lowest (``mode='min'``) or highest score for ``monitor``."""
+        scores = self.scores(monitor)
+        if not scores:
+            return None
+        _op = min if mode == 'min' else max
+        return _op(scores, key=scores.get)
+
+    def latest(self, kind: Optional[str] = None) -> Optional[str]:
+        """The path of the checkpoint added last, optionally only considering those of one ``kind``."""
+        paths = self.paths(kind)
+        return paths[-1] if paths else None
+
+    def _size(self, filepath: str) -> Optional[int]:
+        try:
+            info = self._fs.info(filepath)
+        except FileNotFoundError:
+            return None
+        # sharded checkpoints are directories
+        return info['size'] if info['type'] != 'directory' else self._fs.du(filepath)
+
+    def _changed(self):
+        if self._batch_depth:
+            self._dirty = True
+        else:
+            self._save()
+
+    def _save(self):
+        if not self._dir_created:
+            self._fs.makedirs(self.dirpath, exist_ok=True)
+            self._dir_created = True
+        tmp_path = _temporary_path(self.filepath)
+        with self._fs.open(tmp_path, 'w') as f:
+            json.dump({'version': CHECKPOINT_MANIFEST_VERSION, 'checkpoints': self.entries}, f, indent=2)
+        self._fs.mv(tmp_path, self.filepath)
+        self._dirty = False
@@ -12,37 +12,115 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io
-from distutils.version import LooseVersion
+import inspect
+import os
+import tempfile
+import uuid
+import zipfile
 from typing import Union
 from pathlib import Path
 from urllib.parse import urlparse
 import torch
 import fsspec
 
+from pytorch_lightning.utilities import TORCH_VERSION
+
 
 pathlike = Union[Path, str]
 
+_TORCH_LOAD_MMAP_AVAILABLE = "mmap" in inspect.signature(torch.load).parameters
+
+
+def load(path_or_url: str, map_location=None, weights_only: bool = False):
+    """
+    Loads a checkpoint from a local path or URL.
+
+    With ``weights_only=True`` the optimizer states are dropped: sharded checkpoints skip the optimizer
+    shards and with torch >= 2.1 local checkpoint files are memory-mapped, so tensors are only read once
+    they are copied into the model. Other checkpoints are read whole before the optimizer states are dropped.
+
+    Checkpoints exported in reduced precision are cast back to the dtypes they were saved from.
+    """
+    from pytorch_lightning.utilities.reduced_precision_checkpoint import is_exported_checkpoint, upcast_checkpoint
+
+    checkpoint = _load(path_or_url, map_location=map_location, weights_only=weights_only)
+    if is_exported_checkpoint(checkpoint):
+        checkpoint = upcast_checkpoint(checkpoint)
+    return checkpoint
+
+
+def _load(path_or_url: str, map_location=None, weights_only: bool = False):
+    from pytorch_lightning.utilities.checkpoint_cache import is_http_url
+    from pytorch_lightning.utilities.compressed_checkpoint import decompress_checkpoint, is_compressed_checkpoint
+    from pytorch_lightning.utilities.delta_checkpoint import is_delta_checkpoint, load_delta_checkpoint
+    from pytorch_lightning.utilities.sharded_checkpoint import is_sharded_checkpoint, load_sharded_checkpoint
 
-def load(path_or_url: str, map_location=None):
     if urlparse(path_or_url).scheme == "" or Path(path_or_url).drive:  # no scheme or with a drive letter
-        return torch.load(path_or_url, map_location=map_location)
-    return torch.hub.load_state_dict_from_url(path_or_url, map_location=map_location)
+        if is_sharded_checkpoint(path_or_url):
+            return load_sharded_checkpoint(path_or_url, map_location=map_location, weights_only=weights_only)
+        if weights_only and _TORCH_LOAD_MMAP_AVAILABLE and zipfile.is_zipfile(path_or_url):
+            checkpoint = torch.load(path_or_url, map_location=map_location, mmap=True)
+        else:
+            checkpoint = torch.load(path_or_url, map_location=map_location)
+        if is_delta_checkpoint(checkpoint):
+            return load_delta_checkpoint(checkpoint, path_or_url, map_location=map_location, weights_only=weights_only)
+    else:
+        if not is_http_url(path_or_url) and is_sharded_checkpoint(path_or_url):
+            return load_sharded_checkpoint(path_or_url, map_location=map_location, weights_only=weights_only)
+        checkpoint = _load_remote(path_or_url, map_location=map_location)
+        if is_delta_checkpoint(checkpoint):
+            # blobs are read from the remote directory of the manifest
+            return load_delta_checkpoint(checkpoint, path_or_url, map_location=map_location, weights_only=weights_only)
+
+    if is_compressed_checkpoint(checkpoint):
+        return decompress_checkpoint(checkpoint, map_location=map_location, weights_only=weights_only)
+    if weights_only:
+        checkpoint.pop('optimizer_states', None)
+    return checkpoint
+
+
+def _load_remote(url: str, map_location=None):
+    """Loads a remote checkpoint, through the cache of :mod:`~pytorch_lightning.utilities.checkpoint_cache`."""
+    from pytorch_lightning.utilities.checkpoint_cache import download, get_checkpoint_cache
+
+    cache = get_checkpoint_cache()
+    cached_path = cache.fetch(url) if cache is not None else None
+    if cached_path is not None:
+        return torch.load(cached_path, map_location=map_location)
+
+    # not cached, streamed to a temporary file deleted once loaded
+    with tempfile.TemporaryFile() as f:
+        download(url, f)
+        f.seek(0)
+        return torch.load(f, map_location=map_location)
+
+
+# filesystem instances shared by all callers, keyed by protocol and process
+_FILESYSTEMS = {}
 
 
 def get_filesystem(path: pathlike):
     path = str(path)
     if "://" in path:
         # use the fileystem from the protocol specified
-        return fsspec.filesystem(path.split(":", 1)[0])
+        protocol = path.split(":", 1)[0]
     else:
         # use local filesystem
-        return fsspec.filesystem("file")
+        protocol = "file"
+    # instances are not shared with forked processes, e.g. the connections of remote filesystems
+    key = (protocol, os.getpid())
+    if key not in _FILESYSTEMS:
+        _FILESYSTEMS[key] = fsspec.filesystem(protocol)
+    return _FILESYSTEMS[key]
 
 
 def atomic_save(checkpoint, filepath: str):
     """Saves a checkpoint atomically, avoiding the creation of incomplete checkpoints.
 
+    The checkpoint is streamed by ``torch.save`` into a temporary file next to the destination,
+    flushed to disk and then renamed into place, so readers never observe a partially written
+    file and no extra in-memory copy of the serialized checkpoint is made.
+
     Args:
         checkpoint: The object to save.
             Built to be used with the ``dump_checkpoint`` method, but can deal with anything which ``torch.save``
@@ -50,13 +128,44 @@ def atomic_save(checkpoint, filepath: str):
         filepath: The path to which the checkpoint will be saved.
             This points to the file that the checkpoint will be stored in.
     """
-    bytesbuffer = io.BytesIO()
+    filepath = str(filepath)
+    fs = get_filesystem(filepath)
+    if is_local_filesystem(fs):
+        filepath = fs._strip_protocol(filepath)
+    tmp_path = _temporary_path(filepath)
+    try:
+        if is_local_filesystem(fs):
+            with open(tmp_path, "wb") as f:
+                _torch_save(checkpoint, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        else:
+            with fs.open(tmp_path, "wb") as f:
+                _torch_save(checkpoint, f)
+            fs.mv(tmp_path, filepath)
+    except BaseException:
+        if fs.exists(tmp_path):
+            fs.rm(tmp_path)
+        raise
+
+
+def is_local_filesystem(fs) -> bool:
+    protocol = fs.protocol if isinstance(fs.protocol, (tuple, list)) else (fs.protocol,)
+    return "file" in protocol
+
+
+def _temporary_path(filepath: str) -> str:
+    """Unique sibling path of ``filepath`` used while a file is being written."""
+    dirname, basename = os.path.split(filepath)
+    return os.path.join(dirname, f".{basename}.{uuid.uuid4().hex}.tmp")
+
+
+def _torch_save(obj, f):
     # Can't use the new zipfile serialization for 1.6.0 because there's a bug in
     # torch.hub.load_state_dict_from_url() that prevents it from loading the new files.
     # More details can be found here: https://github.com/pytorch/pytorch/issues/42239
-    if LooseVersion(torch.__version__).version[:3] == [1, 6, 0]:
-        torch.save(checkpoint, bytesbuffer, _use_new_zipfile_serialization=False)
+    if TORCH_VERSION == (1, 6, 0):
+        torch.save(obj, f, _use_new_zipfile_serialization=False)
     else:
-        torch.save(checkpoint, bytesbuffer)
-    with fsspec.open(filepath, "wb") as f:
-        f.write(bytesbuffer.getvalue())
+        torch.save(obj, f)
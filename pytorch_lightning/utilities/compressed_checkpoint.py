@@ -0,0 +1,173 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compressed checkpoints
+======================
+
+The tensors of the ``state_dict`` and of the optimizer states are split into chunks which are
+compressed in parallel by a thread pool with a codec of the standard library (``zlib`` or ``lzma``,
+both release the GIL while compressing). The result is a regular checkpoint file, loading it with
+:func:`~pytorch_lightning.utilities.cloud_io.load` decompresses it transparently.
+
+"""
+
+import lzma
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+
+from pytorch_lightning.utilities.sharded_checkpoint import (
+    SHARDED_CHECKPOINT_KEYS,
+    _insert_tensors,
+    _num_workers,
+    _split_checkpoint,
+)
+
+COMPRESSED_CHECKPOINT_KEY = 'compressed_checkpoint'
+COMPRESSION_CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+#: number of uncompressed bytes per compressed chunk
+COMPRESSION_CHUNK_SIZE = 4 * 1024 ** 2
+
+
+def is_compressed_checkpoint(checkpoint: Any) -> bool:
+    return isinstance(checkpoint, dict) and COMPRESSED_CHECKPOINT_KEY in checkpoint
+
+
+def compress_checkpoint(
+        checkpoint: Dict[str, Any],
+        codec: str = 'zlib',
+        chunk_size: int = COMPRESSION_CHUNK_SIZE,
+        num_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Compresses the tensors of the ``state_dict`` and of the optimizer states of a checkpoint.
+
+    Args:
+        checkpoint: the checkpoint dictionary as created by ``dump_checkpoint``.
+        codec: one of ``'zlib'`` or ``'lzma'``.
+        chunk_size: number of bytes compressed at once, the unit of parallelism.
+        num_workers: number of compressing threads, defaults to one per chunk, up to 32.
+
+    Return:
+        the checkpoint dictionary with compressed tensors, to be saved with ``torch.save``
+    """
+    if codec not in COMPRESSION_CODECS:
+        raise ValueError(f'Unknown compression codec {codec}, choose one of {list(COMPRESSION_CODECS)}.')
+    compress = COMPRESSION_CODECS[codec][0]
+
+    index, tensors = _split_checkpoint(checkpoint)
+    chunks, entries = [], {}
+    for key, tensor in tensors.items():
+        data = memoryview(_to_numpy(tensor)).cast('B')
+        entries[key] = {
+            'dtype': tensor.dtype,
+            'shape': tuple(tensor.shape),
+            'device': str(tensor.device),
+            'num_chunks': len(range(0, len(data), chunk_size)),
+        }
+        chunks.extend(data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+    with ThreadPoolExecutor(max_workers=_num_workers(num_workers, len(chunks))) as executor:
+        compressed = iter(list(executor.map(compress, chunks)))
+    for entry in entries.values():
+        tensor_chunks = [next(compressed) for _ in range(entry.pop('num_chunks'))]
+        entry['chunk_sizes'] = [len(chunk) for chunk in tensor_chunks]
+        # stored as a tensor, pickled bytes would be inflated by the latin-1 encoding of pickle protocol 2
+        entry['data'] = torch.from_numpy(np.frombuffer(b''.join(tensor_chunks), dtype=np.uint8).copy())
+
+    index[COMPRESSED_CHECKPOINT_KEY] = {'codec': codec, 'tensors': entries}
+    return index
+
+
+def decompress_checkpoint(
+        checkpoint: Dict[str, Any],
+        map_location=None,
+        weights_only: bool = False,
+        num_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Restores a checkpoint compressed by :func:`compress_checkpoint`, decompressing chunks in parallel.
+
+    Args:
+        checkpoint: the loaded compressed checkpoint.
+        map_location: same as in :func:`torch.load`, except that tensors stay on CPU
+            if it is a function.
+        weights_only: only decompress the ``state_dict``, the optimizer states are dropped.
+        num_workers: number of decompressing threads, defaults to one per chunk, up to 32.
+    """
+    checkpoint = dict(checkpoint)
+    compressed = checkpoint.pop(COMPRESSED_CHECKPOINT_KEY)
+    decompress = COMPRESSION_CODECS[compressed['codec']][1]
+    entries = compressed['tensors']
+    if weights_only:
+        checkpoint.pop('optimizer_states', None)
+        entries = {key: entry for key, entry in entries.items() if key.startswith('state_dict/')}
+
+    chunks = []
+    for entry in entries.values():
+        data, offset = memoryview(entry['data'].numpy()), 0
+        for size in entry['chunk_sizes']:
+            chunks.append(data[offset:offset + size])
+            offset += size
+    with ThreadPoolExecutor(max_workers=_num_workers(num_workers, len(chunks))) as executor:
+        decompressed = iter(list(executor.map(decompress, chunks)))
+
+    tensors = {}
+    for key, entry in entries.items():
+        tensor_chunks = [next(decompressed) for _ in entry['chunk_sizes']]
+        tensor = _from_chunks(tensor_chunks, entry['dtype'], entry['shape'])
+        device = _map_device(entry['device'], map_location)
+        tensors[key] = tensor if device == 'cpu' else tensor.to(device)
+
+    for key in SHARDED_CHECKPOINT_KEYS:
+        if key in checkpoint:
+            checkpoint[key] = _insert_tensors(checkpoint[key], tensors)
+    return checkpoint
+
+
+def _to_numpy(tensor: torch.Tensor) -> np.ndarray:
+    tensor = tensor.detach().cpu().contiguous()
+    if tensor.dtype == torch.bfloat16:
+        # numpy has no bfloat16, the bits are kept as int16
+        tensor = tensor.view(torch.int16)
+    return tensor.numpy()
+
+
+def _from_chunks(chunks, dtype: torch.dtype, shape) -> torch.Tensor:
+    storage_dtype = torch.int16 if dtype == torch.bfloat16 else dtype
+    np_dtype = torch.empty(0, dtype=storage_dtype).numpy().dtype
+    data = np.empty(sum(len(chunk) for chunk in chunks), dtype=np.uint8)
+    offset = 0
+    for chunk in chunks:
+        data[offset:offset + len(chunk)] = np.frombuffer(chunk, dtype=np.uint8)
+        offset += len(chunk)
+    tensor = torch.from_numpy(data.view(np_dtype)).reshape(shape)
+    return tensor.view(dtype) if dtype == torch.bfloat16 else tensor
+
+
+def _map_device(device: str, map_location):
+    if map_location is None:
+        return device
+    if isinstance(map_location, (str, torch.device)):
+        return str(map_location)
+    if isinstance(map_location, dict):
+        return map_location.get(device, device)
+    # functions remapping storages, e.g. `lambda storage, loc: storage`, are applied on CPU
+    return 'cpu'
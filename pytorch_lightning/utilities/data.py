@@ -12,11 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from distutils.version import LooseVersion
-import torch
-from torch.utils.data import DataLoader, IterableDataset
+from typing import Callable, Iterable, Optional
 
-from pytorch_lightning.utilities import rank_zero_warn
+from torch.utils.data import DataLoader, IterableDataset, Sampler
+
+from pytorch_lightning.utilities import TORCH_VERSION, rank_zero_warn
 
 
 def has_iterable_dataset(dataloader: DataLoader):
@@ -38,10 +38,79 @@ def has_len(dataloader: DataLoader) -> bool:
     except NotImplementedError:  # e.g. raised by torchtext if a batch_size_fn is used
         has_len = False
 
-    if has_len and has_iterable_dataset(dataloader) and LooseVersion(torch.__version__) >= LooseVersion("1.4.0"):
+    if has_len and has_iterable_dataset(dataloader) and TORCH_VERSION >= (1, 4, 0):
         rank_zero_warn(
             'Your `IterableDataset` has `__len__` defined.'
             ' In combination with multi-processing data loading (e.g. batch size > 1),'
             ' this can lead to unintended side effects since the samples will be duplicated.'
         )
     return has_len
+
+
+class FastForwardBatchSampler(Sampler):
+    """
+    Wraps a batch sampler and drops its first ``num_batches`` batches of indices.
+
+    The indices of the skipped batches are drawn from the wrapped sampler, so its random state
+    advances exactly as if they had been loaded, but the data itself is never fetched.
+
+    Args:
+        batch_sampler: the batch sampler to fast-forward.
+        num_batches: number of batches to skip.
+        on_fast_forward: called once the batches were skipped, before the first batch is yielded.
+    """
+
+    def __init__(self, batch_sampler: Iterable, num_batches: int, on_fast_forward: Optional[Callable] = None):
+        self.batch_sampler = batch_sampler
+        self.num_batches = num_batches
+        self.on_fast_forward = on_fast_forward
+
+    def __iter__(self):
+        iterator = iter(self.batch_sampler)
+        for _ in range(self.num_batches):
+            next(iterator, None)
+        if self.on_fast_forward is not None:
+            self.on_fast_forward()
+        yield from iterator
+
+    def __len__(self):
+        return max(len(self.batch_sampler) - self.num_batches, 0)
+
+
+def fast_forward_dataloader(
+        dataloader: DataLoader,
+        num_batches: int,
+        on_fast_forward: Optional[Callable] = None,
+) -> Iterable:
+    """
+    Returns an iterable over the batches of ``dataloader`` starting at batch ``num_batches``.
+
+    For map-style datasets only the indices of the skipped batches are sampled. Batches of an
+    ``IterableDataset`` can not be skipped without loading them, they are fetched and discarded.
+    """
+    if (
+        isinstance(dataloader, DataLoader)
+        and not has_iterable_dataset(dataloader)
+        and dataloader.batch_sampler is not None
+    ):
+        skip_keys = ['sampler', 'batch_sampler', 'dataset_kind', 'batch_size', 'shuffle', 'drop_last']
+        dl_args = {
+            k: v for k, v in dataloader.__dict__.items() if not k.startswith('_') and k not in skip_keys
+        }
+        dl_args['batch_sampler'] = FastForwardBatchSampler(dataloader.batch_sampler, num_batches, on_fast_forward)
+        return type(dataloader)(**dl_args)
+
+    rank_zero_warn(
+        f'Resuming mid-epoch, the first {num_batches} batches of the train dataloader are loaded and discarded'
+        ' since they can not be skipped by sampling.'
+    )
+    return _skip_batches(dataloader, num_batches, on_fast_forward)
+
+
+def _skip_batches(iterable: Iterable, num_batches: int, on_fast_forward: Optional[Callable] = None):
+    iterator = iter(iterable)
+    for _ in range(num_batches):
+        next(iterator, None)
+    if on_fast_forward is not None:
+        on_fast_forward()
+    yield from iterator
@@ -0,0 +1,232 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Delta checkpoints
+=================
+
+Checkpoints which only write the tensors that changed since previous saves. The tensors of the
+``state_dict`` and of the optimizer states are content-hashed and stored once in a blob store shared
+by all checkpoints of a directory, each checkpoint file is a small manifest referencing its blobs::
+
+    checkpoints/
+        blobs/
+            refs.json
+            3f786850e387550fdab836ed7e6dc881de23001b.ckpt
+            ...
+        epoch=3.ckpt
+        epoch=4.ckpt
+
+``refs.json`` records the blobs referenced by every manifest, a blob is deleted once no manifest
+references it anymore. This is useful when large parts of the model are frozen, e.g. in fine-tuning.
+
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from pytorch_lightning.utilities.cloud_io import atomic_save, get_filesystem
+from pytorch_lightning.utilities.sharded_checkpoint import (
+    SHARDED_CHECKPOINT_KEYS,
+    _insert_tensors,
+    _num_workers,
+    _split_checkpoint,
+)
+
+DELTA_CHECKPOINT_KEY = 'delta_checkpoint'
+DELTA_CHECKPOINT_BLOB_DIR = 'blobs'
+DELTA_CHECKPOINT_REFS = 'refs.json'
+
+
+class DeltaCheckpointStore(object):
+    """
+    Saves checkpoints of one directory as manifests referencing content-addressed tensor blobs.
+
+    Hashes are cached for tensors which were not modified in-place since the previous save,
+    so unchanged (e.g. frozen) weights are neither re-hashed nor re-written.
+
+    Args:
+        dirpath: the directory holding the checkpoints, blobs are stored in its ``blobs`` subdirectory.
+        num_workers: number of threads writing and reading blobs, defaults to one per blob, up to 32.
+
+    Example::
+
+        store = DeltaCheckpointStore('checkpoints/')
+        store.save(trainer.checkpoint_connector.dump_checkpoint(), 'checkpoints/epoch=1.ckpt')
+        # deletes the manifest and the blobs no other checkpoint references
+        store.remove('checkpoints/epoch=1.ckpt')
+    """
+
+    def __init__(self, dirpath: str, num_workers: Optional[int] = None):
+        self.dirpath = str(dirpath)
+        self.blob_dirpath = os.path.join(self.dirpath, DELTA_CHECKPOINT_BLOB_DIR)
+        self.num_workers = num_workers
+        self._fs = get_filesystem(self.dirpath)
+        self._refs = None
+        # tensor key -> (storage, data pointer, version, digest) of the previous save
+        self._digest_cache = {}
+
+    @property
+    def refs(self) -> Dict[str, List[str]]:
+        """The digests of the blobs referenced by each manifest, keyed by the manifest file name."""
+        if self._refs is None:
+            refs_path = os.path.join(self.blob_dirpath, DELTA_CHECKPOINT_REFS)
+            if self._fs.exists(refs_path):
+                with self._fs.open(refs_path, 'r') as f:
+                    self._refs = json.load(f)
+            else:
+                self._refs = {}
+        return self._refs
+
+    def save(self, checkpoint: Dict[str, Any], filepath: str):
+        """Writes the blobs missing from the store and the manifest of ``checkpoint`` to ``filepath``."""
+        index, tensors = _split_checkpoint(checkpoint)
+        digests = {key: self._digest(key, tensor) for key, tensor in tensors.items()}
+        self._digest_cache = {k: v for k, v in self._digest_cache.items() if k in tensors}
+
+        stored = set(digest for manifest_digests in self.refs.values() for digest in manifest_digests)
+        new_blobs = {}
+        for key, digest in digests.items():
+            if digest not in stored and digest not in new_blobs:
+                new_blobs[digest] = tensors[key]
+
+        self._fs.makedirs(self.blob_dirpath, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=_num_workers(self.num_workers, len(new_blobs))) as executor:
+            list(executor.map(atomic_save, new_blobs.values(), map(self._blob_path, new_blobs)))
+
+        index[DELTA_CHECKPOINT_KEY] = {'blob_dir': DELTA_CHECKPOINT_BLOB_DIR, 'tensors': digests}
+        atomic_save(index, filepath)
+
+        name = os.path.basename(str(filepath))
+        previous = self.refs.get(name, [])
+        self.refs[name] = sorted(set(digests.values()))
+        self._save_refs()
+        self._collect_garbage(previous)
+
+    def remove(self, filepath: str):
+        """Deletes the manifest at ``filepath`` and the blobs which are not referenced anymore."""
+        filepath = str(filepath)
+        if self._fs.exists(filepath):
+            self._fs.rm(filepath)
+        previous = self.refs.pop(os.path.basename(filepath), [])
+        self._save_refs()
+        self._collect_garbage(previous)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dirpath, f'{digest}.ckpt')
+
+    def _save_refs(self):
+        refs_path = os.path.join(self.blob_dirpath, DELTA_CHECKPOINT_REFS)
+        tmp_path = f'{refs_path}.tmp'
+        with self._fs.open(tmp_path, 'w') as f:
+            json.dump(self.refs, f)
+        self._fs.mv(tmp_path, refs_path)
+
+    def _collect_garbage(self, candidates: List[str]):
+        referenced = set(digest for manifest_digests in self.refs.values() for digest in manifest_digests)
+        for digest in set(candidates) - referenced:
+            blob_path = self._blob_path(digest)
+            if self._fs.exists(blob_path):
+                self._fs.rm(blob_path)
+
+    def _digest(self, key: str, tensor: torch.Tensor) -> str:
+        version = getattr(tensor, '_version', None)
+        cached = self._digest_cache.get(key)
+        # the cache keeps the storage alive, so an equal data pointer is the same memory
+        if (
+            cached is not None
+            and version is not None
+            and cached[1:3] == (tensor.data_ptr(), version)
+        ):
+            return cached[3]
+
+        digest = tensor_digest(tensor)
+        if version is not None:
+            self._digest_cache[key] = (_storage(tensor), tensor.data_ptr(), version, digest)
+        return digest
+
+
+def tensor_digest(tensor: torch.Tensor) -> str:
+    """Content hash of a tensor, including its dtype and shape."""
+    tensor = tensor.detach().cpu().contiguous()
+    sha = hashlib.sha1(f'{tensor.dtype}{tuple(tensor.shape)}'.encode())
+    try:
+        sha.update(tensor.numpy().data)
+    except (TypeError, ValueError, RuntimeError):
+        # dtypes without numpy equivalent, e.g. bfloat16
+        buffer = io.BytesIO()
+        torch.save(tensor, buffer)
+        sha.update(buffer.getvalue())
+    return sha.hexdigest()
+
+
+def is_delta_checkpoint(checkpoint: Any) -> bool:
+    return isinstance(checkpoint, dict) and DELTA_CHECKPOINT_KEY in checkpoint
+
+
+def load_delta_checkpoint(
+        manifest: Dict[str, Any],
+        filepath: str,
+        map_location=None,
+        weights_only: bool = False,
+        num_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Resolves the tensor references of a loaded delta checkpoint manifest.
+
+    Args:
+        manifest: the content of the manifest file.
+        filepath: the path of the manifest file, blobs are looked up relative to it.
+        map_location: same as in :func:`torch.load`, applied to every blob.
+        weights_only: only read the blobs of the ``state_dict``, the optimizer states are dropped.
+        num_workers: number of threads reading blobs, defaults to one per blob, up to 32.
+    """
+    checkpoint = dict(manifest)
+    delta = checkpoint.pop(DELTA_CHECKPOINT_KEY)
+    digests = delta['tensors']
+    if weights_only:
+        checkpoint.pop('optimizer_states', None)
+        digests = {key: digest for key, digest in digests.items() if key.startswith('state_dict/')}
+
+    blob_dirpath = os.path.join(os.path.dirname(str(filepath)), delta['blob_dir'])
+    fs = get_filesystem(blob_dirpath)
+
+    def _read(digest):
+        with fs.open(os.path.join(blob_dirpath, f'{digest}.ckpt'), 'rb') as f:
+            return torch.load(f, map_location=map_location)
+
+    unique_digests = sorted(set(digests.values()))
+    with ThreadPoolExecutor(max_workers=_num_workers(num_workers, len(unique_digests))) as executor:
+        blobs = dict(zip(unique_digests, executor.map(_read, unique_digests)))
+
+    tensors, used = {}, set()
+    for key, digest in digests.items():
+        # tensors with equal content must not alias each other, e.g. the `step` of optimizer states
+        tensors[key] = blobs[digest].clone() if digest in used else blobs[digest]
+        used.add(digest)
+    for key in SHARDED_CHECKPOINT_KEYS:
+        if key in checkpoint:
+            checkpoint[key] = _insert_tensors(checkpoint[key], tensors)
+    return checkpoint
+
+
+def _storage(tensor: torch.Tensor):
+    if hasattr(tensor, 'untyped_storage'):
+        return tensor.untyped_storage()
+    return tensor.storage()
@@ -13,8 +13,12 @@
 # limitations under the License.
 
 import os
+import pickle
 import warnings
 from functools import wraps
+from typing import Any, List, Optional
+
+import torch
 
 from pytorch_lightning import _logger as log
 
@@ -63,3 +67,39 @@ def find_free_network_port() -> int:
     port = s.getsockname()[1]
     s.close()
     return port
+
+
+def all_gather_object(obj: Any, group: Optional[Any] = None) -> List[Any]:
+    """
+    Gathers a picklable object from every process of the group, on every process.
+    Returns ``[obj]`` when ``torch.distributed`` is not initialized.
+
+    Args:
+        obj: the object of this process.
+        group: the process group to gather from. Defaults to all processes (world).
+
+    Return:
+        the objects of the processes, by rank
+    """
+    if not (torch.distributed.is_available() and torch.distributed.is_initialized()):
+        return [obj]
+    if group is None:
+        group = torch.distributed.group.WORLD
+    world_size = torch.distributed.get_world_size(group)
+    # NCCL only gathers CUDA tensors
+    device = torch.device('cpu')
+    if torch.distributed.get_backend(group) == 'nccl':
+        device = torch.device('cuda', torch.cuda.current_device())
+
+    data = torch.tensor(bytearray(pickle.dumps(obj)), dtype=torch.uint8, device=device)
+    size = torch.tensor([data.numel()], dtype=torch.long, device=device)
+    sizes = [torch.zeros_like(size) for _ in range(world_size)]
+    torch.distributed.all_gather(sizes, size, group)
+    sizes = [int(s.item()) for s in sizes]
+
+    # the tensors gathered must have the same size
+    padded = torch.zeros(max(sizes), dtype=torch.uint8, device=device)
+    padded[:data.numel()] = data
+    gathered = [torch.zeros_like(padded) for _ in range(world_size)]
+    torch.distributed.all_gather(gathered, padded, group)
+    return [pickle.loads(t[:n].cpu().numpy().tobytes()) for t, n in zip(gathered, sizes)]
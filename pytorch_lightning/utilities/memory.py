@@ -13,9 +13,16 @@
 # limitations under the License.
 
 import gc
+import sys
+from typing import Optional
 
 import torch
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
 
 def recursive_detach(in_dict: dict) -> dict:
     """Detach all tensors in `in_dict`.
@@ -75,3 +82,12 @@ def garbage_collection_cuda():
     gc.collect()
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident set size of the current process in MB, ``None`` if it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes on Linux but in bytes on macOS
+    return peak / 1024 ** (2 if sys.platform == 'darwin' else 1)
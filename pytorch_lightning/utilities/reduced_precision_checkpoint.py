@@ -0,0 +1,132 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reduced precision checkpoints
+=============================
+
+Weights only exports for deployment, in which the floating point tensors of the ``state_dict`` are cast
+to ``float16`` or ``bfloat16``, halving the size of the file and the time to read it. A small header records
+the original dtype of every cast tensor, loading the export with
+:func:`~pytorch_lightning.utilities.cloud_io.load` casts them back transparently.
+
+Which dtype each tensor is exported with can be chosen by a policy of ``fnmatch`` patterns of the
+``state_dict`` keys, e.g. to keep the normalization layers in full precision::
+
+    export_checkpoint(checkpoint, 'float16', dtype_policy={'*.bn*': None})
+
+"""
+
+import copy
+import fnmatch
+from typing import Any, Dict, Optional, Union
+
+import torch
+
+EXPORT_METADATA_KEY = 'export_metadata'
+EXPORT_FORMAT_VERSION = 1
+EXPORT_DTYPES = {
+    'float16': torch.float16,
+    'fp16': torch.float16,
+    'half': torch.float16,
+    'bfloat16': torch.bfloat16,
+    'bf16': torch.bfloat16,
+    'float32': torch.float32,
+    'fp32': torch.float32,
+}
+
+_dtype = Optional[Union[str, torch.dtype]]
+
+
+def is_exported_checkpoint(checkpoint: Any) -> bool:
+    return isinstance(checkpoint, dict) and EXPORT_METADATA_KEY in checkpoint
+
+
+def export_checkpoint(
+        checkpoint: Dict[str, Any],
+        dtype: _dtype = torch.float16,
+        dtype_policy: Optional[Dict[str, _dtype]] = None,
+        model: Optional[torch.nn.Module] = None,
+) -> Dict[str, Any]:
+    """
+    Casts the floating point tensors of the ``state_dict`` of a checkpoint to a reduced precision.
+
+    Args:
+        checkpoint: the checkpoint dictionary as created by ``dump_checkpoint``. Optimizer states are dropped.
+        dtype: the dtype of the exported floating point tensors, e.g. ``'float16'`` or ``torch.bfloat16``.
+        dtype_policy: maps ``fnmatch`` patterns of ``state_dict`` keys to the dtype of the matching tensors,
+            the first matching pattern is used. ``None`` keeps the original dtype.
+        model: if given, the non-persistent buffers of its modules are removed from the ``state_dict``,
+            e.g. when a module overrides ``state_dict`` or torch does not support them yet.
+
+    Return:
+        the exported checkpoint, to be saved with ``torch.save``
+    """
+    default_dtype = _parse_dtype(dtype)
+    policy = [(pattern, _parse_dtype(value)) for pattern, value in (dtype_policy or {}).items()]
+
+    state_dict = checkpoint['state_dict']
+    stripped = []
+    if model is not None:
+        stripped = [key for key in _non_persistent_buffer_names(model) if key in state_dict]
+
+    # shallow copy keeps the ``_metadata`` of the state dict
+    exported = copy.copy(state_dict)
+    for key in stripped:
+        del exported[key]
+
+    original_dtypes = {}
+    for key, tensor in exported.items():
+        if not isinstance(tensor, torch.Tensor) or not tensor.is_floating_point():
+            continue
+        target = next((value for pattern, value in policy if fnmatch.fnmatchcase(key, pattern)), default_dtype)
+        if target is not None and target != tensor.dtype:
+            original_dtypes[key] = tensor.dtype
+            exported[key] = tensor.detach().to(target)
+
+    checkpoint = {k: v for k, v in checkpoint.items() if k != 'optimizer_states'}
+    checkpoint['state_dict'] = exported
+    checkpoint[EXPORT_METADATA_KEY] = {
+        'version': EXPORT_FORMAT_VERSION,
+        'dtype': default_dtype,
+        'original_dtypes': original_dtypes,
+        'stripped_buffers': stripped,
+    }
+    return checkpoint
+
+
+def upcast_checkpoint(checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """Casts the tensors of a checkpoint exported by :func:`export_checkpoint` back to their original dtype."""
+    checkpoint = dict(checkpoint)
+    metadata = checkpoint.pop(EXPORT_METADATA_KEY)
+    state_dict = copy.copy(checkpoint['state_dict'])
+    for key, original_dtype in metadata['original_dtypes'].items():
+        if key in state_dict:
+            state_dict[key] = state_dict[key].to(original_dtype)
+    checkpoint['state_dict'] = state_dict
+    return checkpoint
+
+
+def _parse_dtype(dtype: _dtype) -> Optional[torch.dtype]:
+    if dtype is None or isinstance(dtype, torch.dtype):
+        return dtype
+    if dtype not in EXPORT_DTYPES:
+        raise ValueError(f'Unknown export dtype {dtype}, choose one of {list(EXPORT_DTYPES)}.')
+    return EXPORT_DTYPES[dtype]
+
+
+def _non_persistent_buffer_names(model: torch.nn.Module):
+    for module_name, module in model.named_modules():
+        prefix = f'{module_name}.' if module_name else ''
+        for name in getattr(module, '_non_persistent_buffers_set', ()):
+            yield prefix + name
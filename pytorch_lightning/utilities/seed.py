@@ -16,7 +16,7 @@
 
 import os
 import random
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import numpy as np
 import torch
@@ -66,3 +66,24 @@ def _select_seed_randomly(min_seed_value: int = 0, max_seed_value: int = 255) ->
     seed = random.randint(min_seed_value, max_seed_value)
     log.warning(f"No correct seed found, seed set to {seed}")
     return seed
+
+
+def _collect_rng_states() -> Dict[str, Any]:
+    """Collects the global random states of torch, numpy and python."""
+    states = {
+        'torch': torch.get_rng_state(),
+        'numpy': np.random.get_state(),
+        'python': random.getstate(),
+    }
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        states['torch.cuda'] = torch.cuda.get_rng_state_all()
+    return states
+
+
+def _set_rng_states(states: Dict[str, Any]) -> None:
+    """Sets the global random states collected by :func:`_collect_rng_states`."""
+    torch.set_rng_state(states['torch'])
+    np.random.set_state(states['numpy'])
+    random.setstate(states['python'])
+    if 'torch.cuda' in states and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(states['torch.cuda'])
@@ -0,0 +1,309 @@
+# Copyright The PyTorch Lightning team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sharded checkpoints
+===================
+
+Directory based checkpoint format for large models. The tensors of the ``state_dict`` and of every
+optimizer state are split into size-bounded shard files which are written and read in parallel by a
+thread pool. Everything else is kept in a small index file together with the location of each tensor,
+so single tensors can be loaded without reading the whole checkpoint::
+
+    epoch=3.ckpt/
+        index.ckpt
+        shard-9b1c04e2-00000-of-00003.ckpt
+        shard-9b1c04e2-00001-of-00003.ckpt
+        shard-9b1c04e2-00002-of-00003.ckpt
+
+The shards of every save get new names and the index, the only reference to them, is replaced atomically,
+so a checkpoint overwritten in place is always complete, either the previous or the new one.
+
+"""
+
+import copy
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import torch
+
+from pytorch_lightning.utilities.cloud_io import _torch_save, atomic_save, get_filesystem, is_local_filesystem
+
+SHARDED_CHECKPOINT_INDEX = 'index.ckpt'
+SHARDED_CHECKPOINT_KEYS = ('state_dict', 'optimizer_states')
+
+
+class _TensorReference(object):
+    """Placeholder stored in the index in place of a tensor which lives in a shard."""
+
+    __slots__ = ('key',)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __getstate__(self):
+        return self.key
+
+    def __setstate__(self, state):
+        self.key = state
+
+
+def is_sharded_checkpoint(path: str) -> bool:
+    """Checks whether ``path`` points to a directory written by :func:`save_sharded_checkpoint`."""
+    path = str(path)
+    fs = get_filesystem(path)
+    return fs.isdir(path) and fs.exists(os.path.join(path, SHARDED_CHECKPOINT_INDEX))
+
+
+def save_sharded_checkpoint(
+        checkpoint: Dict[str, Any],
+        dirpath: str,
+        max_shard_size: int,
+        num_workers: Optional[int] = None,
+):
+    """
+    Saves a checkpoint as a directory of size-bounded shards.
+
+    The shards are written in parallel next to the shards of any previous checkpoint at this location,
+    which is then replaced by atomically replacing the index. The shards of the previous checkpoint are
+    deleted afterwards.
+
+    Args:
+        checkpoint: the checkpoint dictionary as created by ``dump_checkpoint``.
+        dirpath: the directory the checkpoint is saved to.
+        max_shard_size: maximal number of tensor bytes per shard. A single tensor larger
+            than this limit is stored in its own shard.
+        num_workers: number of threads writing shards, defaults to one per shard, up to 32.
+    """
+    if max_shard_size <= 0:
+        raise ValueError(f'`max_shard_size` has to be a positive number of bytes, got {max_shard_size}.')
+
+    dirpath = str(dirpath)
+    fs = get_filesystem(dirpath)
+    if is_local_filesystem(fs):
+        dirpath = fs._strip_protocol(dirpath)
+
+    index, tensors = _split_checkpoint(checkpoint)
+    shards = _pack_shards(tensors, max_shard_size)
+    version = uuid.uuid4().hex[:8]
+    shard_names = [f'shard-{version}-{i:05d}-of-{len(shards):05d}.ckpt' for i in range(len(shards))]
+    index['tensor_locations'] = {key: name for name, shard in zip(shard_names, shards) for key in shard}
+    index['shards'] = shard_names
+
+    if fs.isfile(dirpath):
+        # a checkpoint of another format, it cannot be replaced atomically by a directory
+        fs.rm(dirpath)
+    fs.makedirs(dirpath, exist_ok=True)
+
+    def _write(name, obj):
+        path = os.path.join(dirpath, name)
+        if is_local_filesystem(fs):
+            with open(path, 'wb') as f:
+                _torch_save(obj, f)
+                # the shards are on disk before the index references them
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with fs.open(path, 'wb') as f:
+                _torch_save(obj, f)
+
+    try:
+        with ThreadPoolExecutor(max_workers=_num_workers(num_workers, len(shards))) as executor:
+            list(executor.map(_write, shard_names, shards))
+        # the index is replaced last, until then the directory holds the previous checkpoint
+        atomic_save(index, os.path.join(dirpath, SHARDED_CHECKPOINT_INDEX))
+    except BaseException:
+        for name in shard_names:
+            if fs.exists(os.path.join(dirpath, name)):
+                fs.rm(os.path.join(dirpath, name))
+        raise
+    _remove_unreferenced_files(fs, dirpath, shard_names)
+
+
+def load_sharded_checkpoint(
+        dirpath: str,
+        map_location=None,
+        num_workers: Optional[int] = None,
+        weights_only: bool = False,
+) -> Dict[str, Any]:
+    """
+    Loads a checkpoint saved by :func:`save_sharded_checkpoint`, reading the shards in parallel.
+
+    Args:
+        dirpath: the checkpoint directory.
+        map_location: same as in :func:`torch.load`, applied to every shard.
+        num_workers: number of threads reading shards, defaults to one per shard, up to 32.
+        weights_only: only read the shards of the ``state_dict``, the optimizer states are dropped.
+
+    Return:
+        the checkpoint dictionary, as it was passed to :func:`save_sharded_checkpoint`
+    """
+    index = _load_index(dirpath, map_location)
+    shard_names = index['shards']
+    if weights_only:
+        index.pop('optimizer_states', None)
+        shard_names = sorted(set(
+            name for key, name in index['tensor_locations'].items() if key.startswith('state_dict/')
+        ))
+    tensors = _load_shards(dirpath, shard_names, map_location, num_workers)
+    return _merge_checkpoint(index, tensors)
+
+
+def load_sharded_tensors(
+        dirpath: str,
+        keys: Iterable[str],
+        map_location=None,
+        num_workers: Optional[int] = None,
+) -> Dict[str, torch.Tensor]:
+    """
+    Loads selected tensors of a sharded checkpoint, only the shards holding them are read.
+
+    Keys are the ``/`` separated paths of the tensors inside the checkpoint, e.g. ``state_dict/layer.weight``
+    or ``optimizer_states/0/state/1/exp_avg``, in which a ``/`` of a dictionary key is escaped as ``%2F``
+    and a ``%`` as ``%25``. All available keys are listed by :func:`sharded_tensor_keys`.
+    """
+    dirpath = str(dirpath)
+    index = _load_index(dirpath, map_location)
+    locations = index['tensor_locations']
+    keys = list(keys)
+    missing = [key for key in keys if key not in locations]
+    if missing:
+        raise KeyError(f'Tensors {missing} are not part of the checkpoint {dirpath}.')
+
+    shard_names = sorted(set(locations[key] for key in keys))
+    tensors = _load_shards(dirpath, shard_names, map_location, num_workers)
+    return {key: tensors[key] for key in keys}
+
+
+def sharded_tensor_keys(dirpath: str) -> List[str]:
+    """Lists the keys of all tensors stored in the shards of a sharded checkpoint."""
+    return list(_load_index(dirpath)['tensor_locations'])
+
+
+def _load_index(dirpath: str, map_location=None) -> Dict[str, Any]:
+    dirpath = str(dirpath)
+    fs = get_filesystem(dirpath)
+    with fs.open(os.path.join(dirpath, SHARDED_CHECKPOINT_INDEX), 'rb') as f:
+        return torch.load(f, map_location=map_location)
+
+
+def _load_shards(dirpath: str, shard_names: List[str], map_location, num_workers: Optional[int]):
+    dirpath = str(dirpath)
+    fs = get_filesystem(dirpath)
+
+    def _read(name):
+        with fs.open(os.path.join(dirpath, name), 'rb') as f:
+            return torch.load(f, map_location=map_location)
+
+    tensors = {}
+    with ThreadPoolExecutor(max_workers=_num_workers(num_workers, len(shard_names))) as executor:
+        for shard in executor.map(_read, shard_names):
+            tensors.update(shard)
+    return tensors
+
+
+def _num_workers(num_workers: Optional[int], num_shards: int) -> int:
+    return num_workers or min(max(num_shards, 1), 32)
+
+
+def _remove_unreferenced_files(fs, dirpath: str, shard_names: List[str]):
+    """Deletes the shards of the previous checkpoints and the leftovers of interrupted saves."""
+    keep = set(shard_names) | {SHARDED_CHECKPOINT_INDEX}
+    for path in fs.ls(dirpath, detail=False):
+        if os.path.basename(path.rstrip('/')) not in keep:
+            fs.rm(path, recursive=True)
+
+
+def _split_checkpoint(checkpoint: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, torch.Tensor]]:
+    """Replaces the tensors of the sharded entries by references, returns the index and the tensors."""
+    tensors = {}
+    index = dict(checkpoint)
+    for key in SHARDED_CHECKPOINT_KEYS:
+        if key in checkpoint:
+            index[key] = _extract_tensors(checkpoint[key], key, tensors)
+    return index, tensors
+
+
+def _merge_checkpoint(index: Dict[str, Any], tensors: Dict[str, torch.Tensor]) -> Dict[str, Any]:
+    checkpoint = dict(index)
+    del checkpoint['tensor_locations'], checkpoint['shards']
+    for key in SHARDED_CHECKPOINT_KEYS:
+        if key in checkpoint:
+            checkpoint[key] = _insert_tensors(checkpoint[key], tensors)
+    return checkpoint
+
+
+def _escape_key(key: Any) -> str:
+    """Escapes the separator in a dictionary key, so ``{'a/b': x}`` and ``{'a': {'b': y}}`` get distinct paths."""
+    return str(key).replace('%', '%25').replace('/', '%2F')
+
+
+def _extract_tensors(data: Any, prefix: str, tensors: Dict[str, torch.Tensor]) -> Any:
+    if isinstance(data, torch.Tensor):
+        if prefix in tensors:
+            # e.g. the keys ``1`` and ``'1'`` of the same dictionary
+            raise ValueError(f'The checkpoint has several tensors at the path {prefix}.')
+        if _storage_nbytes(data) != data.numel() * data.element_size():
+            # views would serialize the whole underlying storage into the shard
+            data = data.clone()
+        tensors[prefix] = data
+        return _TensorReference(prefix)
+    if isinstance(data, dict):
+        # shallow copy keeps the type and attributes such as the ``_metadata`` of a state dict
+        new_data = copy.copy(data)
+        for k, v in data.items():
+            new_data[k] = _extract_tensors(v, f'{prefix}/{_escape_key(k)}', tensors)
+        return new_data
+    if isinstance(data, (list, tuple)) and not hasattr(data, '_fields'):
+        return type(data)(_extract_tensors(v, f'{prefix}/{i}', tensors) for i, v in enumerate(data))
+    return data
+
+
+def _insert_tensors(data: Any, tensors: Dict[str, torch.Tensor]) -> Any:
+    if isinstance(data, _TensorReference):
+        return tensors[data.key]
+    if isinstance(data, dict):
+        for k, v in data.items():
+            data[k] = _insert_tensors(v, tensors)
+        return data
+    if isinstance(data, (list, tuple)) and not hasattr(data, '_fields'):
+        return type(data)(_insert_tensors(v, tensors) for v in data)
+    return data
+
+
+def _storage_nbytes(tensor: torch.Tensor) -> int:
+    if hasattr(tensor, 'untyped_storage'):
+        return tensor.untyped_storage().nbytes()
+    return tensor.storage().size() * tensor.element_size()
+
+
+def _pack_shards(tensors: Dict[str, torch.Tensor], max_shard_size: int) -> List[Dict[str, torch.Tensor]]:
+    """
+    Greedily groups tensors, in order, into shards of at most ``max_shard_size`` bytes.
+    Tensors of different checkpoint entries never share a shard, so they can be loaded separately.
+    """
+    shards, current, current_size, current_entry = [], {}, 0, None
+    for key, tensor in tensors.items():
+        size = tensor.numel() * tensor.element_size()
+        entry = key.split('/', 1)[0]
+        if current and (current_size + size > max_shard_size or entry != current_entry):
+            shards.append(current)
+            current, current_size = {}, 0
+        current[key] = tensor
+        current_size += size
+        current_entry = entry
+    if current or not shards:
+        shards.append(current)
+    return shards
@@ -1,10 +1,19 @@
 import argparse
+import fnmatch
+import glob
+import os
+import pickle
+import time
+import zipfile
+from multiprocessing import Pool
 from shutil import copyfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import torch
 
 from pytorch_lightning import _logger as log
 from pytorch_lightning.callbacks import EarlyStopping, ModelCheckpoint
+from pytorch_lightning.utilities.cloud_io import atomic_save
 
 KEYS_MAPPING = {
     "checkpoint_callback_best_model_score": (ModelCheckpoint, "best_model_score"),
@@ -14,9 +23,12 @@ KEYS_MAPPING = {
     "early_stop_callback_patience": (EarlyStopping, "patience"),
 }
 
+UPGRADED, SKIPPED, FAILED = "upgraded", "skipped", "failed"
+_LOG_EVERY_N_FILES = 100
+
 
 def upgrade_checkpoint(filepath):
-    checkpoint = torch.load(filepath)
+    checkpoint = torch.load(filepath, map_location="cpu")
     checkpoint["callbacks"] = checkpoint.get("callbacks") or {}
 
     for key, new_path in KEYS_MAPPING.items():
@@ -27,19 +39,167 @@ def upgrade_checkpoint(filepath):
             checkpoint["callbacks"][callback_type][callback_key] = value
             del checkpoint[key]
 
-    torch.save(checkpoint, filepath)
+    # written next to the original and renamed, an interrupted upgrade leaves the original intact
+    atomic_save(checkpoint, filepath)
+
+
+def needs_upgrade(filepath) -> bool:
+    """
+    Whether the checkpoint still has keys of the old schema, e.g. ``checkpoint_callback_best``.
+
+    Only the pickled structure of the checkpoint is read, the tensor data is skipped, so this
+    is cheap even for large checkpoints.
+    """
+    keys = read_checkpoint_keys(filepath)
+    return any(key in keys for key in KEYS_MAPPING)
+
+
+def read_checkpoint_keys(filepath) -> Dict[str, Any]:
+    """
+    Reads the top-level entries of a checkpoint saved by ``torch.save`` without loading its tensors,
+    which are replaced by ``None``. Both the zip and the legacy serialization formats are supported.
+    """
+    if zipfile.is_zipfile(filepath):
+        with zipfile.ZipFile(filepath) as archive:
+            # the pickle is stored as `<archive name>/data.pkl`, next to one file per storage
+            name = next(n for n in archive.namelist() if n.endswith("data.pkl"))
+            with archive.open(name) as f:
+                return _TensorSkippingUnpickler(f).load()
+
+    with open(filepath, "rb") as f:
+        # magic number, protocol version and system info precede the pickle of the checkpoint
+        for _ in range(3):
+            pickle.load(f)
+        return _TensorSkippingUnpickler(f).load()
+
+
+class _TensorSkippingUnpickler(pickle.Unpickler):
+
+    def find_class(self, module, name):
+        # e.g. `torch._utils._rebuild_tensor_v2` or `_rebuild_parameter`, which would read the storages
+        if module.startswith("torch") and name.startswith("_rebuild"):
+            return _skip_tensor
+        return super().find_class(module, name)
+
+    def persistent_load(self, saved_id):
+        # a reference to a storage, its data is stored after the pickle or in a separate file
+        return None
+
+
+def _skip_tensor(*args, **kwargs):
+    return None
+
+
+def find_checkpoints(paths: Iterable[str], pattern: str = "*.ckpt") -> Iterator[str]:
+    """
+    Expands files, directories and glob patterns to checkpoint files. Directories are searched
+    recursively for files matching ``pattern``. Files are yielded as they are found.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(fnmatch.filter(files, pattern)):
+                    yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            matches = sorted(glob.glob(path, recursive=True))
+            if not matches:
+                log.warning(f"No checkpoint found for {path}")
+            for match in matches:
+                if os.path.isfile(match):
+                    yield match
+
+
+def upgrade_checkpoints(
+        paths: Iterable[str], workers: int = 1, backup: bool = True, pattern: str = "*.ckpt"
+) -> Dict[str, List[str]]:
+    """
+    Upgrades many checkpoints, in a pool of ``workers`` processes.
+
+    Checkpoints which are already upgraded are skipped without loading them. Each file is upgraded
+    independently, a failure is logged and the remaining files are still upgraded.
+
+    Args:
+        paths: checkpoint files, directories or glob patterns, see :func:`find_checkpoints`.
+        workers: the number of processes, with ``1`` the files are upgraded in this process.
+        backup: copy every upgraded checkpoint to ``<file>.bak`` first.
+        pattern: the pattern of the checkpoint file names searched in directories.
+
+    Return:
+        the paths of the checkpoints by status, ``'upgraded'``, ``'skipped'`` or ``'failed'``
+    """
+    results = {UPGRADED: [], SKIPPED: [], FAILED: []}
+    filepaths = find_checkpoints(paths, pattern=pattern)
+    jobs = ((filepath, backup) for filepath in filepaths)
+    start_time = time.monotonic()
+    num_bytes = 0
+
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        # files are only listed as the pool consumes them, the upgrade starts before all are found
+        outcomes = pool.imap_unordered(_upgrade_one, jobs) if pool is not None else map(_upgrade_one, jobs)
+        for i, (filepath, status, size, error) in enumerate(outcomes, 1):
+            results[status].append(filepath)
+            if status == FAILED:
+                log.error(f"Failed to upgrade {filepath}: {error}")
+            elif status == UPGRADED:
+                num_bytes += size
+            if i % _LOG_EVERY_N_FILES == 0:
+                log.info(_throughput(i, num_bytes, time.monotonic() - start_time))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    num_files = sum(len(v) for v in results.values())
+    log.info(
+        f"{len(results[UPGRADED])} upgraded, {len(results[SKIPPED])} already up to date,"
+        f" {len(results[FAILED])} failed. {_throughput(num_files, num_bytes, time.monotonic() - start_time)}"
+    )
+    return results
+
+
+def _upgrade_one(job: Tuple[str, bool]) -> Tuple[str, str, int, Optional[str]]:
+    filepath, backup = job
+    try:
+        if not needs_upgrade(filepath):
+            return filepath, SKIPPED, 0, None
+        if backup:
+            copyfile(filepath, filepath + ".bak")
+        upgrade_checkpoint(filepath)
+        return filepath, UPGRADED, os.path.getsize(filepath), None
+    except Exception as e:
+        return filepath, FAILED, 0, repr(e)
+
+
+def _throughput(num_files: int, num_bytes: int, elapsed: float) -> str:
+    elapsed = max(elapsed, 1e-6)
+    return (
+        f"Processed {num_files} files in {elapsed:.1f}s:"
+        f" {num_files / elapsed:.1f} files/s, {num_bytes / elapsed / 1024 ** 2:.1f} MB/s upgraded"
+    )
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(
-        description="Upgrade an old checkpoint to the current schema. \
-        This will also save a backup of the original file."
+        description="Upgrade old checkpoints to the current schema. \
+        This will also save a backup of the original files."
     )
+    parser.add_argument("paths", nargs="*", help="checkpoint files, directories or glob patterns to upgrade")
     parser.add_argument("--file", help="filepath for a checkpoint to upgrade")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes upgrading checkpoints")
+    parser.add_argument("--pattern", default="*.ckpt", help="pattern of the checkpoint files in directories")
+    parser.add_argument("--no-backup", action="store_true", help="do not save a backup of the original files")
 
     args = parser.parse_args()
+    paths = args.paths + ([args.file] if args.file else [])
+    if not paths:
+        parser.error("no checkpoint to upgrade")
 
-    log.info("Creating a backup of the existing checkpoint file before overwriting in the upgrade process.")
-    copyfile(args.file, args.file + ".bak")
-    upgrade_checkpoint(args.file)
+    if not args.no_backup:
+        log.info("Creating a backup of the existing checkpoint files before overwriting in the upgrade process.")
+    results = upgrade_checkpoints(paths, workers=args.workers, backup=not args.no_backup, pattern=args.pattern)
+    if results[FAILED]:
+        raise SystemExit(1)
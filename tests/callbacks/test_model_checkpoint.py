@@ -1,10 +1,13 @@
+import itertools
 import os
 import pickle
 import platform
 import re
 from pathlib import Path
+from unittest import mock
 
 import cloudpickle
+import fsspec
 import pytest
 import torch
 
@@ -174,6 +177,94 @@ def test_model_checkpoint_save_last(tmpdir):
     ModelCheckpoint.CHECKPOINT_NAME_LAST = 'last'
 
 
+@mock.patch('pytorch_lightning.callbacks.model_checkpoint.time')
+def test_model_checkpoint_train_time_interval(time_mock, tmpdir):
+    """Tests that the last checkpoint is saved inside the epoch every `train_time_interval` seconds."""
+    # every reading of the clock advances it by one second, so every batch takes one second
+    time_mock.monotonic.side_effect = itertools.count()
+    model = EvalModelTemplate()
+    model_checkpoint = ModelCheckpoint(monitor='val_loss', filepath=tmpdir, save_last=True, train_time_interval=2)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        checkpoint_callback=model_checkpoint,
+        max_epochs=1,
+        limit_train_batches=7,
+        limit_val_batches=2,
+    )
+    epoch_states = []
+
+    def save_train_time_checkpoint(*args):
+        ModelCheckpoint.save_train_time_checkpoint(model_checkpoint, *args)
+        epoch_states.append(torch.load(model_checkpoint.last_model_path)['epoch_progress_state'])
+
+    with mock.patch.object(model_checkpoint, 'save_train_time_checkpoint', side_effect=save_train_time_checkpoint):
+        trainer.fit(model)
+
+    # saved at the end of the 2nd, 4th and 6th batch, then replaced by the last checkpoint of the epoch
+    assert [state['batch_idx'] for state in epoch_states] == [2, 4, 6]
+    assert [state['global_step'] for state in epoch_states] == [2, 4, 6]
+    assert model_checkpoint.last_model_path == str(tmpdir / 'last.ckpt')
+    assert set(os.listdir(tmpdir)) == {'epoch=0.ckpt', 'last.ckpt', 'lightning_logs'}
+
+
+@mock.patch('pytorch_lightning.trainer.training_loop.time')
+def test_model_checkpoint_train_time_full_checkpoint(time_mock, tmpdir):
+    """Tests that the last checkpoint saved on the time budget can resume training, also when exporting."""
+    # every batch takes one second, the budget is reached after the third batch
+    time_mock.monotonic.side_effect = itertools.count()
+    model_checkpoint = ModelCheckpoint(filepath=tmpdir, save_last=True, export_dtype='float16', save_weights_only=True)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        checkpoint_callback=model_checkpoint,
+        max_epochs=1,
+        max_time=5,
+        limit_train_batches=10,
+        limit_val_batches=0,
+    )
+    trainer.fit(EvalModelTemplate())
+
+    # not replaced by a weights-only export at the end of training
+    checkpoint = torch.load(model_checkpoint.last_model_path)
+    assert 'optimizer_states' in checkpoint
+    assert checkpoint['epoch_progress_state']['batch_idx'] == 3
+    assert all(v.dtype == torch.float32 for v in checkpoint['state_dict'].values() if v.is_floating_point())
+
+
+def test_model_checkpoint_train_time_interval_requires_save_last(tmpdir):
+    with pytest.raises(MisconfigurationException, match='save_last=True'):
+        ModelCheckpoint(filepath=tmpdir, train_time_interval=2)
+
+
+def test_model_checkpoint_remote_round_trips(tmpdir):
+    """Tests that saving on remote storage lists the directory once and deletes stale checkpoints in bulk."""
+    model = EvalModelTemplate()
+    fs = fsspec.filesystem('memory')
+    fs.makedirs('/checkpoints', exist_ok=True)
+    model_checkpoint = ModelCheckpoint(filepath='memory://checkpoints')
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        checkpoint_callback=model_checkpoint,
+        max_epochs=3,
+        limit_train_batches=2,
+        limit_val_batches=2,
+        logger=False,
+    )
+    with mock.patch.object(fs, 'ls', wraps=fs.ls) as ls_mock, \
+            mock.patch.object(fs, 'rm', wraps=fs.rm) as rm_mock, \
+            mock.patch.object(fs, 'makedirs', wraps=fs.makedirs) as makedirs_mock:
+        trainer.fit(model)
+
+    # 3 saves, each one replacing the previous checkpoint
+    assert ls_mock.call_count == 3
+    # the other calls are made by `mv`, which copies and removes on this filesystem
+    bulk_rm_calls = [call for call in rm_mock.call_args_list if isinstance(call[0][0], list)]
+    assert len(bulk_rm_calls) == 2
+    assert makedirs_mock.call_count == 1
+    names = [os.path.basename(path) for path in fs.ls('/checkpoints', detail=False)]
+    assert names == ['epoch=2.ckpt']
+    fs.rm('/checkpoints', recursive=True)
+
+
 def test_none_monitor_top_k(tmpdir):
     """
     Make sure that when saving top k of anything (if it's not 1), then monitor cannot be none
@@ -0,0 +1,222 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from unittest import mock
+
+import pytest
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Callback, Trainer
+from pytorch_lightning.accelerators.base_backend import Accelerator
+from pytorch_lightning.callbacks import ModelCheckpoint, PreemptionCheckpoint
+from pytorch_lightning.trainer.states import TrainerState
+from pytorch_lightning.utilities.checkpoint_manifest import CheckpointManifest
+from tests import PACKAGE_ROOT
+from tests.base import EvalModelTemplate
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="test requires SIGUSR1")
+@pytest.mark.parametrize('accumulate_grad_batches', [1, 2])
+def test_preemption_checkpoint_resumes_exact_step(tmpdir, accumulate_grad_batches):
+    """Test that a preemption signal saves a checkpoint the next run resumes from at the exact step."""
+
+    class SendSignal(Callback):
+        def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            if trainer.current_epoch == 1 and batch_idx == 2:
+                os.kill(os.getpid(), signal.SIGUSR1)
+
+    trainer_options = dict(
+        max_epochs=2,
+        limit_train_batches=6,
+        limit_val_batches=2,
+        accumulate_grad_batches=accumulate_grad_batches,
+        checkpoint_callback=False,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+    )
+
+    # uninterrupted run
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    trainer = Trainer(default_root_dir=os.path.join(tmpdir, 'full'), **trainer_options)
+    trainer.fit(model)
+
+    # preempted run, it stops after the step of the batch during which the signal arrived
+    tutils.reset_seed()
+    preempted_model = EvalModelTemplate()
+    preemption = PreemptionCheckpoint(signals=[signal.SIGUSR1], requeue=False)
+    preempted_trainer = Trainer(default_root_dir=tmpdir, callbacks=[preemption, SendSignal()], **trainer_options)
+    preempted_trainer.fit(preempted_model)
+
+    assert preempted_trainer.state == TrainerState.INTERRUPTED
+    assert preempted_trainer.batch_idx == 2
+    assert os.path.isfile(preemption.last_checkpoint_path)
+    # without a checkpoint callback recording a manifest, the next run finds it by listing the directory
+    assert not CheckpointManifest.exists(tmpdir)
+    # the previous handler is restored
+    assert signal.getsignal(signal.SIGUSR1) is not preemption._handle_signal
+
+    # the next run in the same directory restores the checkpoint
+    torch.manual_seed(123)
+    resumed_model = EvalModelTemplate()
+    resumed_trainer = Trainer(default_root_dir=tmpdir, **trainer_options)
+    resumed_trainer.fit(resumed_model)
+
+    assert resumed_trainer.global_step == trainer.global_step
+    for name, param in model.state_dict().items():
+        assert torch.equal(param, resumed_model.state_dict()[name]), name
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="test requires SIGUSR1")
+def test_preemption_skips_last_checkpoint(tmpdir):
+    """Test that no checkpoint is saved at the end of training after a preemption, only the preemption checkpoint."""
+
+    class SendSignal(Callback):
+        def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            if batch_idx == 2:
+                os.kill(os.getpid(), signal.SIGUSR1)
+
+    checkpoint_dir = os.path.join(tmpdir, 'checkpoints')
+    os.makedirs(checkpoint_dir)
+    preemption = PreemptionCheckpoint(signals=[signal.SIGUSR1], requeue=False)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=6,
+        limit_val_batches=2,
+        checkpoint_callback=ModelCheckpoint(filepath=checkpoint_dir, monitor=None, save_last=True),
+        callbacks=[preemption, SendSignal()],
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+    )
+    trainer.fit(EvalModelTemplate())
+
+    assert trainer.state == TrainerState.INTERRUPTED
+    assert os.path.isfile(preemption.last_checkpoint_path)
+    assert [name for name in os.listdir(checkpoint_dir) if name.endswith('.ckpt')] == []
+
+
+# trains until the signal sent by the test arrives in the first epoch, then prints the state of the trainer
+_PREEMPTED_SCRIPT = """
+import json, os, signal, sys, time
+from pytorch_lightning import Callback, Trainer
+from pytorch_lightning.callbacks import PreemptionCheckpoint
+from tests.base import EvalModelTemplate
+
+root_dir = sys.argv[1]
+preemption = PreemptionCheckpoint(signals=[signal.SIGUSR1], requeue=False)
+
+class WaitForSignal(Callback):
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+        if batch_idx == 2:
+            open(os.path.join(root_dir, 'ready'), 'w').close()
+            deadline = time.monotonic() + 60
+            while not preemption.preempted and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+trainer = Trainer(
+    default_root_dir=root_dir, max_epochs=1, limit_train_batches=6, limit_val_batches=0, checkpoint_callback=False,
+    logger=False, progress_bar_refresh_rate=0, weights_summary=None, callbacks=[preemption, WaitForSignal()],
+)
+trainer.fit(EvalModelTemplate())
+print(json.dumps({
+    'state': trainer.state.value, 'batch_idx': trainer.batch_idx, 'checkpoint': preemption.last_checkpoint_path,
+}))
+"""
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="test requires SIGUSR1")
+def test_preemption_signal_from_another_process(tmpdir):
+    """Test that a signal sent by another process to a training process stops it with a checkpoint."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen(
+        [sys.executable, '-c', _PREEMPTED_SCRIPT, str(tmpdir)], env=env, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True,
+    )
+    deadline = time.monotonic() + 120
+    while not tmpdir.join('ready').exists() and process.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    os.kill(process.pid, signal.SIGUSR1)
+    stdout, stderr = process.communicate(timeout=120)
+
+    assert process.returncode == 0, stderr
+    result = json.loads(stdout.splitlines()[-1])
+    assert result['state'] == TrainerState.INTERRUPTED.value
+    assert result['batch_idx'] == 2
+    # the next run resumes with the batch following the one during which the signal arrived
+    checkpoint = torch.load(result['checkpoint'])
+    assert checkpoint['epoch_progress_state']['batch_idx'] == 3
+
+
+def test_preemption_stops_all_processes(tmpdir):
+    """Test that a process stops at the step where another process of distributed training was preempted."""
+
+    def preemption_should_stop(self, preempted, pl_module):
+        # the signal is received by another process during the third batch
+        return preempted or self.trainer.batch_idx == 2
+
+    preemption = PreemptionCheckpoint(signals=[], requeue=False)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=6,
+        limit_val_batches=0,
+        checkpoint_callback=False,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+        callbacks=[preemption],
+    )
+    with mock.patch.object(Accelerator, 'preemption_should_stop', preemption_should_stop):
+        trainer.fit(EvalModelTemplate())
+
+    assert trainer.state == TrainerState.INTERRUPTED
+    assert trainer.batch_idx == 2
+    assert os.path.isfile(preemption.last_checkpoint_path)
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="test requires SIGUSR1")
+def test_preemption_checkpoint_written_during_shutdown(tmpdir):
+    """Test that the trainer shuts down while the checkpoint is written, and `fit` returns once it is written."""
+    written = threading.Event()
+    writer_alive = []
+
+    class SendSignal(Callback):
+        def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            if batch_idx == 2:
+                os.kill(os.getpid(), signal.SIGUSR1)
+
+        def on_train_end(self, trainer, pl_module):
+            writer_alive.append(preemption._writer is not None and preemption._writer.is_alive())
+            written.set()
+
+    preemption = PreemptionCheckpoint(signals=[signal.SIGUSR1], requeue=False)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=6,
+        limit_val_batches=0,
+        checkpoint_callback=False,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+        callbacks=[preemption, SendSignal()],
+    )
+    hpc_write = trainer.checkpoint_connector.hpc_write
+
+    def slow_hpc_write(*args):
+        written.wait(timeout=10)
+        hpc_write(*args)
+
+    with mock.patch.object(trainer.checkpoint_connector, 'hpc_write', slow_hpc_write):
+        trainer.fit(EvalModelTemplate())
+
+    assert writer_alive == [True]
+    assert os.path.isfile(preemption.last_checkpoint_path)
@@ -0,0 +1,41 @@
+import os
+
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Callback, Trainer
+from pytorch_lightning.callbacks import WeightAveraging
+from tests.base import EvalModelTemplate
+
+
+def test_weight_averaging(tmpdir):
+    """Test that the weights of the averaged epochs are saved with the batch normalization statistics."""
+
+    class RecordWeights(Callback):
+        weights = []
+
+        def on_train_epoch_end(self, trainer, pl_module):
+            self.weights.append(pl_module.c_d1.weight.detach().clone())
+
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    averaging = WeightAveraging(start_epoch=1)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=3,
+        limit_train_batches=4,
+        limit_val_batches=0,
+        checkpoint_callback=False,
+        callbacks=[RecordWeights(), averaging],
+    )
+    trainer.fit(model)
+
+    expected = (RecordWeights.weights[1] + RecordWeights.weights[2]) / 2
+    assert torch.allclose(model.c_d1.weight, expected, atol=1e-6)
+    # the statistics are recomputed over the training batches
+    assert model.c_d1_bn.num_batches_tracked == 4
+
+    assert averaging.averaged_model_path == os.path.join(trainer.weights_save_path, 'averaged.ckpt')
+    checkpoint = torch.load(averaging.averaged_model_path)
+    assert 'optimizer_states' not in checkpoint
+    assert torch.allclose(checkpoint['state_dict']['c_d1.weight'], expected, atol=1e-6)
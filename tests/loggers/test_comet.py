@@ -1,3 +1,4 @@
+import importlib
 import os
 from unittest.mock import patch
 
@@ -9,6 +10,19 @@ from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from tests.base import EvalModelTemplate
 
 
+def test_comet_auto_logging_disabled_on_use(monkeypatch):
+    """Test that the auto logging of Comet is only disabled once the CometLogger is looked up."""
+    import pytorch_lightning.loggers as loggers
+
+    monkeypatch.delenv("COMET_DISABLE_AUTO_LOGGING", raising=False)
+    monkeypatch.delitem(vars(loggers), "CometLogger")
+    importlib.reload(loggers)
+    assert "COMET_DISABLE_AUTO_LOGGING" not in os.environ
+
+    assert loggers.CometLogger is CometLogger
+    assert os.environ["COMET_DISABLE_AUTO_LOGGING"] == "1"
+
+
 def test_comet_logger_online():
     """Test comet online with mocks."""
     # Test api_key given
@@ -12,6 +12,7 @@ import torch
 import tests.base.develop_pipelines as tpipes
 import tests.base.develop_utils as tutils
 from pytorch_lightning import Trainer
+from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from tests.base import EvalModelTemplate
 from tests.base.models import BasicGAN
 
@@ -227,3 +228,17 @@ def test_horovod_multi_optimizer_with_scheduling_stepping(tmpdir):
 
     # Called every 3 steps, meaning for 1 epoch of 11 batches, it is called 3 times with gamma=0.1
     assert pytest.approx(init_lr * 0.1) == adjusted_lr2
+
+
+def test_horovod_without_torch_extension(tmpdir, monkeypatch):
+    """Test that a Horovod install which can not be imported with torch is reported when the backend is requested."""
+    package = tmpdir.mkdir('horovod')
+    package.join('__init__.py').write('')
+    package.mkdir('torch').join('__init__.py').write('raise ImportError("Horovod was built without PyTorch")')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    for name in ('horovod', 'horovod.torch'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.setattr('pytorch_lightning.accelerators.accelerator_connector.HOROVOD_AVAILABLE', True)
+
+    with pytest.raises(MisconfigurationException, match='Horovod was built without PyTorch'):
+        Trainer(default_root_dir=tmpdir, distributed_backend='horovod')
@@ -3,6 +3,7 @@ import logging as log
 import os
 import pickle
 import functools
+from unittest import mock
 
 import cloudpickle
 import pytest
@@ -193,6 +194,36 @@ def test_load_model_from_checkpoint(tmpdir, model_template):
     tutils.assert_ok_model_acc(new_trainer)
 
 
+@pytest.mark.parametrize('max_shard_size', [None, 4096])
+def test_load_model_from_checkpoint_lazy(tmpdir, caplog, max_shard_size):
+    """Verify that lazy loading restores the model without its optimizer states."""
+    hparams = EvalModelTemplate.get_default_hparams()
+    model = EvalModelTemplate(**hparams)
+    trainer = Trainer(default_root_dir=tmpdir, max_epochs=1, limit_train_batches=5, limit_val_batches=2)
+    trainer.fit(model)
+
+    ckpt_path = os.path.join(tmpdir, 'model.ckpt')
+    trainer.save_checkpoint(ckpt_path, max_shard_size=max_shard_size)
+
+    loaded_checkpoints = []
+
+    class LazyEvalModelTemplate(EvalModelTemplate):
+        def on_load_checkpoint(self, checkpoint):
+            loaded_checkpoints.append(checkpoint)
+
+    # the peak memory of the process is measured before and after the load
+    with mock.patch('pytorch_lightning.core.saving.peak_memory_mb', side_effect=[100., 150.]), \
+            caplog.at_level(log.INFO):
+        pretrained_model = LazyEvalModelTemplate.load_from_checkpoint(ckpt_path, lazy=True)
+
+    assert 'peak memory raised by 50.0 MB' in caplog.text
+    assert 'optimizer_states' not in loaded_checkpoints[0]
+    for k, v in hparams.items():
+        assert getattr(pretrained_model, k) == v
+    for (old_name, old_p), (new_name, new_p) in zip(model.named_parameters(), pretrained_model.named_parameters()):
+        assert torch.equal(old_p, new_p), 'loaded weights are not the same as the saved weights'
+
+
 @pytest.mark.skipif(torch.cuda.device_count() < 2, reason="test requires multi-GPU machine")
 def test_dp_resume(tmpdir):
     """Make sure DP continues training correctly."""
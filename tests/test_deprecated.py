@@ -7,6 +7,7 @@ import torch
 
 from pytorch_lightning import Trainer
 from pytorch_lightning.callbacks import GpuUsageLogger, LearningRateLogger
+from pytorch_lightning.profiler import SimpleProfiler
 from tests.base import EvalModelTemplate
 
 
@@ -21,6 +22,14 @@ def test_tbd_remove_in_v0_11_0_trainer():
         lr_logger = LearningRateLogger()
 
 
+def test_tbd_remove_in_v0_11_0_profiler():
+    profiler = SimpleProfiler()
+    with profiler.profile('a'):
+        pass
+    with pytest.deprecated_call(match='will be removed in v0.11.0'):
+        assert len(profiler.recorded_durations['a']) == 1
+
+
 @pytest.mark.skipif(not torch.cuda.is_available(), reason="test requires GPU machine")
 def test_tbd_remove_in_v0_11_0_trainer_gpu():
     with pytest.deprecated_call(match='will be removed in v0.11.0'):
@@ -1,11 +1,31 @@
+import json
 import os
+import threading
 import time
+import tracemalloc
 from pathlib import Path
 
+from unittest.mock import Mock, patch
+
 import numpy as np
 import pytest
-
-from pytorch_lightning.profiler import AdvancedProfiler, SimpleProfiler
+import torch
+
+from pytorch_lightning import Trainer
+from pytorch_lightning.accelerators.gpu_backend import GPUBackend
+from pytorch_lightning.profiler import (
+    AdvancedProfiler,
+    DataPipelineProfiler,
+    MemoryProfiler,
+    OverheadProfiler,
+    PyTorchProfiler,
+    SamplingProfiler,
+    SimpleProfiler,
+    TraceProfiler,
+)
+from pytorch_lightning.profiler.profilers import _prefetched_batches
+from pytorch_lightning.profiler.statistics import RunningStats
+from tests.base import EvalModelTemplate
 
 PROFILER_OVERHEAD_MAX_TOLERANCE = 0.0005
 
@@ -54,6 +74,11 @@ def test_simple_profiler_durations(simple_profiler, action, expected):
         simple_profiler.recorded_durations[action], expected, rtol=0.2
     )
 
+    stats = simple_profiler.recorded_stats[action]
+    assert stats.count == len(expected)
+    np.testing.assert_allclose(stats.mean, np.mean(expected), rtol=0.2)
+    np.testing.assert_allclose([stats.min, stats.max], [min(expected), max(expected)], rtol=0.2)
+
 
 @pytest.mark.parametrize(["action", "expected"], [
     pytest.param("a", [3, 1]),
@@ -72,6 +97,11 @@ def test_simple_profiler_iterable_durations(simple_profiler, action, expected):
         simple_profiler.recorded_durations[action][:-1], expected, rtol=0.2
     )
 
+    stats = simple_profiler.recorded_stats[action]
+    assert stats.count == len(expected) + 1
+    np.testing.assert_allclose(stats.total, np.sum(expected), rtol=0.2)
+    np.testing.assert_allclose(stats.max, max(expected), rtol=0.2)
+
 
 def test_simple_profiler_overhead(simple_profiler, n_iter=5):
     """Ensure that the profiler doesn't introduce too much overhead during training."""
@@ -81,6 +111,18 @@ def test_simple_profiler_overhead(simple_profiler, n_iter=5):
 
     durations = np.array(simple_profiler.recorded_durations["no-op"])
     assert all(durations < PROFILER_OVERHEAD_MAX_TOLERANCE)
+    assert simple_profiler.recorded_stats["no-op"].max < PROFILER_OVERHEAD_MAX_TOLERANCE
+
+
+def test_simple_profiler_recent_durations(simple_profiler):
+    """Ensure only the latest durations are kept while the statistics cover all of them."""
+    n_iter = SimpleProfiler.RECENT_DURATIONS + 10
+    for _ in range(n_iter):
+        with simple_profiler.profile("no-op"):
+            pass
+
+    assert len(simple_profiler.recorded_durations["no-op"]) == SimpleProfiler.RECENT_DURATIONS
+    assert simple_profiler.recorded_stats["no-op"].count == n_iter
 
 
 def test_simple_profiler_describe(caplog, simple_profiler):
@@ -90,6 +132,88 @@ def test_simple_profiler_describe(caplog, simple_profiler):
     assert "Profiler Report" in caplog.text
 
 
+def test_running_stats():
+    """Ensure the streaming statistics match the exact ones and can be merged."""
+    values = np.random.lognormal(mean=-4, sigma=1, size=5000)
+    first, second = RunningStats(), RunningStats()
+    for value in values[:3000]:
+        first.add(value)
+    for value in values[3000:]:
+        second.add(value)
+    first.merge(RunningStats.from_state_dict(second.state_dict()))
+
+    assert first.count == len(values)
+    np.testing.assert_allclose([first.mean, first.std, first.total], [values.mean(), values.std(ddof=1), values.sum()])
+    assert (first.min, first.max) == (values.min(), values.max())
+    for q in (0.5, 0.9, 0.99):
+        np.testing.assert_allclose(first.quantile(q), np.quantile(values, q), rtol=0.02)
+
+
+def test_simple_profiler_logs_metrics(tmpdir):
+    """Ensure the durations of the actions are logged periodically during training."""
+    profiler = SimpleProfiler(log_every_n_batches=2)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=4,
+        limit_val_batches=0,
+        profiler=profiler,
+    )
+    with patch.object(trainer.logger_connector, 'log_metrics') as log_metrics:
+        trainer.fit(EvalModelTemplate())
+    profiler_logs = [c[0][0] for c in log_metrics.call_args_list if 'profiler/model_forward/mean' in c[0][0]]
+    assert len(profiler_logs) == 2
+    assert profiler_logs[-1]['profiler/model_forward/p90'] > 0
+
+
+def test_optional_actions(tmpdir):
+    """Ensure the nested actions are only profiled for the profilers which record them."""
+    profiler = SimpleProfiler()
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=2,
+        limit_val_batches=1,
+        profiler=profiler,
+    )
+    trainer.fit(EvalModelTemplate())
+    assert "model_forward" in profiler.recorded_stats
+    assert not {"training_step", "run_evaluation", "save_checkpoint"} & set(profiler.recorded_stats)
+
+    profiler = SimpleProfiler()
+    profiler.OPTIONAL_ACTIONS = ("training_step",)
+    with profiler.profile_optional("training_step"):
+        pass
+    with profiler.profile_optional("run_evaluation"):
+        pass
+    assert set(profiler.recorded_stats) == {"training_step"}
+
+
+def _straggler_worker(rank, store):
+    torch.distributed.init_process_group("gloo", init_method=f"file://{store}", rank=rank, world_size=2)
+    profiler = SimpleProfiler(sync_every_n_batches=2, straggler_threshold=1.5)
+    for _ in range(4):
+        with profiler.profile("get_train_batch"):
+            time.sleep(0.05 if rank == 1 else 0.005)
+        with profiler.profile("model_forward"):
+            time.sleep(0.05 if rank == 0 else 0.005)
+        profiler.on_train_batch_end(None)
+    profiler.on_train_end(None)
+
+    assert [(batch, rank, kind) for batch, rank, kind, *_ in profiler.stragglers] == [
+        (2, 0, "step"), (2, 1, "data"), (4, 0, "step"), (4, 1, "data")
+    ]
+    low, median, high, slowest = profiler.cross_rank_stats["get_train_batch"]
+    assert low < 0.02 < 0.04 < high and slowest == 1
+    assert len(profiler.rank_stats) == 2 and profiler.rank_stats[1]["get_train_batch"].count == 4
+    assert "Slowest rank" in profiler.summary()
+
+
+def test_simple_profiler_stragglers(tmpdir):
+    """Ensure the durations are compared across the ranks and the slow rank is reported."""
+    torch.multiprocessing.spawn(_straggler_worker, args=(os.path.join(tmpdir, "store"),), nprocs=2)
+
+
 def test_simple_profiler_value_errors(simple_profiler):
     """Ensure errors are raised where expected."""
 
@@ -184,3 +308,284 @@ def test_advanced_profiler_value_errors(advanced_profiler):
 
     advanced_profiler.start(action)
     advanced_profiler.stop(action)
+
+
+def test_trace_profiler_events(tmpdir):
+    """Ensure nested actions and actions of other threads are exported as Chrome trace events."""
+    profiler = TraceProfiler()
+    with profiler.profile("outer"):
+        with profiler.profile("inner"):
+            time.sleep(0.01)
+
+        def worker():
+            with profiler.profile("outer"):
+                pass
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    profiler.export(os.path.join(tmpdir, "trace.json"))
+    with open(profiler.trace_path) as f:
+        events = json.load(f)["traceEvents"]
+    complete = {(e["name"], e["tid"]): e for e in events if e["ph"] == "X"}
+    assert len(complete) == 3
+    main_thread = threading.get_ident()
+    outer, inner = complete[("outer", main_thread)], complete[("inner", main_thread)]
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert inner["dur"] >= 10000
+    thread_names = [e["args"]["name"] for e in events if e["name"] == "thread_name"]
+    assert len(thread_names) == 2
+
+
+def test_trace_profiler_ring_buffer_and_window():
+    """Ensure the oldest events are dropped and only the window of steps is recorded."""
+    profiler = TraceProfiler(max_events=3, start_step=1, num_steps=2)
+    for _ in range(4):
+        for _ in range(3):
+            with profiler.profile("action"):
+                pass
+        profiler.on_train_batch_end(None)
+
+    assert profiler.num_events == 6
+    assert [step for *_, step in profiler.events] == [2, 2, 2]
+    assert "dropped the 3 oldest" in profiler.summary()
+
+
+def test_trace_profiler_fit(tmpdir):
+    """Ensure the trace of a training run is saved in the root directory of the trainer."""
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=2,
+        limit_val_batches=0,
+        profiler=TraceProfiler(),
+    )
+    trainer.fit(EvalModelTemplate())
+    with open(os.path.join(tmpdir, "trace.json")) as f:
+        events = json.load(f)["traceEvents"]
+    steps = {e["args"]["step"] for e in events if e["name"] == "model_forward"}
+    assert steps == {0, 1}
+
+
+def test_pytorch_profiler_schedule():
+    """Ensure only the operators of the active steps are recorded, attributed to their action."""
+    profiler = PyTorchProfiler(wait=1, warmup=1, active=1, use_cuda=False)
+    x = torch.rand(4, 4, requires_grad=True)
+    for step in range(4):
+        with profiler.profile("training_step"):
+            loss = (x @ x).sum() * step
+        with profiler.profile("model_backward"):
+            loss.backward()
+        profiler.on_train_batch_end(None)
+
+    assert profiler.function_events is not None
+    ranges = [e for e in profiler.function_events if e.name == "training_step"]
+    assert len(ranges) == 1
+    tables = profiler.operator_tables()
+    assert set(tables) == {"training_step", "backward"}
+    assert "aten::mm" in tables["training_step"]
+    assert "Profile stats for: training_step" in profiler.summary()
+
+
+def test_pytorch_profiler_fit(tmpdir):
+    """Ensure the trace of the active steps is saved at the end of training."""
+    profiler = PyTorchProfiler(wait=0, warmup=1, active=1, use_cuda=False)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=3,
+        limit_val_batches=0,
+        profiler=profiler,
+    )
+    trainer.fit(EvalModelTemplate())
+    assert profiler.trace_path == os.path.join(tmpdir, "autograd_trace.json")
+    with open(profiler.trace_path) as f:
+        trace = json.load(f)
+    # a list of events or a `traceEvents` object depending on the version of PyTorch
+    names = {e["name"] for e in (trace["traceEvents"] if isinstance(trace, dict) else trace)}
+    assert {"training_step", "backward", "optimizer_step", "on_batch_start"} <= names
+
+
+def test_memory_profiler_leak():
+    """Ensure the memory retained by an action is recorded in it and the actions around it."""
+    profiler = MemoryProfiler(tracemalloc_every_n=2)
+    retained = []
+    for _ in range(4):
+        with profiler.profile("outer"):
+            with profiler.profile("leak"):
+                retained.append(bytearray(4 * 1024 ** 2))
+            with profiler.profile("no_leak"):
+                buffer = bytearray(4 * 1024 ** 2)
+                del buffer
+
+    leak, no_leak, outer = (profiler.recorded_stats[a] for a in ("leak", "no_leak", "outer"))
+    assert leak["traced_delta"].count == 2
+    assert leak["traced_delta"].mean >= 4 * 1024 ** 2
+    assert abs(no_leak["traced_delta"].mean) < 1024 ** 2
+    assert no_leak["traced_peak"].max >= 4 * 1024 ** 2
+    assert outer["traced_delta"].mean >= 4 * 1024 ** 2
+    assert not tracemalloc.is_tracing()
+    assert "leak" in profiler.summary()
+
+
+def test_memory_profiler_fit(tmpdir):
+    """Ensure the memory of the actions of a training run is recorded."""
+    profiler = MemoryProfiler()
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=2,
+        limit_val_batches=1,
+        profiler=profiler,
+    )
+    trainer.fit(EvalModelTemplate())
+    for action in ("get_train_batch", "model_forward", "run_evaluation", "save_checkpoint"):
+        assert profiler.recorded_stats[action]["rss_peak"].count > 0
+
+
+def _busy_wait(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_profiler_stacks(tmpdir):
+    """Ensure the samples are attributed to the running actions and saved as folded stacks."""
+    profiler = SamplingProfiler(interval=0.001)
+    with profiler.profile("outer"):
+        _busy_wait(0.1)
+        with profiler.profile("inner"):
+            _busy_wait(0.1)
+    profiler.stop_sampling()
+
+    inner = sum(count for stack, count in profiler.stacks.items() if stack.startswith("[outer];[inner];"))
+    assert inner > 10
+    assert all(stack.startswith("[outer]") for stack in profiler.stacks)
+    assert all("_busy_wait" in stack for stack in profiler.stacks)
+
+    profiler.export(os.path.join(tmpdir, "stacks.folded"))
+    lines = Path(profiler.folded_path).read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.num_samples
+    assert "inner: " in profiler.summary()
+
+
+def test_sampling_profiler_overhead():
+    """Ensure that a sample, which holds the interpreter lock, takes less than 2% of the sampling interval."""
+    profiler = SamplingProfiler(interval=0.01)
+    profiler._start_sampler = lambda: None
+    n_samples = 100
+    with profiler.profile("sample"):
+        start = time.perf_counter()
+        for _ in range(n_samples):
+            profiler.sample()
+        duration = (time.perf_counter() - start) / n_samples
+    assert profiler.num_samples == n_samples
+    assert duration < 0.02 * profiler.interval
+
+
+def test_overhead_profiler_categories():
+    """Ensure the time of a step is attributed to the innermost action."""
+    profiler = OverheadProfiler(log_every_n_batches=2)
+    trainer = Mock()
+    for _ in range(2):
+        with profiler.profile("get_train_batch"):
+            time.sleep(0.01)
+        with profiler.profile("optimizer_step"):
+            with profiler.profile("training_step"):
+                time.sleep(0.02)
+            with profiler.profile("on_after_backward"):
+                time.sleep(0.01)
+        profiler.on_train_batch_end(trainer)
+    profiler.on_train_epoch_end(trainer)
+
+    np.testing.assert_allclose(profiler.totals["user"], 0.04, rtol=0.2)
+    np.testing.assert_allclose(profiler.totals["data"], 0.02, rtol=0.2)
+    np.testing.assert_allclose(profiler.totals["framework"], 0.02, rtol=0.3)
+    np.testing.assert_allclose(profiler.step_overhead.mean, 0.25, rtol=0.3)
+
+    window, epoch = (c[0][0] for c in trainer.logger_connector.log_metrics.call_args_list)
+    assert window.keys() == {f"overhead/{c}_pct" for c in ("user", "data", "evaluation", "framework")}
+    np.testing.assert_allclose(sum(epoch.values()), 100)
+    assert "framework" in profiler.summary()
+
+
+def test_overhead_profiler_fit(tmpdir):
+    """Ensure the framework overhead of a training run is logged every epoch."""
+    profiler = OverheadProfiler(log_every_n_batches=None)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=3,
+        limit_val_batches=1,
+        profiler=profiler,
+    )
+    with patch.object(trainer.logger_connector, 'log_metrics') as log_metrics:
+        trainer.fit(EvalModelTemplate())
+    epoch_logs = [c[0][0] for c in log_metrics.call_args_list if 'overhead/epoch_framework_pct' in c[0][0]]
+    assert len(epoch_logs) == 2
+    assert profiler.step_overhead.count == 6
+    assert profiler.totals["user"] > 0 and profiler.totals["evaluation"] > 0
+
+
+def test_data_pipeline_profiler_input_bound():
+    """Ensure the wait for the data is measured and a sustained input-bound window raises a warning."""
+    profiler = DataPipelineProfiler(window=4, log_every_n_batches=4, warn_threshold=0.5)
+    trainer = Mock()
+    trainer.data_connector.train_iterator = None
+    for wait in (0.001, 0.001, 0.001, 0.001, 0.03, 0.03, 0.03, 0.03, 0.03):
+        with profiler.profile("get_train_batch"):
+            time.sleep(wait)
+        with profiler.profile("transfer_batch_to_device"):
+            pass
+        time.sleep(0.01)
+        profiler.on_train_batch_end(trainer)
+
+    assert profiler.recorded_stats["wait"].count == 9
+    np.testing.assert_allclose(profiler.input_bound_fraction, 0.75, atol=0.1)
+    # warned once for the sustained window
+    assert profiler.input_bound_warnings == 1
+    metrics = trainer.logger_connector.log_metrics.call_args_list[0][0][0]
+    assert metrics["data/input_bound_fraction"] < 0.5
+    assert "Input-bound fraction" in profiler.summary()
+
+
+def test_transfer_of_training_batches_profiled():
+    """Ensure only the transfer of the training batches is profiled, for the profilers recording it."""
+    profiler = DataPipelineProfiler()
+    trainer = Mock(profiler=profiler, amp_backend=None, data_parallel_device_ids=None)
+    backend = GPUBackend(trainer)
+    with patch.object(GPUBackend, 'batch_to_device', side_effect=lambda batch, device: batch) as batch_to_device:
+        backend.validation_step([torch.zeros(1), 0])
+        assert profiler._batch["transfer_batch_to_device"] == 0
+        backend.training_step([torch.zeros(1), 0])
+        assert profiler._batch["transfer_batch_to_device"] > 0
+    assert batch_to_device.call_count == 2
+
+
+def test_prefetched_batches():
+    """Ensure the batches prepared by the workers of a dataloader are counted."""
+    assert _prefetched_batches(iter(torch.utils.data.DataLoader(range(8)))) is None
+    iterator = iter(torch.utils.data.DataLoader(range(8), num_workers=1))
+    next(iterator)
+    time.sleep(1)
+    assert _prefetched_batches(iterator) == 2
+
+
+def test_data_pipeline_profiler_fit(tmpdir):
+    """Ensure the data pipeline of a training run is measured, without evaluation."""
+    profiler = DataPipelineProfiler(log_every_n_batches=2)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=4,
+        limit_val_batches=2,
+        val_check_interval=0.5,
+        profiler=profiler,
+    )
+    with patch.object(trainer.logger_connector, 'log_metrics') as log_metrics:
+        trainer.fit(EvalModelTemplate())
+    data_logs = [c[0][0] for c in log_metrics.call_args_list if 'data/input_bound_fraction' in c[0][0]]
+    assert len(data_logs) == 4
+    assert profiler.recorded_stats["compute"].count == 8
+    assert profiler.recorded_stats["wait"].total > 0
@@ -1,4 +1,5 @@
 import glob
+import itertools
 import math
 import os
 import pickle
@@ -15,7 +16,7 @@ import torch
 from omegaconf import OmegaConf
 
 import tests.base.develop_utils as tutils
-from pytorch_lightning import Callback, LightningModule, Trainer
+from pytorch_lightning import Callback, EvalResult, LightningModule, Trainer
 from pytorch_lightning.callbacks import EarlyStopping, ModelCheckpoint
 from pytorch_lightning.core.saving import (
     load_hparams_from_tags_csv, load_hparams_from_yaml, save_hparams_to_tags_csv)
@@ -542,6 +543,125 @@ def test_resume_from_checkpoint_epoch_restored(monkeypatch, tmpdir, tmpdir_serve
         assert next_model.num_on_load_checkpoint_called == 1
 
 
+@pytest.mark.parametrize('accumulate_grad_batches', [1, 2])
+def test_resume_from_checkpoint_mid_epoch_exact(tmpdir, accumulate_grad_batches):
+    """Verify resuming from a mid-epoch checkpoint skips the seen batches and reproduces the uninterrupted run"""
+
+    class SaveMidEpoch(Callback):
+        def on_train_batch_end(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            if trainer.current_epoch == 1 and batch_idx == 4:
+                trainer.save_checkpoint(os.path.join(tmpdir, 'mid_epoch.ckpt'))
+
+    class RecordBatches(Callback):
+        batch_indices = []
+
+        def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            self.batch_indices.append((trainer.current_epoch, batch_idx))
+
+    trainer_options = dict(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=8,
+        limit_val_batches=0,
+        accumulate_grad_batches=accumulate_grad_batches,
+        checkpoint_callback=False,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+    )
+
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    trainer = Trainer(callbacks=[SaveMidEpoch()], **trainer_options)
+    trainer.fit(model)
+
+    checkpoint_path = os.path.join(tmpdir, 'mid_epoch.ckpt')
+    epoch_state = torch.load(checkpoint_path)['epoch_progress_state']
+    assert epoch_state['epoch'] == 1
+    assert epoch_state['batch_idx'] == 5
+    # the gradients of an incomplete accumulation window are saved
+    assert epoch_state['accumulated_batches'] == 5 % accumulate_grad_batches
+    assert bool(epoch_state['accumulated_grads']) == (accumulate_grad_batches == 2)
+
+    # the random states are restored from the checkpoint
+    torch.manual_seed(123)
+    resumed_model = EvalModelTemplate()
+    recorder = RecordBatches()
+    resumed_trainer = Trainer(resume_from_checkpoint=checkpoint_path, callbacks=[recorder], **trainer_options)
+    resumed_trainer.fit(resumed_model)
+
+    assert recorder.batch_indices == [(1, i) for i in range(5, 8)]
+    assert resumed_trainer.global_step == trainer.global_step
+    for name, param in model.state_dict().items():
+        assert torch.equal(param, resumed_model.state_dict()[name]), name
+
+
+@patch('pytorch_lightning.trainer.training_loop.time')
+def test_trainer_max_time(time_mock, tmpdir):
+    """Verify training stops before the time budget runs out, with a checkpoint resuming inside the epoch"""
+    # every reading of the training loop clock advances it by one second, so every batch takes one second
+    time_mock.monotonic.side_effect = itertools.count()
+
+    class RecordBatches(Callback):
+        batch_indices = []
+
+        def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, dataloader_idx):
+            self.batch_indices.append((trainer.current_epoch, batch_idx))
+
+    trainer_options = dict(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=10,
+        limit_val_batches=0,
+        logger=False,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+    )
+
+    model = EvalModelTemplate()
+    checkpoint_callback = ModelCheckpoint(filepath=tmpdir, save_last=True)
+    trainer = Trainer(max_time=5, min_epochs=2, checkpoint_callback=checkpoint_callback, **trainer_options)
+    trainer.fit(model)
+
+    # the third batch ends after 4 seconds, the next one might end after the budget of 5 seconds
+    assert trainer.global_step == 3
+    assert trainer.current_epoch == 0
+    epoch_state = torch.load(checkpoint_callback.last_model_path)['epoch_progress_state']
+    assert epoch_state['batch_idx'] == 3
+    assert epoch_state['global_step'] == 3
+
+    recorder = RecordBatches()
+    resumed_trainer = Trainer(
+        resume_from_checkpoint=checkpoint_callback.last_model_path, callbacks=[recorder], **trainer_options
+    )
+    resumed_trainer.fit(EvalModelTemplate())
+    assert recorder.batch_indices[0] == (0, 3)
+    assert resumed_trainer.global_step == 20
+
+
+@patch('pytorch_lightning.trainer.training_loop.time')
+def test_trainer_max_time_without_save_last(time_mock, tmpdir):
+    """Verify the time budget does not save a `last` checkpoint the checkpoint callback was not asked for"""
+    time_mock.monotonic.side_effect = itertools.count()
+    checkpoint_callback = ModelCheckpoint(filepath=tmpdir)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        max_time=5,
+        limit_train_batches=10,
+        limit_val_batches=0,
+        checkpoint_callback=checkpoint_callback,
+        logger=False,
+    )
+    with patch.object(checkpoint_callback, '_save_model', wraps=checkpoint_callback._save_model) as save_mock:
+        trainer.fit(EvalModelTemplate())
+
+    assert trainer.global_step == 3
+    assert not os.path.exists(os.path.join(tmpdir, 'last.ckpt'))
+    assert all(not call[0][0].endswith('last.ckpt') for call in save_mock.call_args_list)
+    assert checkpoint_callback.best_model_path != os.path.join(tmpdir, 'last.ckpt')
+
+
 def _init_steps_model():
     """private method for initializing a model with 5% train epochs"""
     model = EvalModelTemplate()
@@ -691,6 +811,101 @@ def test_test_checkpoint_path(tmpdir, ckpt_path, save_top_k):
             assert trainer.tested_ckpt_path == ckpt_path
 
 
+@pytest.mark.parametrize('ckpt_processes', [0, 2])
+def test_test_many_checkpoints(tmpdir, ckpt_processes):
+    """Test that many checkpoints are evaluated on the test batches, which are only loaded once."""
+    class BatchCounter(Callback):
+        num_batches = 0
+
+        def on_test_batch_end(self, *args):
+            self.num_batches += 1
+
+    model = EvalModelTemplate()
+    counter = BatchCounter()
+    trainer = Trainer(
+        max_epochs=3,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        limit_test_batches=3,
+        progress_bar_refresh_rate=0,
+        default_root_dir=tmpdir,
+        checkpoint_callback=ModelCheckpoint(monitor='early_stop_on', save_top_k=2),
+        callbacks=[counter],
+    )
+    trainer.fit(model)
+    weights = model.c_d1.weight.clone()
+
+    with patch.object(model, 'load_state_dict', wraps=model.load_state_dict) as load_state_dict:
+        results = trainer.test(ckpt_path='top_k', ckpt_processes=ckpt_processes)
+    best_k_models = trainer.checkpoint_callback.best_k_models
+    assert list(results) == sorted(best_k_models, key=best_k_models.get)
+    assert trainer.tested_ckpt_path == list(results)
+    assert counter.num_batches == 3
+    # the weights of each checkpoint are loaded once, not for every batch
+    assert load_state_dict.call_count == 2
+    # the weights of the model are restored
+    assert torch.equal(model.c_d1.weight, weights)
+
+    for ckpt_path, ckpt_results in results.items():
+        expected = trainer.test(ckpt_path=ckpt_path)
+        assert ckpt_results[0]['test_acc'] == pytest.approx(expected[0]['test_acc'])
+        assert ckpt_results[0]['test_loss'] == pytest.approx(expected[0]['test_loss'])
+
+
+def test_test_many_checkpoints_without_fork(tmpdir):
+    """Test that the checkpoints are evaluated one after the other where processes can not be forked."""
+    model = EvalModelTemplate()
+    trainer = Trainer(
+        max_epochs=2,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        limit_test_batches=3,
+        progress_bar_refresh_rate=0,
+        default_root_dir=tmpdir,
+        checkpoint_callback=ModelCheckpoint(monitor='early_stop_on', save_top_k=2),
+    )
+    trainer.fit(model)
+
+    with patch('pytorch_lightning.trainer.evaluation_loop._FORK_AVAILABLE', False), \
+            patch('pytorch_lightning.trainer.evaluation_loop._CheckpointWorkers') as workers_mock, \
+            pytest.warns(UserWarning, match='evaluated one after the other'):
+        results = trainer.test(ckpt_path='top_k', ckpt_processes=2)
+    workers_mock.assert_not_called()
+    assert len(results) == 2
+
+
+def test_test_many_checkpoints_step_metrics(tmpdir):
+    """Test that the step metrics of each checkpoint are logged under the keys of the checkpoint."""
+    class StepMetricsModel(EvalModelTemplate):
+
+        def test_step(self, batch, batch_idx, *args, **kwargs):
+            x, y = batch
+            result = EvalResult()
+            result.log('test_step_loss', self.loss(y, self(x.view(x.size(0), -1))), on_step=True, on_epoch=False)
+            return result
+
+    model = StepMetricsModel()
+    model.test_step_end = None
+    model.test_epoch_end = None
+    trainer = Trainer(
+        max_epochs=2,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        limit_test_batches=3,
+        progress_bar_refresh_rate=0,
+        default_root_dir=tmpdir,
+        checkpoint_callback=ModelCheckpoint(monitor='early_stop_on', save_top_k=2),
+    )
+    trainer.fit(model)
+
+    with patch.object(trainer.logger, 'agg_and_log_metrics') as log_metrics:
+        trainer.test(ckpt_path='top_k')
+    logged = [key for call in log_metrics.call_args_list for key in call[0][0] if 'test_step_loss' in key]
+    for ckpt_idx in range(2):
+        assert logged.count(f'test_step_loss/epoch_{trainer.current_epoch}/ckpt_{ckpt_idx}') == 3
+    assert len(logged) == 6
+
+
 def test_disabled_validation(tmpdir):
     """Verify that `limit_val_batches=0` disables the validation loop unless `fast_dev_run=True`."""
 
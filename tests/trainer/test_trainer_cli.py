@@ -117,6 +117,7 @@ def test_add_argparse_args_redefined_error(cli_args, monkeypatch):
             # They should not be changed by the argparse interface.
             "min_steps": None,
             "max_steps": None,
+            "max_time": None,
             "log_gpu_memory": None,
             "distributed_backend": None,
             "weights_save_path": None,
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+import torch
+from torch import nn
+
+from pytorch_lightning.utilities.checkpoint_averaging import (
+    AVERAGED_CHECKPOINTS_KEY,
+    StateDictAverage,
+    average_checkpoints,
+    update_bn,
+)
+
+
+def test_average_checkpoints(tmpdir):
+    """Test that floating point tensors are averaged in their dtype and integer buffers kept from the last."""
+    paths, state_dicts = [], []
+    for i in range(3):
+        model = nn.Sequential(nn.Linear(4, 4), nn.BatchNorm1d(4))
+        model[1].num_batches_tracked.fill_(i)
+        state_dict = model.state_dict()
+        state_dict['half'] = torch.full((2,), float(i), dtype=torch.float16)
+        state_dicts.append(state_dict)
+        paths.append(os.path.join(tmpdir, f'{i}.ckpt'))
+        torch.save({'epoch': i, 'state_dict': state_dict, 'optimizer_states': [{}]}, paths[-1])
+
+    averaged = average_checkpoints(paths, weights=[1., 1., 2.])
+    assert averaged['epoch'] == 2
+    assert 'optimizer_states' not in averaged
+    assert averaged[AVERAGED_CHECKPOINTS_KEY] == paths
+    state_dict = averaged['state_dict']
+    assert state_dict._metadata == state_dicts[0]._metadata
+    for key in ('0.weight', '0.bias', '1.running_mean'):
+        expected = (state_dicts[0][key] + state_dicts[1][key] + 2 * state_dicts[2][key]) / 4
+        assert torch.allclose(state_dict[key], expected, atol=1e-6)
+    assert state_dict['half'].dtype == torch.float16
+    assert torch.equal(state_dict['half'], torch.full((2,), 1.25, dtype=torch.float16))
+    assert state_dict['1.num_batches_tracked'] == 2
+
+    with pytest.raises(ValueError, match='different keys'):
+        average = StateDictAverage()
+        average.update(state_dicts[0])
+        average.update({'0.weight': state_dicts[0]['0.weight']})
+
+
+def test_update_bn():
+    """Test that the batch normalization statistics are recomputed over all batches."""
+    model = nn.Sequential(nn.BatchNorm1d(3))
+    model.eval()
+    data = torch.randn(8, 3) * 2 + 1
+    batches = [(data[:4], None), (data[4:], None)]
+
+    update_bn(model, batches)
+    assert not model.training
+    assert model[0].momentum == 0.1
+    assert model[0].num_batches_tracked == 2
+    assert torch.allclose(model[0].running_mean, data.mean(0), atol=1e-6)
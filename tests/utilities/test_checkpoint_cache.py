@@ -0,0 +1,146 @@
+import functools
+import os
+import tempfile
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from unittest import mock
+
+import fsspec
+import pytest
+import torch
+
+from pytorch_lightning.utilities.checkpoint_cache import CheckpointCache, _file_lock, fcntl, get_checkpoint_cache
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(tmpdir):
+    """Serves the files of ``tmpdir/remote`` over HTTP, recording the downloads."""
+    remote_dir = tmpdir.mkdir('remote')
+    RecordingHandler.requests = []
+    handler = functools.partial(RecordingHandler, directory=str(remote_dir))
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield remote_dir, f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_checkpoint_cache_http(tmpdir, http_server, monkeypatch):
+    """Test that remote checkpoints are downloaded once, again when they change and evicted by size."""
+    remote_dir, base_url = http_server
+    cache_dir = os.path.join(tmpdir, 'cache')
+    monkeypatch.setenv('PL_CHECKPOINT_CACHE_DIR', cache_dir)
+
+    torch.save({'state_dict': {'weight': torch.ones(100)}}, str(remote_dir / 'a.ckpt'))
+    torch.save({'state_dict': {'weight': torch.zeros(100)}}, str(remote_dir / 'b.ckpt'))
+    for _ in range(2):
+        checkpoint = pl_load(f'{base_url}/a.ckpt')
+        assert torch.equal(checkpoint['state_dict']['weight'], torch.ones(100))
+    assert RecordingHandler.requests == ['/a.ckpt']
+
+    # a new version of the file has a new size or modification time
+    torch.save({'state_dict': {'weight': torch.full((200,), 2.)}}, str(remote_dir / 'a.ckpt'))
+    os.utime(str(remote_dir / 'a.ckpt'), (0, 0))
+    checkpoint = pl_load(f'{base_url}/a.ckpt')
+    assert torch.equal(checkpoint['state_dict']['weight'], torch.full((200,), 2.))
+    assert RecordingHandler.requests == ['/a.ckpt'] * 2
+
+    # only the most recently used checkpoint fits, both versions of `a.ckpt` are evicted when fetching `b.ckpt`
+    cache = CheckpointCache(cache_dir, max_size=os.path.getsize(str(remote_dir / 'a.ckpt')))
+    path_b = cache.fetch(f'{base_url}/b.ckpt')
+    path_a = cache.fetch(f'{base_url}/a.ckpt')
+    assert RecordingHandler.requests == ['/a.ckpt', '/a.ckpt', '/b.ckpt', '/a.ckpt']
+    # the lock files are deleted with their entries
+    cached_files = [name for name in os.listdir(cache_dir) if not name.startswith('.')]
+    assert sorted(cached_files) == [os.path.basename(path_a), f'{os.path.basename(path_a)}.lock']
+    assert not os.path.exists(path_b)
+
+    # the cache can be disabled
+    monkeypatch.setenv('PL_CHECKPOINT_CACHE_SIZE', '0')
+    pl_load(f'{base_url}/a.ckpt')
+    assert RecordingHandler.requests == ['/a.ckpt', '/a.ckpt', '/b.ckpt', '/a.ckpt', '/a.ckpt']
+
+    # it is not used without a cache directory
+    monkeypatch.delenv('PL_CHECKPOINT_CACHE_SIZE')
+    monkeypatch.delenv('PL_CHECKPOINT_CACHE_DIR')
+    assert get_checkpoint_cache() is None
+
+
+def test_checkpoint_cache_head_rejected(tmpdir, http_server, monkeypatch):
+    """Test that checkpoints are downloaded without the cache when their version can not be requested."""
+    remote_dir, base_url = http_server
+    monkeypatch.setenv('PL_CHECKPOINT_CACHE_DIR', str(tmpdir.join('cache')))
+
+    def do_HEAD(self):
+        self.send_error(405)
+
+    monkeypatch.setattr(RecordingHandler, 'do_HEAD', do_HEAD)
+    torch.save({'state_dict': {'weight': torch.ones(10)}}, str(remote_dir / 'model.ckpt'))
+    # streamed to a temporary file rather than buffered in memory
+    with mock.patch('pytorch_lightning.utilities.cloud_io.tempfile.TemporaryFile', wraps=tempfile.TemporaryFile) \
+            as temporary_file_mock:
+        for _ in range(2):
+            checkpoint = pl_load(f'{base_url}/model.ckpt')
+            assert torch.equal(checkpoint['state_dict']['weight'], torch.ones(10))
+    assert temporary_file_mock.call_count == 2
+    assert RecordingHandler.requests == ['/model.ckpt'] * 2
+    assert not tmpdir.join('cache').exists() or not os.listdir(str(tmpdir.join('cache')))
+
+
+def test_checkpoint_cache_fsspec(tmpdir, monkeypatch):
+    """Test that checkpoints of other fsspec protocols are cached too."""
+    monkeypatch.setenv('PL_CHECKPOINT_CACHE_DIR', str(tmpdir))
+    url = 'memory://checkpoints/model.ckpt'
+    with fsspec.open(url, 'wb') as f:
+        torch.save({'state_dict': {'weight': torch.ones(10)}}, f)
+
+    checkpoint = pl_load(url)
+    assert torch.equal(checkpoint['state_dict']['weight'], torch.ones(10))
+    cached_files = [name for name in os.listdir(tmpdir) if name.endswith('.ckpt')]
+    assert len(cached_files) == 1
+    fsspec.filesystem('memory').rm(url)
+
+
+@pytest.mark.skipif(fcntl is None, reason="entries are only locked with fcntl")
+def test_checkpoint_cache_evict_locked(tmpdir):
+    """Test that the eviction skips the entries locked by other processes and deletes the others with their lock."""
+    cache = CheckpointCache(str(tmpdir), max_size=0)
+    paths = [os.path.join(tmpdir, f'{name}.ckpt') for name in ('a', 'b')]
+    for path in paths:
+        torch.save({}, path)
+        open(f'{path}.lock', 'a').close()
+
+    with _file_lock(f'{paths[0]}.lock') as locked:
+        assert locked
+        cache.evict()
+    assert sorted(name for name in os.listdir(tmpdir) if not name.startswith('.')) == ['a.ckpt', 'a.ckpt.lock']
+
+    # a process waiting for the lock of an evicted entry takes it again on a new lock file
+    lock_path = f'{paths[0]}.lock'
+    waiter_locks = []
+
+    def wait_for_lock():
+        with _file_lock(lock_path):
+            with _file_lock(lock_path, blocking=False) as locked:
+                waiter_locks.append((os.path.exists(lock_path), locked))
+
+    with _file_lock(lock_path):
+        waiter = threading.Thread(target=wait_for_lock)
+        waiter.start()
+        waiter.join(timeout=0.5)
+        os.remove(lock_path)
+    waiter.join()
+    assert waiter_locks == [(True, False)]
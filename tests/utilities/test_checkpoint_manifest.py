@@ -0,0 +1,118 @@
+import json
+import os
+from unittest import mock
+
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Trainer
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities.checkpoint_manifest import CHECKPOINT_MANIFEST_NAME, CheckpointManifest
+from pytorch_lightning.utilities.cloud_io import get_filesystem
+from tests.base import EvalModelTemplate
+
+
+def test_checkpoint_manifest(tmpdir):
+    """Test that entries are persisted and the best and latest checkpoints are looked up from them."""
+    assert not CheckpointManifest.exists(tmpdir)
+    manifest = CheckpointManifest(tmpdir)
+    for epoch, score in enumerate([0.5, 0.2, 0.3]):
+        filepath = os.path.join(tmpdir, f'epoch={epoch}.ckpt')
+        torch.save({'epoch': epoch}, filepath)
+        manifest.add(filepath, step=10 * epoch, epoch=epoch, score=score, monitor='val_loss', kind='top_k')
+    manifest.add(os.path.join(tmpdir, 'hpc_ckpt_1.ckpt'), step=25, epoch=2, kind='hpc')
+
+    manifest = CheckpointManifest(tmpdir)
+    assert CheckpointManifest.exists(tmpdir)
+    assert manifest.best('val_loss', mode='min') == os.path.join(tmpdir, 'epoch=1.ckpt')
+    assert manifest.best('val_loss', mode='max') == os.path.join(tmpdir, 'epoch=0.ckpt')
+    assert manifest.best('val_acc') is None
+    assert manifest.latest() == os.path.join(tmpdir, 'hpc_ckpt_1.ckpt')
+    assert manifest.latest(kind='top_k') == os.path.join(tmpdir, 'epoch=2.ckpt')
+    assert manifest.entries['epoch=2.ckpt']['size'] == os.path.getsize(os.path.join(tmpdir, 'epoch=2.ckpt'))
+
+    manifest.remove(os.path.join(tmpdir, 'epoch=1.ckpt'))
+    with open(os.path.join(tmpdir, CHECKPOINT_MANIFEST_NAME)) as f:
+        assert list(json.load(f)['checkpoints']) == ['epoch=0.ckpt', 'epoch=2.ckpt', 'hpc_ckpt_1.ckpt']
+    # only the manifest is written, no temporary file is left behind
+    assert sorted(os.listdir(tmpdir)) == [CHECKPOINT_MANIFEST_NAME, 'epoch=0.ckpt', 'epoch=1.ckpt', 'epoch=2.ckpt']
+
+
+def test_checkpoint_manifest_top_k(tmpdir):
+    """Test that the manifest follows the top k checkpoints and restores them for a new trainer."""
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    checkpoint_callback = ModelCheckpoint(tmpdir, monitor='early_stop_on', save_top_k=2, manifest=True)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        checkpoint_callback=checkpoint_callback,
+        max_epochs=4,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        logger=False,
+        weights_summary=None,
+    )
+    trainer.fit(model)
+
+    manifest = CheckpointManifest(tmpdir)
+    checkpoints = sorted(f for f in os.listdir(tmpdir) if f.endswith('.ckpt'))
+    assert sorted(manifest.entries) == checkpoints
+    assert set(manifest.paths(kind='top_k')) == set(checkpoint_callback.best_k_models)
+    assert manifest.best('early_stop_on', mode='min') == checkpoint_callback.best_model_path
+
+    new_callback = ModelCheckpoint(tmpdir, monitor='early_stop_on', save_top_k=2, manifest=True)
+    new_callback.load_top_k_from_manifest()
+    assert set(new_callback.best_k_models) == set(checkpoint_callback.best_k_models)
+    assert new_callback.best_model_path == checkpoint_callback.best_model_path
+    assert new_callback.kth_best_model_path == checkpoint_callback.kth_best_model_path
+
+    # `test` of a new trainer finds the best checkpoint without training
+    new_callback = ModelCheckpoint(tmpdir, monitor='early_stop_on', save_top_k=2, manifest=True)
+    new_trainer = Trainer(default_root_dir=tmpdir, checkpoint_callback=new_callback, logger=False)
+    new_trainer.model = EvalModelTemplate()
+    new_trainer.test(ckpt_path='best')
+    assert new_trainer.tested_ckpt_path == checkpoint_callback.best_model_path
+
+
+def test_checkpoint_manifest_opt_in(tmpdir):
+    """Test that ModelCheckpoint only writes a manifest when asked to."""
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        checkpoint_callback=ModelCheckpoint(tmpdir),
+        max_epochs=1,
+        limit_train_batches=2,
+        limit_val_batches=2,
+        logger=False,
+    )
+    trainer.fit(EvalModelTemplate())
+    assert os.listdir(tmpdir) == ['epoch=0.ckpt']
+
+
+def test_checkpoint_manifest_hpc_lookup(tmpdir):
+    """Test that the latest HPC checkpoint is looked up in the manifest, listing the folder only as a fallback."""
+    trainer = Trainer(default_root_dir=tmpdir, weights_save_path=tmpdir, logger=False)
+    connector = trainer.checkpoint_connector
+    manifest = CheckpointManifest(tmpdir)
+    for number in (1, 2):
+        filepath = os.path.join(tmpdir, f'hpc_ckpt_{number}.ckpt')
+        torch.save({}, filepath)
+        manifest.add(filepath, step=number, epoch=0, kind='hpc')
+
+    fs = get_filesystem(str(tmpdir))
+    with mock.patch.object(fs, 'ls', wraps=fs.ls) as ls_mock:
+        assert connector.max_ckpt_in_folder(tmpdir) == 2
+        assert connector.hpc_checkpoint_path(tmpdir) == os.path.join(tmpdir, 'hpc_ckpt_3.ckpt')
+    ls_mock.assert_not_called()
+
+    # the checkpoint recorded last is missing, the folder is listed
+    os.remove(os.path.join(tmpdir, 'hpc_ckpt_2.ckpt'))
+    manifest_mtime = os.path.getmtime(os.path.join(tmpdir, CHECKPOINT_MANIFEST_NAME))
+    with mock.patch.object(fs, 'ls', wraps=fs.ls) as ls_mock:
+        assert connector.max_ckpt_in_folder(tmpdir) == 1
+    ls_mock.assert_called_once()
+
+    # no checkpoint left, nothing is restored and the manifest is not written
+    os.remove(os.path.join(tmpdir, 'hpc_ckpt_1.ckpt'))
+    assert not connector.restore_hpc_weights_if_needed(EvalModelTemplate())
+    assert os.path.getmtime(os.path.join(tmpdir, CHECKPOINT_MANIFEST_NAME)) == manifest_mtime
+    assert len(CheckpointManifest(tmpdir).paths(kind='hpc')) == 2
@@ -0,0 +1,52 @@
+import os
+
+import fsspec
+import pytest
+import torch
+
+from pytorch_lightning.utilities.cloud_io import atomic_save, get_filesystem, load as pl_load
+
+
+def test_atomic_save_local(tmpdir):
+    """Test that the checkpoint is streamed into place without leaving temporary files behind."""
+    checkpoint = {'state_dict': {'weight': torch.rand(10, 10)}, 'epoch': 3}
+    filepath = os.path.join(tmpdir, 'model.ckpt')
+
+    atomic_save(checkpoint, filepath)
+
+    assert os.listdir(tmpdir) == ['model.ckpt']
+    loaded = pl_load(filepath)
+    assert loaded['epoch'] == 3
+    assert torch.equal(loaded['state_dict']['weight'], checkpoint['state_dict']['weight'])
+
+
+def test_atomic_save_keeps_previous_file_on_failure(tmpdir):
+    """Test that a failing save neither corrupts an existing checkpoint nor leaves partial files."""
+    filepath = os.path.join(tmpdir, 'model.ckpt')
+    atomic_save({'epoch': 1}, filepath)
+
+    with pytest.raises(AttributeError):
+        # local objects are not picklable
+        atomic_save({'epoch': 2, 'fn': lambda: None}, filepath)
+
+    assert os.listdir(tmpdir) == ['model.ckpt']
+    assert pl_load(filepath)['epoch'] == 1
+
+
+def test_atomic_save_remote():
+    """Test saving through a non-local fsspec filesystem."""
+    filepath = 'memory://checkpoints/model.ckpt'
+    atomic_save({'epoch': 5}, filepath)
+
+    fs = fsspec.filesystem('memory')
+    assert [os.path.basename(p) for p in fs.ls('/checkpoints', detail=False)] == ['model.ckpt']
+    with fs.open(filepath, 'rb') as f:
+        assert torch.load(f)['epoch'] == 5
+    fs.rm('/checkpoints', recursive=True)
+
+
+def test_get_filesystem_shared():
+    """Test that filesystem instances are shared by protocol."""
+    assert get_filesystem('/some/path') is get_filesystem('other/path')
+    assert get_filesystem('memory://a') is get_filesystem('memory://b')
+    assert get_filesystem('memory://a') is not get_filesystem('/some/path')
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Trainer
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+from pytorch_lightning.utilities.compressed_checkpoint import compress_checkpoint, decompress_checkpoint
+from pytorch_lightning.utilities.exceptions import MisconfigurationException
+from tests.base import EvalModelTemplate
+
+
+@pytest.mark.parametrize('codec', ['zlib', 'lzma'])
+def test_compressed_checkpoint_round_trip(codec):
+    """Test that all tensor types survive compression in several chunks."""
+    state_dict = {
+        'fp32': torch.rand(100, 100),
+        'fp16': torch.rand(100, 100).half(),
+        'bf16': torch.rand(10).bfloat16(),
+        'int': torch.arange(10),
+        'bool': torch.tensor([True, False]),
+        'scalar': torch.tensor(3.),
+        'empty': torch.empty(0),
+    }
+    checkpoint = {'epoch': 1, 'state_dict': state_dict, 'optimizer_states': [{'state': {0: {'step': 2}}}]}
+
+    compressed = compress_checkpoint(checkpoint, codec, chunk_size=1000, num_workers=2)
+    restored = decompress_checkpoint(compressed)
+
+    assert restored['epoch'] == 1
+    assert restored['optimizer_states'] == checkpoint['optimizer_states']
+    for name, tensor in state_dict.items():
+        assert restored['state_dict'][name].dtype == tensor.dtype
+        assert torch.equal(restored['state_dict'][name], tensor)
+
+
+def test_compressed_checkpoint_unknown_codec():
+    with pytest.raises(ValueError, match='Unknown compression codec'):
+        compress_checkpoint({'state_dict': {}}, 'gzip')
+    with pytest.raises(MisconfigurationException, match='is not supported'):
+        ModelCheckpoint(compression='gzip')
+
+
+def test_compressed_checkpoint_trainer(tmpdir):
+    """Test that compressed checkpoints are transparent to loading and resuming."""
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    checkpoint_callback = ModelCheckpoint(filepath=tmpdir, monitor='early_stop_on', compression='zlib')
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        checkpoint_callback=checkpoint_callback,
+    )
+    trainer.fit(model)
+
+    best_path = checkpoint_callback.best_model_path
+    assert 'compressed_checkpoint' in torch.load(best_path)
+    loaded_model = EvalModelTemplate.load_from_checkpoint(best_path)
+    checkpoint = pl_load(best_path)
+    for name, tensor in loaded_model.state_dict().items():
+        assert torch.equal(tensor, checkpoint['state_dict'][name])
+
+    manual_path = os.path.join(tmpdir, 'manual.ckpt')
+    trainer.save_checkpoint(manual_path, compression='lzma')
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=3,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        resume_from_checkpoint=manual_path,
+        checkpoint_callback=False,
+    )
+    trainer.fit(EvalModelTemplate())
+    assert trainer.current_epoch == 2
@@ -0,0 +1,103 @@
+import os
+
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Trainer
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+from pytorch_lightning.utilities.delta_checkpoint import (
+    DELTA_CHECKPOINT_BLOB_DIR,
+    DELTA_CHECKPOINT_REFS,
+    DeltaCheckpointStore,
+)
+from tests.base import EvalModelTemplate
+
+
+def _blobs(tmpdir):
+    blob_dir = os.path.join(tmpdir, DELTA_CHECKPOINT_BLOB_DIR)
+    return sorted(f for f in os.listdir(blob_dir) if f != DELTA_CHECKPOINT_REFS)
+
+
+def test_delta_checkpoint_store(tmpdir):
+    """Test that unchanged tensors are written once and blobs are kept while referenced."""
+    backbone, head = torch.nn.Linear(16, 16), torch.nn.Linear(16, 2)
+    model = torch.nn.Sequential(backbone, head)
+    store = DeltaCheckpointStore(tmpdir)
+
+    store.save({'epoch': 1, 'state_dict': model.state_dict()}, os.path.join(tmpdir, 'epoch=1.ckpt'))
+    assert len(_blobs(tmpdir)) == 4
+
+    with torch.no_grad():
+        head.weight.add_(1)
+    store.save({'epoch': 2, 'state_dict': model.state_dict()}, os.path.join(tmpdir, 'epoch=2.ckpt'))
+    # only the modified head weight was written
+    assert len(_blobs(tmpdir)) == 5
+
+    store.remove(os.path.join(tmpdir, 'epoch=1.ckpt'))
+    assert len(_blobs(tmpdir)) == 4
+    checkpoint = pl_load(os.path.join(tmpdir, 'epoch=2.ckpt'))
+    assert checkpoint['epoch'] == 2
+    for name, tensor in model.state_dict().items():
+        assert torch.equal(checkpoint['state_dict'][name], tensor)
+
+    # a new store for the same directory picks up the references
+    store = DeltaCheckpointStore(tmpdir)
+    store.remove(os.path.join(tmpdir, 'epoch=2.ckpt'))
+    assert _blobs(tmpdir) == []
+
+
+def test_delta_checkpoint_equal_tensors_do_not_alias(tmpdir):
+    """Test that tensors with the same content are restored as separate tensors."""
+    filepath = os.path.join(tmpdir, 'model.ckpt')
+    DeltaCheckpointStore(tmpdir).save({'state_dict': {'a': torch.zeros(3), 'b': torch.zeros(3)}}, filepath)
+    assert len(_blobs(tmpdir)) == 1
+
+    state_dict = pl_load(filepath)['state_dict']
+    state_dict['a'].add_(1)
+    assert torch.equal(state_dict['b'], torch.zeros(3))
+
+
+def test_delta_checkpoint_top_k(tmpdir):
+    """Test that top-k deletion of delta checkpoints keeps the remaining ones loadable."""
+    tutils.reset_seed()
+
+    class FrozenBackboneModel(EvalModelTemplate):
+        def on_fit_start(self):
+            self.c_d1.requires_grad_(False)
+
+    model = FrozenBackboneModel()
+    checkpoint_callback = ModelCheckpoint(
+        filepath=tmpdir, monitor='early_stop_on', save_top_k=2, save_last=True, delta_checkpoints=True
+    )
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=4,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        checkpoint_callback=checkpoint_callback,
+    )
+    trainer.fit(model)
+
+    ckpt_files = sorted(f for f in os.listdir(tmpdir) if f.endswith('.ckpt'))
+    assert len(ckpt_files) == 3
+    backbone_digests, referenced = set(), set()
+    for ckpt_file in ckpt_files:
+        checkpoint = pl_load(os.path.join(tmpdir, ckpt_file))
+        assert torch.equal(checkpoint['state_dict']['c_d1.weight'], model.c_d1.weight)
+        digests = torch.load(os.path.join(tmpdir, ckpt_file))['delta_checkpoint']['tensors']
+        backbone_digests.add(digests['state_dict/c_d1.weight'])
+        referenced.update(digests.values())
+    # the frozen weights are stored once and blobs of deleted checkpoints are gone
+    assert len(backbone_digests) == 1
+    assert _blobs(tmpdir) == sorted(f'{digest}.ckpt' for digest in referenced)
+
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=5,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        resume_from_checkpoint=checkpoint_callback.best_model_path,
+        checkpoint_callback=False,
+    )
+    trainer.fit(FrozenBackboneModel())
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+import torch
+from torch import nn
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Trainer
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+from pytorch_lightning.utilities.exceptions import MisconfigurationException
+from pytorch_lightning.utilities.reduced_precision_checkpoint import (
+    EXPORT_METADATA_KEY,
+    export_checkpoint,
+    upcast_checkpoint,
+)
+from tests.base import EvalModelTemplate
+
+
+class BufferModel(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.layer = nn.Linear(4, 4)
+        self.bn = nn.BatchNorm1d(4)
+        self.register_buffer('cache', torch.ones(4))
+
+
+def test_export_checkpoint_dtype_policy():
+    """Test that floating tensors are cast following the policy and restored on load."""
+    model = BufferModel()
+    checkpoint = {'epoch': 1, 'state_dict': model.state_dict(), 'optimizer_states': [{}]}
+    # e.g. a buffer of a custom `state_dict`
+    model.bn._non_persistent_buffers_set.add('running_var')
+
+    exported = export_checkpoint(checkpoint, 'bf16', dtype_policy={'bn.*': None, 'cache': 'float16'}, model=model)
+    state_dict = exported['state_dict']
+    assert 'optimizer_states' not in exported
+    assert state_dict['layer.weight'].dtype == torch.bfloat16
+    assert state_dict['cache'].dtype == torch.float16
+    assert state_dict['bn.weight'].dtype == torch.float32
+    assert state_dict['bn.num_batches_tracked'].dtype == torch.int64
+    assert 'bn.running_var' not in state_dict
+    assert exported[EXPORT_METADATA_KEY]['stripped_buffers'] == ['bn.running_var']
+    # the metadata of the state dict is needed by `load_state_dict`
+    assert state_dict._metadata == checkpoint['state_dict']._metadata
+
+    restored = upcast_checkpoint(exported)
+    assert EXPORT_METADATA_KEY not in restored
+    for key, tensor in restored['state_dict'].items():
+        assert tensor.dtype == checkpoint['state_dict'][key].dtype
+    assert torch.allclose(restored['state_dict']['layer.weight'], model.layer.weight, rtol=1e-2, atol=1e-2)
+
+    with pytest.raises(ValueError, match='Unknown export dtype'):
+        export_checkpoint(checkpoint, 'int8')
+    with pytest.raises(MisconfigurationException, match='is not supported'):
+        ModelCheckpoint(export_dtype='int8')
+
+
+def test_export_checkpoint_trainer(tmpdir):
+    """Test that exported checkpoints are half the size and transparently loaded in full precision."""
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    checkpoint_callback = ModelCheckpoint(filepath=tmpdir, monitor='early_stop_on', export_dtype='float16')
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=1,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        checkpoint_callback=checkpoint_callback,
+    )
+    trainer.fit(model)
+
+    best_path = checkpoint_callback.best_model_path
+    assert torch.load(best_path)['state_dict']['c_d1.weight'].dtype == torch.float16
+    full_path = os.path.join(tmpdir, 'full.ckpt')
+    trainer.save_checkpoint(full_path, weights_only=True)
+    assert os.path.getsize(best_path) < 0.6 * os.path.getsize(full_path)
+
+    loaded_model = EvalModelTemplate.load_from_checkpoint(best_path)
+    for name, tensor in loaded_model.state_dict().items():
+        assert tensor.dtype == model.state_dict()[name].dtype
+        assert torch.allclose(tensor, model.state_dict()[name], rtol=1e-3, atol=1e-3)
+    assert pl_load(best_path)['state_dict']['c_d1.weight'].dtype == torch.float32
@@ -0,0 +1,180 @@
+import os
+from unittest import mock
+
+import pytest
+import torch
+
+import tests.base.develop_utils as tutils
+from pytorch_lightning import Trainer
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities.cloud_io import load as pl_load
+from pytorch_lightning.utilities.sharded_checkpoint import (
+    SHARDED_CHECKPOINT_INDEX,
+    is_sharded_checkpoint,
+    load_sharded_checkpoint,
+    load_sharded_tensors,
+    save_sharded_checkpoint,
+    sharded_tensor_keys,
+)
+from tests.base import EvalModelTemplate
+
+
+def _checkpoint():
+    model = torch.nn.Sequential(torch.nn.Linear(32, 32), torch.nn.BatchNorm1d(32), torch.nn.Linear(32, 2))
+    optimizer = torch.optim.Adam(model.parameters())
+    model(torch.rand(4, 32)).sum().backward()
+    optimizer.step()
+    return {
+        'epoch': 2,
+        'state_dict': model.state_dict(),
+        'optimizer_states': [optimizer.state_dict()],
+    }
+
+
+def test_sharded_checkpoint_round_trip(tmpdir):
+    """Test that a sharded checkpoint restores the same checkpoint and respects the shard size."""
+    checkpoint = _checkpoint()
+    dirpath = os.path.join(tmpdir, 'model.ckpt')
+    max_shard_size = 32 * 32 * 4
+
+    save_sharded_checkpoint(checkpoint, dirpath, max_shard_size=max_shard_size, num_workers=2)
+
+    assert is_sharded_checkpoint(dirpath)
+    assert os.listdir(tmpdir) == ['model.ckpt']
+    shards = [f for f in os.listdir(dirpath) if f != SHARDED_CHECKPOINT_INDEX]
+    assert len(shards) > 2
+    for shard in shards:
+        tensors = torch.load(os.path.join(dirpath, shard))
+        assert sum(t.numel() * t.element_size() for t in tensors.values()) <= max_shard_size
+
+    loaded = load_sharded_checkpoint(dirpath)
+    assert loaded['epoch'] == 2
+    assert loaded['state_dict'].keys() == checkpoint['state_dict'].keys()
+    assert hasattr(loaded['state_dict'], '_metadata')
+    for name, tensor in checkpoint['state_dict'].items():
+        assert torch.equal(loaded['state_dict'][name], tensor)
+    optimizer_state = checkpoint['optimizer_states'][0]
+    loaded_state = loaded['optimizer_states'][0]
+    assert loaded_state['param_groups'] == optimizer_state['param_groups']
+    for param_id, state in optimizer_state['state'].items():
+        assert torch.equal(loaded_state['state'][param_id]['exp_avg'], state['exp_avg'])
+
+    # the generic loader dispatches to the sharded format
+    assert pl_load(dirpath)['state_dict'].keys() == checkpoint['state_dict'].keys()
+
+
+def test_sharded_checkpoint_selective_load(tmpdir):
+    checkpoint = _checkpoint()
+    dirpath = os.path.join(tmpdir, 'model.ckpt')
+    save_sharded_checkpoint(checkpoint, dirpath, max_shard_size=1024)
+
+    keys = sharded_tensor_keys(dirpath)
+    assert 'state_dict/0.weight' in keys
+    assert 'optimizer_states/0/state/0/exp_avg' in keys
+
+    tensors = load_sharded_tensors(dirpath, ['state_dict/2.bias'])
+    assert list(tensors) == ['state_dict/2.bias']
+    assert torch.equal(tensors['state_dict/2.bias'], checkpoint['state_dict']['2.bias'])
+
+    with pytest.raises(KeyError, match='not part of the checkpoint'):
+        load_sharded_tensors(dirpath, ['state_dict/missing'])
+
+
+def test_sharded_checkpoint_weights_only(tmpdir):
+    """Test that only the state dict shards are read when loading weights only."""
+    checkpoint = _checkpoint()
+    dirpath = os.path.join(tmpdir, 'model.ckpt')
+    save_sharded_checkpoint(checkpoint, dirpath, max_shard_size=2048)
+
+    # optimizer shards are never read
+    locations = torch.load(os.path.join(dirpath, SHARDED_CHECKPOINT_INDEX))['tensor_locations']
+    for key, shard in locations.items():
+        if key.startswith('optimizer_states/') and os.path.exists(os.path.join(dirpath, shard)):
+            os.remove(os.path.join(dirpath, shard))
+
+    loaded = load_sharded_checkpoint(dirpath, weights_only=True)
+    assert 'optimizer_states' not in loaded
+    for name, tensor in checkpoint['state_dict'].items():
+        assert torch.equal(loaded['state_dict'][name], tensor)
+
+
+def test_sharded_checkpoint_overwrite(tmpdir):
+    """Test that saving to an existing location replaces the previous checkpoint completely."""
+    dirpath = os.path.join(tmpdir, 'last.ckpt')
+    save_sharded_checkpoint({'state_dict': {'a': torch.rand(100)}}, dirpath, max_shard_size=100)
+    save_sharded_checkpoint({'state_dict': {'b': torch.rand(10)}}, dirpath, max_shard_size=100)
+
+    assert os.listdir(tmpdir) == ['last.ckpt']
+    assert len(os.listdir(dirpath)) == 2
+    assert list(load_sharded_checkpoint(dirpath)['state_dict']) == ['b']
+
+
+def test_sharded_checkpoint_interrupted_overwrite(tmpdir):
+    """Test that a save interrupted at any point leaves a complete checkpoint."""
+    dirpath = os.path.join(tmpdir, 'last.ckpt')
+    save_sharded_checkpoint({'state_dict': {'a': torch.rand(100)}}, dirpath, max_shard_size=100)
+    previous = os.listdir(dirpath)
+
+    # interrupted before the index is replaced, the previous checkpoint is kept as it was
+    with mock.patch('pytorch_lightning.utilities.sharded_checkpoint.atomic_save', side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            save_sharded_checkpoint({'state_dict': {'b': torch.rand(10)}}, dirpath, max_shard_size=100)
+    assert sorted(os.listdir(dirpath)) == sorted(previous)
+    assert list(load_sharded_checkpoint(dirpath)['state_dict']) == ['a']
+
+    # interrupted after the index is replaced, the new checkpoint is complete
+    with mock.patch('pytorch_lightning.utilities.sharded_checkpoint._remove_unreferenced_files'):
+        save_sharded_checkpoint({'state_dict': {'b': torch.rand(10)}}, dirpath, max_shard_size=100)
+    assert list(load_sharded_checkpoint(dirpath)['state_dict']) == ['b']
+    # the shards of the previous checkpoint are deleted by the next save
+    save_sharded_checkpoint({'state_dict': {'c': torch.rand(10)}}, dirpath, max_shard_size=100)
+    assert len(os.listdir(dirpath)) == 2
+
+
+def test_sharded_checkpoint_key_separator(tmpdir):
+    """Test that a key containing the separator does not collide with the path of a nested key."""
+    dirpath = os.path.join(tmpdir, 'model.ckpt')
+    flat, nested = torch.zeros(2), torch.ones(3)
+    save_sharded_checkpoint({'state_dict': {'a/b': flat, 'a': {'b': nested}}}, dirpath, max_shard_size=100)
+
+    loaded = load_sharded_checkpoint(dirpath)['state_dict']
+    assert torch.equal(loaded['a/b'], flat)
+    assert torch.equal(loaded['a']['b'], nested)
+    assert sorted(sharded_tensor_keys(dirpath)) == ['state_dict/a%2Fb', 'state_dict/a/b']
+
+    with pytest.raises(ValueError, match='several tensors'):
+        save_sharded_checkpoint({'state_dict': {1: flat, '1': nested}}, dirpath, max_shard_size=100)
+
+
+def test_sharded_checkpoint_trainer(tmpdir):
+    """Test that sharded checkpoints can be used to resume training and to load the model."""
+    tutils.reset_seed()
+    model = EvalModelTemplate()
+    checkpoint_callback = ModelCheckpoint(filepath=tmpdir, monitor='early_stop_on', max_shard_size=4096)
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=2,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        checkpoint_callback=checkpoint_callback,
+    )
+    trainer.fit(model)
+
+    best_path = checkpoint_callback.best_model_path
+    assert is_sharded_checkpoint(best_path)
+    assert len([p for p in os.listdir(tmpdir) if p.endswith('.ckpt')]) == 1
+
+    loaded_model = EvalModelTemplate.load_from_checkpoint(best_path)
+    checkpoint = pl_load(best_path)
+    for name, tensor in loaded_model.state_dict().items():
+        assert torch.equal(tensor, checkpoint['state_dict'][name])
+
+    trainer = Trainer(
+        default_root_dir=tmpdir,
+        max_epochs=3,
+        limit_train_batches=5,
+        limit_val_batches=2,
+        resume_from_checkpoint=best_path,
+    )
+    trainer.fit(EvalModelTemplate())
+    assert trainer.current_epoch == 2
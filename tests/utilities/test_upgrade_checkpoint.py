@@ -4,7 +4,12 @@ import os
 import torch
 
 from pytorch_lightning.callbacks import EarlyStopping, ModelCheckpoint
-from pytorch_lightning.utilities.upgrade_checkpoint import upgrade_checkpoint
+from pytorch_lightning.utilities.upgrade_checkpoint import (
+    needs_upgrade,
+    read_checkpoint_keys,
+    upgrade_checkpoint,
+    upgrade_checkpoints,
+)
 
 
 @pytest.mark.parametrize(
@@ -34,3 +39,42 @@ def test_upgrade_checkpoint(tmpdir, old_checkpoint, new_checkpoint):
     upgrade_checkpoint(filepath)
     updated_checkpoint = torch.load(filepath)
     assert updated_checkpoint == new_checkpoint
+
+
+@pytest.mark.parametrize("zip_serialization", [True, False])
+def test_read_checkpoint_keys(tmpdir, zip_serialization):
+    """Test that the entries of a checkpoint are read without its tensors."""
+    filepath = os.path.join(tmpdir, "model.ckpt")
+    checkpoint = {"epoch": 1, "checkpoint_callback_best": 0.34, "state_dict": {"weight": torch.ones(3)}}
+    torch.save(checkpoint, filepath, _use_new_zipfile_serialization=zip_serialization)
+    keys = read_checkpoint_keys(filepath)
+    assert keys == {"epoch": 1, "checkpoint_callback_best": 0.34, "state_dict": {"weight": None}}
+    assert needs_upgrade(filepath)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_upgrade_checkpoints(tmpdir, workers):
+    """Test that directories and glob patterns are upgraded, skipping the upgraded checkpoints."""
+    old_checkpoint = {"epoch": 1, "checkpoint_callback_best": 0.34, "state_dict": {"weight": torch.ones(3)}}
+    for name in ("a/1.ckpt", "a/b/2.ckpt", "c/3.ckpt"):
+        os.makedirs(os.path.join(tmpdir, os.path.dirname(name)), exist_ok=True)
+        torch.save(old_checkpoint, os.path.join(tmpdir, name))
+    torch.save({"epoch": 1, "callbacks": {}}, os.path.join(tmpdir, "a", "new.ckpt"))
+    with open(os.path.join(tmpdir, "c", "broken.ckpt"), "w") as f:
+        f.write("not a checkpoint")
+
+    results = upgrade_checkpoints(
+        [os.path.join(tmpdir, "a"), os.path.join(tmpdir, "c", "*.ckpt")], workers=workers, backup=False
+    )
+    assert sorted(os.path.relpath(p, tmpdir) for p in results["upgraded"]) == ["a/1.ckpt", "a/b/2.ckpt", "c/3.ckpt"]
+    assert [os.path.relpath(p, tmpdir) for p in results["skipped"]] == ["a/new.ckpt"]
+    assert [os.path.relpath(p, tmpdir) for p in results["failed"]] == ["c/broken.ckpt"]
+    for path in results["upgraded"]:
+        assert not needs_upgrade(path)
+        assert torch.load(path)["callbacks"] == {ModelCheckpoint: {"best_model_score": 0.34}}
+    # no temporary file is left over
+    assert not [name for _, _, files in os.walk(tmpdir) for name in files if name.endswith(".tmp")]
+
+    # upgraded checkpoints are skipped
+    results = upgrade_checkpoints([os.path.join(tmpdir, "**", "[0-9].ckpt")], workers=workers)
+    assert len(results["skipped"]) == 3 and not results["upgraded"]